@@ -2,12 +2,24 @@
 from airflow import DAG
 from airflow.operators.python import PythonOperator
 from datetime import datetime, timedelta
+import os
 import pandas as pd
 
 # Import functions from other scripts
 from generate_data import generate_data
-from data_quality_standards import run_data_quality_checks
-from monitoring_audit import run_monitoring_audit
+from data_quality_standards import plan_check_groups, run_check_group, aggregate_check_groups
+from monitoring_audit import audit_unit_names, run_audit_unit, aggregate_audit_units
+from spend_summary import refresh_spend_summary
+from partitions import maintain_partitions, verify_pruning
+from drift_sketches import run_drift_checks
+
+# Daily runs only check rows added since the previous run; a full rescan reconciles once a week.
+FULL_RECONCILIATION_WEEKDAY = 6  # Sunday
+# Airflow pool shared by every task that queries the banking database (created by airflow-init);
+# its slots cap the concurrent check queries across DQ and audit tasks and across DAG runs.
+DB_POOL = os.environ.get("BANKING_DQ_AIRFLOW_POOL", "banking_db")
+# Upper bound of concurrently running mapped check tasks per DAG run.
+MAX_PARALLEL_CHECKS = int(os.environ.get("BANKING_DQ_MAX_PARALLEL_CHECKS", "4"))
 
 default_args = {
     'owner': 'airflow',
@@ -24,7 +36,8 @@ with DAG(
     description='Daily banking data quality and risk checks',
     schedule_interval='@daily',
     start_date=datetime(2025, 7, 19),
-    catchup=False
+    catchup=False,
+    max_active_runs=1
 ) as dag:
 
     def run_generate_data():
@@ -35,9 +48,31 @@ with DAG(
             print(f"Data generation failed: {str(e)}")
             raise
 
-    def run_data_quality_task():
+    def verify_pruning_task():
+        # Only checks the partitioned schema variant; passes trivially on schema.sql
+        rows, passed = verify_pruning()
+        if not passed:
+            raise Exception(f"Incremental queries read partitions outside their date span: {rows}")
+
+    def plan_data_quality_task(**context):
+        mode = 'full' if context['logical_date'].weekday() == FULL_RECONCILIATION_WEEKDAY else 'incremental'
+        print(f"Data quality mode: {mode}")
+        # Violating rows are quarantined under the Airflow run ID, so downstream jobs can join on it
+        groups = plan_check_groups(mode=mode, run_id=context['run_id'])
+        print(f"{len(groups)} check groups: {[group['name'] for group in groups]}")
+        return groups
+
+    def run_check_group_task(name, bounds, sampling, run_id):
+        return run_check_group(name, bounds, sampling, run_id)
+
+    def aggregate_data_quality_task(**context):
         try:
-            df = run_data_quality_checks()
+            ti = context['ti']
+            groups = ti.xcom_pull(task_ids='plan_data_quality')
+            results = ti.xcom_pull(task_ids='run_check_group') or []
+            df = aggregate_check_groups(groups, results, run_id=context['run_id'])
+            # Per-check query spans (time, rows examined/returned, plan digests) for later comparison
+            ti.xcom_push(key='check_spans', value=df.attrs['check_spans'])
             failed_checks = df[df['Status'] == 'FAIL']
             if not failed_checks.empty:
                 print(f"Data quality checks failed: {failed_checks.to_dict()}")
@@ -47,9 +82,22 @@ with DAG(
             print(f"Data quality checks failed: {str(e)}")
             raise
 
-    def run_monitoring_audit_task():
+    def profile_drift_task(**context):
+        # Sketches only the rows added since the last run; drift is reported, not raised, like the audit.
+        # Profiling errors raise from run_drift_checks and fail the task.
+        checks = run_drift_checks(day=context['logical_date'].date(), run_id=context['run_id'])
+        drifted = [check for check in checks if check['Status'] == 'FAIL']
+        print(f"{len(drifted)} drifted distributions: {drifted}")
+
+    def run_audit_task(name, **context):
+        return run_audit_unit(name, run_id=context['run_id'])
+
+    def aggregate_audit_task(**context):
         try:
-            checks = run_monitoring_audit()
+            ti = context['ti']
+            results = ti.xcom_pull(task_ids='run_audit_check') or []
+            checks = aggregate_audit_units(audit_unit_names(), results, run_id=context['run_id'])
+            ti.xcom_push(key='check_spans', value=[span for result in results if result for span in result['spans']])
             # failed_checks = df[df['Status'] == 'FAIL']
             # if not failed_checks.empty:
             #    print(f"Monitoring checks failed: {failed_checks.to_dict()}")
@@ -60,23 +108,83 @@ with DAG(
             print(f"Monitoring checks failed: {str(e)}")
             raise
 
+    # Creates the coming days' partitions before any rows for them are inserted
+    partition_maintenance = PythonOperator(
+        task_id='maintain_partitions',
+        python_callable=maintain_partitions,
+        pool=DB_POOL,
+        dag=dag
+    )
+
     generate_data_task = PythonOperator(
         task_id='generate_data',
         python_callable=run_generate_data,
+        pool=DB_POOL,
+        dag=dag
+    )
+
+    profile_drift = PythonOperator(
+        task_id='profile_drift',
+        python_callable=profile_drift_task,
+        pool=DB_POOL,
         dag=dag
     )
 
-    data_quality_task = PythonOperator(
-        task_id='run_data_quality_checks',
-        python_callable=run_data_quality_task,
+    plan_data_quality = PythonOperator(
+        task_id='plan_data_quality',
+        python_callable=plan_data_quality_task,
+        pool=DB_POOL,
         dag=dag
     )
 
-    monitoring_audit_task = PythonOperator(
-        task_id='run_monitoring_audit',
-        python_callable=run_monitoring_audit_task,
+    # One mapped task per table scan / check unit: a slow group no longer blocks the others
+    # and a retry only reruns the group that failed.
+    check_groups = PythonOperator.partial(
+        task_id='run_check_group',
+        python_callable=run_check_group_task,
+        pool=DB_POOL,
+        max_active_tis_per_dagrun=MAX_PARALLEL_CHECKS,
+        dag=dag
+    ).expand(op_kwargs=plan_data_quality.output)
+
+    aggregate_data_quality = PythonOperator(
+        task_id='aggregate_data_quality',
+        python_callable=aggregate_data_quality_task,
+        trigger_rule='all_done',
+        dag=dag
+    )
+
+    verify_partition_pruning = PythonOperator(
+        task_id='verify_partition_pruning',
+        python_callable=verify_pruning_task,
+        pool=DB_POOL,
+        dag=dag
+    )
+
+    refresh_summary = PythonOperator(
+        task_id='refresh_spend_summary',
+        python_callable=refresh_spend_summary,
+        pool=DB_POOL,
+        dag=dag
+    )
+
+    audit_checks = PythonOperator.partial(
+        task_id='run_audit_check',
+        python_callable=run_audit_task,
+        pool=DB_POOL,
+        max_active_tis_per_dagrun=MAX_PARALLEL_CHECKS,
+        dag=dag
+    ).expand(op_kwargs=[{'name': name} for name in audit_unit_names()])
+
+    aggregate_audit = PythonOperator(
+        task_id='aggregate_monitoring_audit',
+        python_callable=aggregate_audit_task,
+        trigger_rule='all_done',
         dag=dag
     )
 
-    # Task dependencies
-    generate_data_task >> data_quality_task >> monitoring_audit_task
+    # Task dependencies: the audit only reads the generated data, so it runs alongside the DQ checks
+    partition_maintenance >> generate_data_task >> verify_partition_pruning
+    generate_data_task >> profile_drift
+    generate_data_task >> plan_data_quality >> check_groups >> aggregate_data_quality
+    generate_data_task >> refresh_summary >> audit_checks >> aggregate_audit
@@ -0,0 +1,228 @@
+# /src/benchmark.py
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import mysql.connector
+
+from db import DB_CONN_ID, connect_db, get_db_params, get_pool
+from generate_data import generate_data_bulk, BASE_VOLUMES
+
+# Benchmarks run in their own database on the configured server, dropped and re-created per scale.
+BENCH_DB = os.environ.get("BANKING_BENCH_DB", "banking_bench")
+SCHEMA_FILE = os.environ.get("BANKING_SCHEMA_FILE", os.path.join(os.path.dirname(__file__), '..', 'schema.sql'))
+# Scales are named by PaymentTransaction rows; generate_data's scale factor is rows / BASE_VOLUMES.
+SCALES = {'1k': 1000, '100k': 100000, '10m': 10000000}
+DEFAULT_SCALES = ['1k', '100k']
+TOLERANCE = 0.20
+# Differences below this many seconds are treated as noise whatever the ratio.
+MIN_DELTA = 0.05
+# Newest transactions left out of the summary before each timed refresh, so every repeat folds in the same rows.
+REFRESH_TRANSACTIONS = int(os.environ.get("BANKING_BENCH_REFRESH_TRANSACTIONS", "1000"))
+
+
+def use_bench_database():
+    """Point every connection of this process, including the shared pool, at BENCH_DB."""
+    if get_db_params()['database'] == BENCH_DB:
+        raise ValueError(f"Benchmark database {BENCH_DB!r} is the configured working database; set BANKING_BENCH_DB")
+    os.environ["BANKING_DB_NAME"] = BENCH_DB
+    if get_db_params()['database'] != BENCH_DB:
+        raise ValueError(f"Airflow connection {DB_CONN_ID!r} overrides BANKING_DB_NAME; "
+                         f"set BANKING_DB_CONN_ID to an undefined connection to benchmark")
+
+
+def reset_database():
+    """Drop and re-create the benchmark database from schema.sql."""
+    conn = mysql.connector.connect(**dict(get_db_params(), database=None))
+    cur = conn.cursor()
+    cur.execute(f"DROP DATABASE IF EXISTS `{BENCH_DB}`")
+    cur.execute(f"CREATE DATABASE `{BENCH_DB}`")
+    cur.execute(f"USE `{BENCH_DB}`")
+    with open(SCHEMA_FILE) as f:
+        statements = [s.strip() for s in f.read().split(';')]
+    for statement in statements:
+        if any(line.strip() and not line.strip().startswith('--') for line in statement.splitlines()):
+            cur.execute(statement)
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def timed(fn, repeat=1, setup=None):
+    """Run fn `repeat` times with its output discarded; returns per-run seconds.
+
+    setup, if given, runs untimed before every run to put the database back in the same state.
+    """
+    runs = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            if setup is not None:
+                setup()
+            started = time.perf_counter()
+            fn()
+            runs.append(time.perf_counter() - started)
+    return runs
+
+
+def summary(runs):
+    return {'median_s': round(statistics.median(runs), 4), 'min_s': round(min(runs), 4), 'runs': len(runs)}
+
+
+def hold_back_transactions(count=REFRESH_TRANSACTIONS):
+    """Rebuild the spend summary without the newest `count` transactions, leaving them for the next refresh."""
+    from spend_summary import rebuild_spend_summary
+    conn = connect_db()
+    cur = conn.cursor()
+    cur.execute("SELECT COALESCE(MAX(`TransactionID`), 0) FROM `PaymentTransaction`")
+    high = int(cur.fetchone()[0])
+    cur.close()
+    conn.close()
+    rebuild_spend_summary(max(high - count, 0))
+
+
+# Untimed setup run before every repeat of a check that consumes its own input
+CHECK_SETUP = {
+    'audit.refresh_spend_summary': hold_back_transactions,
+}
+
+
+def check_functions():
+    """Name -> callable of every check timed by the suite (imported late so the pool uses BENCH_DB).
+
+    Checks run in this order; refresh_spend_summary leaves the summary complete for the audit checks.
+    """
+    import data_quality_standards as dq
+    import monitoring_audit as audit
+    from spend_summary import refresh_spend_summary, rebuild_spend_summary
+    return {
+        'dq.check_null_values': dq.check_null_values,
+        'dq.check_uniqueness': dq.check_uniqueness,
+        'dq.check_cccd_format': dq.check_cccd_format,
+        'dq.check_foreign_keys': dq.check_foreign_keys,
+        'dq.run_data_quality_checks': dq.run_data_quality_checks,
+        'audit.rebuild_spend_summary': rebuild_spend_summary,
+        'audit.refresh_spend_summary': refresh_spend_summary,
+        'audit.check_high_value_transactions': audit.check_high_value_transactions,
+        'audit.check_unverified_devices': audit.check_unverified_devices,
+        'audit.check_daily_transaction_limit': audit.check_daily_transaction_limit,
+        'audit.run_monitoring_audit': audit.run_monitoring_audit,
+    }
+
+
+def generate_scale(name, workers=1, seed=0, engine='vector'):
+    """Fill the (freshly reset) benchmark database at one scale; returns (scale factor, per-table stats)."""
+    scale_factor = max(1, SCALES[name] // BASE_VOLUMES['PaymentTransaction'])
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats = generate_data_bulk(scale_factor, workers=workers, seed=seed, as_of=datetime(2026, 1, 1),
+                                   engine=engine)
+    return scale_factor, stats
+
+
+def run_scale(name, repeat=3, workers=1, seed=0, engine='vector'):
+    """Seed the benchmark database at one scale and time the generator stages and every check."""
+    transactions = SCALES[name]
+    reset_database()
+    results = {}
+
+    started = time.perf_counter()
+    scale_factor, stats = generate_scale(name, workers, seed, engine)
+    results['generate.total'] = summary([time.perf_counter() - started])
+    for table, table_stats in stats.items():
+        results[f'generate.{table}'] = dict(summary([table_stats['seconds']]), rows=table_stats['rows'])
+
+    for check, fn in check_functions().items():
+        try:
+            results[check] = summary(timed(fn, repeat, CHECK_SETUP.get(check)))
+        except Exception as e:
+            results[check] = {'error': str(e)}
+        print(f"  {name} {check}: {results[check]}")
+    return {'scale_factor': scale_factor, 'transactions': transactions, 'results': results}
+
+
+def run_benchmarks(scales=DEFAULT_SCALES, repeat=3, workers=1, seed=0, engine='vector'):
+    use_bench_database()
+    report = {
+        'meta': {'started_at': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+                 'host': platform.node(), 'repeat': repeat, 'workers': workers, 'engine': engine},
+        'scales': {},
+    }
+    for name in scales:
+        print(f"Benchmarking {name} transactions")
+        report['scales'][name] = run_scale(name, repeat, workers, seed, engine)
+    report['meta']['pool'] = get_pool().stats()
+    return report
+
+
+def compare(report, baseline, tolerance=TOLERANCE, min_delta=MIN_DELTA):
+    """Rows (scale, name, baseline s, current s, ratio, verdict) for every benchmark present in both.
+
+    A benchmark that ran in the baseline but raises now is an ERROR row.
+    """
+    rows = []
+    for scale, current in report['scales'].items():
+        previous = baseline.get('scales', {}).get(scale)
+        if not previous:
+            continue
+        for name, result in current['results'].items():
+            old = previous['results'].get(name, {})
+            if 'median_s' not in old:
+                continue
+            if 'error' in result:
+                rows.append((scale, name, old['median_s'], None, None, 'ERROR'))
+                continue
+            if 'median_s' not in result:
+                continue
+            ratio = result['median_s'] / old['median_s'] if old['median_s'] else float('inf')
+            delta = result['median_s'] - old['median_s']
+            if ratio > 1 + tolerance and delta > min_delta:
+                verdict = 'REGRESSION'
+            elif ratio < 1 - tolerance and -delta > min_delta:
+                verdict = 'IMPROVED'
+            else:
+                verdict = 'OK'
+            rows.append((scale, name, old['median_s'], result['median_s'], round(ratio, 3), verdict))
+    return rows
+
+
+def print_comparison(rows):
+    import pandas as pd
+    df = pd.DataFrame(rows, columns=['Scale', 'Benchmark', 'Baseline (s)', 'Current (s)', 'Ratio', 'Verdict'])
+    print("\nBenchmark Comparison:")
+    print(df.to_string(index=False))
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the generator and the checks on a throwaway database")
+    parser.add_argument("--scales", default=','.join(DEFAULT_SCALES),
+                        help=f"comma-separated subset of {list(SCALES)}")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=["faker", "vector"], default="vector")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=None, help="JSON from an earlier run to compare against")
+    parser.add_argument("--compare-only", action="store_true", help="compare --output with --baseline, do not run")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    if args.compare_only:
+        with open(args.output) as f:
+            report = json.load(f)
+    else:
+        report = run_benchmarks(args.scales.split(','), args.repeat, args.workers, args.seed, args.engine)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            rows = compare(report, json.load(f), args.tolerance)
+        print_comparison(rows)
+        sys.exit(1 if any(row[-1] in ('REGRESSION', 'ERROR') for row in rows) else 0)
@@ -0,0 +1,102 @@
+# /src/check_executor.py
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import pandas as pd
+
+from db import statement_timeout
+from instrumentation import span
+
+# One independent check: run() returns a list of check rows; labels fill the row if it errors or times out.
+CheckUnit = namedtuple('CheckUnit', ['name', 'run', 'labels'])
+
+DEFAULT_PARALLELISM = int(os.environ.get("BANKING_DQ_PARALLELISM", "4"))
+DEFAULT_TIMEOUT = float(os.environ.get("BANKING_DQ_CHECK_TIMEOUT", "600"))
+
+
+def run_sequential(units):
+    """Run units one after another in the calling thread."""
+    checks = []
+    for unit in units:
+        checks.extend(unit.run())
+    return checks
+
+
+def failed_row(unit, details):
+    row = dict(unit.labels)
+    row.update({'Status': 'FAIL', 'Details': details})
+    return row
+
+
+def execute_checks(units, max_workers=DEFAULT_PARALLELISM, timeout=DEFAULT_TIMEOUT):
+    """Run check units concurrently on a thread pool.
+
+    At most max_workers units run at once (keep it at or below the DB pool
+    size). A unit still running `timeout` seconds after it started is
+    reported as FAIL and stopped server-side: its SELECTs are capped with
+    MAX_EXECUTION_TIME, its running statements are killed (KILL QUERY) and
+    it can check out no further connections, so its thread unwinds instead
+    of keeping the process alive. Results come back in the order of `units`
+    whatever order they finish in.
+
+    Returns (checks, timings, wall_seconds) where timings has one row per
+    unit with its own elapsed time.
+    """
+    results = [None] * len(units)
+    timings = [None] * len(units)
+    started_at = {}
+    scopes = {}
+
+    def call(i, unit):
+        with statement_timeout(timeout) as scope, span(unit.name):
+            scopes[i] = scope
+            started_at[i] = time.monotonic()
+            rows = unit.run()
+        return rows, time.monotonic() - started_at[i]
+
+    wall_started = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dq-check')
+    futures = {pool.submit(call, i, unit): i for i, unit in enumerate(units)}
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+        for future in done:
+            i = futures[future]
+            try:
+                results[i], elapsed = future.result()
+                status = 'FAIL' if any(row['Status'] == 'FAIL' for row in results[i]) else 'PASS'
+            except Exception as e:
+                elapsed = time.monotonic() - started_at.get(i, wall_started)
+                results[i] = [failed_row(units[i], f'Check error: {e}')]
+                status = 'ERROR'
+            timings[i] = {'Check': units[i].name, 'Status': status, 'Elapsed (s)': round(elapsed, 3)}
+        now = time.monotonic()
+        for future in list(pending):
+            i = futures[future]
+            if timeout and i in started_at and now - started_at[i] > timeout:
+                pending.discard(future)
+                results[i] = [failed_row(units[i], f'Check timed out after {timeout:.0f}s')]
+                timings[i] = {'Check': units[i].name, 'Status': 'TIMEOUT', 'Elapsed (s)': round(now - started_at[i], 3)}
+                try:
+                    scopes[i].cancel()
+                except Exception as e:
+                    print(f"{units[i].name}: could not kill its queries: {e}")
+    wall_seconds = time.monotonic() - wall_started
+    # Timed-out units unwind once their statements are killed; their errors are already reported as timeouts
+    pool.shutdown(wait=True)
+
+    checks = [row for rows in results for row in rows]
+    return checks, timings, wall_seconds
+
+
+def print_timings(timings, wall_seconds):
+    df = pd.DataFrame(timings, columns=['Check', 'Status', 'Elapsed (s)'])
+    print("\nCheck Timings:")
+    if df.empty:
+        print("No checks ran")
+        return df
+    print(df)
+    print(f"wall-clock {wall_seconds:.2f}s, sum of check times {df['Elapsed (s)'].sum():.2f}s")
+    return df
@@ -0,0 +1,276 @@
+# /src/check_registry.py
+import argparse
+import os
+from collections import namedtuple
+from functools import partial
+
+from db import connect_db
+from format_rules import FORMAT_RULES
+from watermarks import WATERMARK_COLUMNS, scope_predicate
+from check_executor import CheckUnit, execute_checks
+
+# Declarative data quality rules per table (the same structure can be loaded from YAML with load_rules).
+# not_null follows the NOT NULL columns of schema.sql; format names refer to format_rules.FORMAT_RULES.
+RULES = {
+    'Customer': {
+        'not_null': ['CustomerID', 'FirstName', 'LastName', 'Email', 'CCCD_Passport', 'DateOfBirth', 'Status'],
+        'unique': ['Email', 'CCCD_Passport'],
+        'format': ['cccd'],
+        'enum': {'Status': ['Active', 'Suspended', 'Inactive']},
+    },
+    'BankAccount': {
+        'not_null': ['AccountID', 'CustomerID', 'AccountType', 'AccountNumber', 'Balance', 'OpenDate', 'Status'],
+        'unique': ['AccountNumber'],
+        'foreign_keys': {'CustomerID': ['Customer', 'CustomerID']},
+        'enum': {'AccountType': ['Checking', 'Savings', 'Credit'], 'Status': ['Active', 'Frozen', 'Closed']},
+    },
+    'Card': {
+        'not_null': ['AccountID', 'CardNumber', 'CardType', 'ExpiryDate', 'CVV', 'Status'],
+        'unique': ['CardNumber'],
+        'foreign_keys': {'AccountID': ['BankAccount', 'AccountID']},
+        'enum': {'CardType': ['Debit', 'Credit', 'Prepaid'], 'Status': ['Active', 'Blocked', 'Expired']},
+    },
+    'Merchant': {
+        'not_null': ['MerchantID', 'MerchantName', 'RiskScore'],
+        'range': {'RiskScore': [0, 100]},
+    },
+    'Device': {
+        'not_null': ['CustomerID', 'DeviceType', 'DeviceFingerprint', 'Status', 'RiskTag'],
+        'unique': ['DeviceFingerprint'],
+        'foreign_keys': {'CustomerID': ['Customer', 'CustomerID']},
+        'enum': {'DeviceType': ['Mobile', 'Desktop', 'Tablet'], 'Status': ['Trusted', 'Suspicious', 'Blocked'],
+                 'RiskTag': ['Low', 'Medium', 'High']},
+    },
+    'AuthenticationLog': {
+        'not_null': ['CustomerID', 'AuthType', 'AuthDate', 'Status', 'RiskTag'],
+        'foreign_keys': {'CustomerID': ['Customer', 'CustomerID'], 'DeviceID': ['Device', 'DeviceID'],
+                         'TransactionID': ['PaymentTransaction', 'TransactionID']},
+        'enum': {'AuthType': ['OTP', 'Biometric', 'Password'], 'Status': ['Success', 'Failed', 'Pending'],
+                 'RiskTag': ['Low', 'Medium', 'High']},
+    },
+    'PaymentTransaction': {
+        'not_null': ['AccountID', 'MerchantID', 'Amount', 'TransactionDate', 'TransactionType', 'Status',
+                     'RiskTag'],
+        'foreign_keys': {'AccountID': ['BankAccount', 'AccountID'], 'CardID': ['Card', 'CardID'],
+                         'MerchantID': ['Merchant', 'MerchantID'], 'DeviceID': ['Device', 'DeviceID'],
+                         'AuthLogID': ['AuthenticationLog', 'AuthLogID']},
+        'enum': {'TransactionType': ['Online', 'POS', 'ATM', 'Transfer', 'Refund'],
+                 'Status': ['Completed', 'Pending', 'Declined'], 'RiskTag': ['Low', 'Medium', 'High']},
+    },
+    'FraudAlert': {
+        'not_null': ['AlertID', 'CustomerID', 'AlertType', 'AlertDate', 'RiskScore', 'Status', 'RiskTag'],
+        'foreign_keys': {'CustomerID': ['Customer', 'CustomerID'],
+                         'TransactionID': ['PaymentTransaction', 'TransactionID'],
+                         'DeviceID': ['Device', 'DeviceID'], 'AuthLogID': ['AuthenticationLog', 'AuthLogID']},
+        'range': {'RiskScore': [0, 100]},
+        'enum': {'Status': ['Open', 'Resolved', 'False'], 'RiskTag': ['Low', 'Medium', 'High']},
+    },
+}
+
+# Report order of the rule kinds and the check name each one produces.
+CHECK_NAMES = {
+    'not_null': 'Null Check',
+    'unique': 'Uniqueness Check',
+    'format': 'Format Check',
+    'foreign_keys': 'Foreign Key Integrity',
+    'range': 'Range Check',
+    'enum': 'Enum Check',
+}
+
+# One aggregate query over a table; outputs are the rules answered by its result columns, in order.
+PlannedQuery = namedtuple('PlannedQuery', ['table', 'sql', 'params', 'outputs'])
+
+
+def load_rules(path=None):
+    """Rules from a YAML file (same structure as RULES), or the built-in RULES."""
+    path = path or os.environ.get("BANKING_DQ_RULES_FILE")
+    if not path:
+        return RULES
+    import yaml
+    with open(path) as f:
+        return yaml.safe_load(f)
+
+
+def expand_rules(rules=None, kinds=None):
+    """Flatten the spec into one dict per rule, numbered in report order (kind, then table, then column)."""
+    rules = RULES if rules is None else rules
+    expanded = []
+    for kind in CHECK_NAMES:
+        if kinds is not None and kind not in kinds:
+            continue
+        for table, spec in rules.items():
+            entries = spec.get(kind, [])
+            for column in entries:
+                rule = {'seq': len(expanded), 'kind': kind, 'table': table, 'column': column}
+                if kind == 'format':
+                    format_rule = FORMAT_RULES[column]
+                    rule.update(format=column, column=format_rule['column'], pattern=format_rule['pattern'],
+                                label=format_rule['label'])
+                elif isinstance(entries, dict):
+                    rule['arg'] = entries[column]
+                expanded.append(rule)
+    return expanded
+
+
+def violation_predicate(rule, alias, joins, bounds=None):
+    """Row-level SQL condition (and params) true for the rows of `alias` that violate one rule."""
+    column = f"{alias}.`{rule['column']}`"
+    kind = rule['kind']
+    if kind == 'not_null':
+        return f"{column} IS NULL", []
+    if kind == 'unique':
+        pk = WATERMARK_COLUMNS[rule['table']]
+        # Probes the column's index for each row's key
+        return (f"EXISTS (SELECT 1 FROM `{rule['table']}` o "
+                f"WHERE o.`{rule['column']}` = {column} AND o.`{pk}` <> {alias}.`{pk}`)"), []
+    if kind == 'format':
+        return f"{column} IS NOT NULL AND NOT ({column} REGEXP %s)", [rule['pattern']]
+    if kind == 'foreign_keys':
+        parent_table, pk = rule['arg']
+        parent = f"p{len(joins)}"
+        # Joining on the parent's primary key returns at most one row, so joins never fan out
+        joins.append(f"LEFT JOIN `{parent_table}` {parent} ON {column} = {parent}.`{pk}`")
+        return f"{column} IS NOT NULL AND {parent}.`{pk}` IS NULL", []
+    if kind == 'range':
+        low, high = rule['arg']
+        return f"{column} NOT BETWEEN %s AND %s", [low, high]
+    if kind == 'enum':
+        allowed = rule['arg']
+        return f"{column} NOT IN ({', '.join(['%s'] * len(allowed))})", list(allowed)
+    raise ValueError(f"Unknown rule kind: {kind}")
+
+
+def rule_expression(rule, alias, joins, bounds):
+    """SELECT expression (and params) counting the violations of one rule."""
+    if rule['kind'] == 'unique' and not bounds:
+        # Full scan: extra rows per duplicated value, without a probe per row
+        column = f"{alias}.`{rule['column']}`"
+        return f"COUNT({column}) - COUNT(DISTINCT {column})", []
+    predicate, params = violation_predicate(rule, alias, joins, bounds)
+    return f"COALESCE(SUM({predicate}), 0)", params
+
+
+def rule_id(rule):
+    """Stable identifier of a rule, e.g. 'foreign_keys:PaymentTransaction.AccountID'."""
+    return f"{rule['kind']}:{rule['table']}.{rule.get('format', rule['column'])}"
+
+
+def compile_table_query(table, table_rules, bounds=None, where=None, where_params=(), count_rows=False,
+                        group_by=None, group_params=()):
+    """Compile rules of one table into a single aggregate SELECT.
+
+    `where` replaces the watermark scope (e.g. a sample predicate on c);
+    with count_rows the first result column is COUNT(*) of scanned rows.
+    With group_by (an expression on c) there is one row per group, led by
+    the group's value.
+    """
+    joins = []
+    expressions = [f'{group_by} AS `grp`'] if group_by else []
+    expressions += ['COUNT(*)'] if count_rows else []
+    params = list(group_params) if group_by else []
+    for rule in table_rules:
+        expression, expression_params = rule_expression(rule, 'c', joins, bounds)
+        expressions.append(expression)
+        params.extend(expression_params)
+    if where is None:
+        where, where_params = scope_predicate(table, bounds, alias='c')
+    sql = "SELECT\n    {}\nFROM `{}` c{}\nWHERE {}".format(
+        ',\n    '.join(expressions), table, ''.join(f"\n{join}" for join in joins), where)
+    if group_by:
+        sql += "\nGROUP BY `grp`"
+    return PlannedQuery(table, sql, tuple(params) + tuple(where_params), table_rules)
+
+
+def group_by_table(rules):
+    by_table = {}
+    for rule in rules:
+        by_table.setdefault(rule['table'], []).append(rule)
+    return by_table
+
+
+def plan_queries(rules, bounds=None):
+    """Group rules by table and compile each group into a single scan of that table."""
+    return [compile_table_query(table, table_rules, bounds) for table, table_rules in group_by_table(rules).items()]
+
+
+def result_row(rule, count):
+    kind = rule['kind']
+    if kind == 'not_null':
+        details = f'{count} null values found'
+    elif kind == 'unique':
+        details = f'{count} duplicate values found' if count else 'No duplicates'
+    elif kind == 'format':
+        label = rule['label']
+        details = f'{count} invalid {label} formats found' if count else f'All {label}s valid'
+    elif kind == 'foreign_keys':
+        details = f'{count} invalid foreign keys found'
+    elif kind == 'range':
+        details = f"{count} values outside [{rule['arg'][0]}, {rule['arg'][1]}]"
+    else:
+        details = f"{count} values not in {rule['arg']}"
+    return {
+        'Table': rule['table'],
+        'Column': rule['column'],
+        'Check': CHECK_NAMES[kind],
+        'Status': 'FAIL' if count > 0 else 'PASS',
+        'Details': details,
+        '_seq': rule['seq']
+    }
+
+
+def run_planned_query(query):
+    conn = connect_db()
+    cur = conn.cursor()
+    cur.execute(query.sql, query.params)
+    counts = cur.fetchone()
+    cur.close()
+    conn.close()
+    return [result_row(rule, int(count)) for rule, count in zip(query.outputs, counts)]
+
+
+def planned_units(rules, bounds=None):
+    """One CheckUnit per planned table scan."""
+    return [
+        CheckUnit(f'Table Scan {query.table}', partial(run_planned_query, query),
+                  {'Table': query.table, 'Column': '*', 'Check': 'Table Scan', '_seq': query.outputs[0]['seq']})
+        for query in plan_queries(rules, bounds)
+    ]
+
+
+def order_rows(checks):
+    """Put rows back in rule (report) order and drop the internal sequence numbers."""
+    checks = sorted(checks, key=lambda row: row.get('_seq', float('inf')))
+    for row in checks:
+        row.pop('_seq', None)
+    return checks
+
+
+def run_rules(kinds=None, bounds=None, rules=None, max_workers=1):
+    """Evaluate registry rules (optionally only some kinds) with one query per table."""
+    checks, _, _ = execute_checks(planned_units(expand_rules(rules, kinds), bounds), max_workers=max_workers)
+    return order_rows(checks)
+
+
+def dry_run(kinds=None, bounds=None, rules=None):
+    """Print the planned SQL and how many table scans replace the per-rule queries."""
+    expanded = expand_rules(rules, kinds)
+    planned = plan_queries(expanded, bounds)
+    for query in planned:
+        print(f"-- {query.table}: {len(query.outputs)} rules")
+        print(query.sql + ";")
+        print(f"-- params: {list(query.params)}\n")
+    print(f"{len(expanded)} rules -> {len(planned)} table scans ({len(planned)} queries instead of {len(expanded)})")
+    return planned
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plan the declarative data quality rules")
+    parser.add_argument("--dry-run", action="store_true", help="print the planned SQL instead of running it")
+    parser.add_argument("--rules", default=None, help="YAML rules file (defaults to the built-in RULES)")
+    parser.add_argument("--kind", action="append", choices=list(CHECK_NAMES), help="only plan these rule kinds")
+    args = parser.parse_args()
+    if args.dry_run:
+        dry_run(args.kind, rules=load_rules(args.rules))
+    else:
+        for row in run_rules(args.kind, rules=load_rules(args.rules)):
+            print(row)
@@ -0,0 +1,307 @@
+# /src/chunk_engine.py
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from db import connect_db
+from watermarks import WATERMARK_COLUMNS, scope_predicate
+from check_registry import result_row, group_by_table, expand_rules, load_rules, order_rows, rule_id
+from check_executor import CheckUnit, execute_checks
+from uniqueness_sketch import hash_values, collation_keys, PartitionedPairs, partition_bits
+import quarantine
+
+# Rows per chunk read from MySQL and evaluated by one worker process.
+CHUNK_ROWS = int(os.environ.get("BANKING_DQ_CHUNK_ROWS", "50000"))
+# Worker processes evaluating chunks; chunks in flight are capped at twice this to bound memory.
+CHUNK_WORKERS = int(os.environ.get("BANKING_DQ_CHUNK_WORKERS", str(os.cpu_count() or 1)))
+INT32_MAX = np.iinfo(np.int32).max
+
+# Sorted parent key arrays for foreign key rules, set in every worker by the pool initializer.
+_parent_keys = {}
+
+
+def init_worker(parent_keys):
+    global _parent_keys
+    _parent_keys = parent_keys
+
+
+def compact_ids(values):
+    """Nullable integer array, int32 when the keys fit."""
+    array = pd.array(values, dtype='Int64')
+    if not len(array) or array.max(skipna=True) is pd.NA or array.max(skipna=True) <= INT32_MAX:
+        return array.astype('Int32')
+    return array
+
+
+def chunk_frame(columns, rows, categories):
+    """DataFrame of one chunk with compact dtypes: int32 keys, categoricals for enum columns."""
+    data = dict(zip(columns, zip(*rows))) if rows else {column: () for column in columns}
+    frame = {}
+    for column, values in data.items():
+        if column.endswith('ID'):
+            frame[column] = compact_ids(values)
+        elif column in categories:
+            frame[column] = pd.Categorical(values)
+        else:
+            frame[column] = pd.Series(values, dtype=object)
+    return pd.DataFrame(frame)
+
+
+def parent_lookup(parent, keys):
+    """Boolean array: key present in the sorted parent key array."""
+    if not len(parent):
+        return np.zeros(len(keys), dtype=bool)
+    index = np.minimum(np.searchsorted(parent, keys), len(parent) - 1)
+    return parent[index] == keys
+
+
+def rule_mask(frame, rule):
+    """Boolean violation mask of one rule on a chunk (except uniqueness, which needs every chunk)."""
+    values = frame[rule['column']]
+    kind = rule['kind']
+    if kind == 'not_null':
+        return values.isna().to_numpy()
+    if kind == 'format':
+        # REGEXP in MySQL follows the column's case-insensitive collation
+        matched = values.str.fullmatch(rule['pattern'], case=False)
+        return (values.notna() & ~matched.fillna(True).astype(bool)).to_numpy()
+    if kind == 'foreign_keys':
+        parent = _parent_keys[tuple(rule['arg'])]
+        present = values.notna().to_numpy()
+        keys = values.to_numpy(dtype=np.int64, na_value=0)
+        return present & ~parent_lookup(parent, keys)
+    if kind == 'range':
+        low, high = rule['arg']
+        numbers = pd.to_numeric(values)
+        return ((numbers < low) | (numbers > high)).fillna(False).to_numpy(dtype=bool)
+    if kind == 'enum':
+        categorical = values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype('category')
+        allowed = set(collation_keys([str(value) for value in rule['arg']]))
+        # Folded once per category rather than per row
+        bad = ~collation_keys(categorical.cat.categories).isin(allowed).to_numpy()
+        codes = categorical.cat.codes.to_numpy()
+        # NULLs have code -1, which picks the appended False
+        return np.append(bad, False)[codes]
+    raise ValueError(f"Unknown rule kind: {kind}")
+
+
+def evaluate_chunk(columns, rows, table_rules, scope, categories, keep_keys=False):
+    """Violation counts of every rule of a table on one chunk, plus the (hash, key) pairs of uniqueness rules.
+
+    scope is the (low, high) primary key range of an incremental run, or None.
+    Uniqueness needs every chunk, so those rules only return the hashes of
+    their non-null values with the rows' primary keys. With keep_keys the
+    primary keys of the violating rows in scope are returned per rule too.
+    """
+    frame = chunk_frame(columns, rows, categories)
+    pks = frame[columns[0]].to_numpy(dtype=np.int64, na_value=0)
+    in_scope = None
+    if scope is not None:
+        low, high = scope
+        in_scope = np.zeros(len(frame), dtype=bool) if high is None else pks <= high
+        if low is not None:
+            in_scope &= pks > low
+    counts, pairs, keys = {}, {}, {}
+    for rule in table_rules:
+        if rule['kind'] == 'unique':
+            values = frame[rule['column']]
+            present = values.notna().to_numpy()
+            pairs[rule['seq']] = (hash_values(collation_keys(values[present])), pks[present].astype(np.uint64))
+            continue
+        mask = rule_mask(frame, rule)
+        if in_scope is not None:
+            mask = mask & in_scope
+        counts[rule['seq']] = int(np.count_nonzero(mask))
+        if keep_keys and counts[rule['seq']]:
+            keys[rule['seq']] = pks[mask]
+    return counts, pairs, keys
+
+
+def unique_violations(pairs, scope=None, keep_keys=False):
+    """Combine the (hash, key) pairs of every chunk, one hash partition at a time.
+
+    Full runs count the extra rows per value; scoped runs count the rows in
+    scope that share a value with any other row. Also returns the keys of
+    the rows in scope sharing a value (with keep_keys), like the quarantine
+    predicate of uniqueness rules.
+    """
+    count, keys = 0, []
+    for partition in pairs.partitions():
+        hashes, pks = partition[:, 0], partition[:, 1].astype(np.int64)
+        repeated = np.zeros(len(hashes), dtype=bool)
+        repeated[1:] |= hashes[1:] == hashes[:-1]
+        repeated[:-1] |= hashes[1:] == hashes[:-1]
+        if scope is None:
+            count += int(np.count_nonzero(hashes[1:] == hashes[:-1]))
+        else:
+            low, high = scope
+            in_scope = np.zeros(len(pks), dtype=bool) if high is None else pks <= high
+            if low is not None:
+                in_scope &= pks > low
+            repeated &= in_scope
+            count += int(np.count_nonzero(repeated))
+        if keep_keys:
+            keys.append(pks[repeated])
+    return count, keys
+
+
+def read_chunks(table, columns, where='1 = 1', params=(), chunk_rows=CHUNK_ROWS):
+    """Plain column reads in primary key order through an unbuffered cursor, chunk_rows at a time."""
+    conn = connect_db()
+    cur = conn.cursor(buffered=False)
+    cur.execute("SELECT {} FROM `{}` WHERE {} ORDER BY `{}`".format(
+        ', '.join(f"`{column}`" for column in columns), table, where, WATERMARK_COLUMNS[table]), params)
+    try:
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cur.close()
+        conn.close()
+
+
+def max_key(table, pk):
+    """Largest primary key of a table: an upper bound of its row count, as keys are dense."""
+    conn = connect_db()
+    cur = conn.cursor()
+    cur.execute(f"SELECT COALESCE(MAX(`{pk}`), 0) FROM `{table}`")
+    high = int(cur.fetchone()[0])
+    cur.close()
+    conn.close()
+    return high
+
+
+def load_parent_keys(rules, chunk_rows=CHUNK_ROWS):
+    """Sorted key array of every parent table referenced by a foreign key rule, int32 when they fit."""
+    parent_keys = {}
+    for rule in rules:
+        if rule['kind'] != 'foreign_keys' or tuple(rule['arg']) in parent_keys:
+            continue
+        parent_table, pk = rule['arg']
+        chunks = [np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+                  for rows in read_chunks(parent_table, [pk], chunk_rows=chunk_rows)]
+        keys = np.sort(np.concatenate(chunks)) if chunks else np.empty(0, dtype=np.int64)
+        parent_keys[(parent_table, pk)] = keys.astype(np.int32) if not len(keys) or keys[-1] <= INT32_MAX else keys
+    return parent_keys
+
+
+class ChunkEngine:
+    """Evaluates registry rules in Python: each table is read once in chunks, chunks run in a process pool.
+
+    MySQL only receives plain column reads, plus multi-row INSERTs of the
+    violating keys when quarantining. Use as a context manager so the pool
+    is shut down.
+    """
+
+    def __init__(self, rules, workers=CHUNK_WORKERS, chunk_rows=CHUNK_ROWS):
+        self.chunk_rows = chunk_rows
+        self.workers = workers
+        started = time.perf_counter()
+        parent_keys = load_parent_keys(rules, chunk_rows)
+        print(f"Parent keys of {len(parent_keys)} tables loaded in {time.perf_counter() - started:.2f}s")
+        # Workers start on the first submit, from a check-executor thread; forking a process whose other
+        # threads hold the pool's locks can deadlock the child, so they come from a fork server instead
+        self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('forkserver'),
+                                        initializer=init_worker, initargs=(parent_keys,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    def run_table(self, table, table_rules, bounds=None, run_id=None):
+        """One pass over a table; returns its rows in the shape of check_registry.result_row.
+
+        With a run_id the violating rows of failing rules are quarantined from
+        the keys found here, so no rule predicate is ever sent to MySQL.
+        """
+        pk = WATERMARK_COLUMNS[table]
+        columns = [pk] + sorted({rule['column'] for rule in table_rules} - {pk})
+        categories = {rule['column'] for rule in table_rules if rule['kind'] == 'enum'}
+        scope = tuple(bounds[table][:2]) if bounds and table in bounds else None
+        unique_rules = [rule for rule in table_rules if rule['kind'] == 'unique']
+        where, params = '1 = 1', ()
+        if scope is not None and not unique_rules:
+            # Without uniqueness rules the rows outside the increment are not needed at all
+            where, params = scope_predicate(table, bounds)
+            scope = None
+        counts = {rule['seq']: 0 for rule in table_rules}
+        quarantined = {rule['seq']: 0 for rule in table_rules}
+        by_seq = {rule['seq']: rule for rule in table_rules}
+        in_flight = deque()
+        with tempfile.TemporaryDirectory(prefix='dq-chunks-') as spill_dir:
+            pairs = {}
+            if unique_rules:
+                # (hash, key) pairs spill to disk by hash prefix, so memory stays bounded whatever the table size
+                bits = partition_bits(max_key(table, pk))
+                pairs = {rule['seq']: PartitionedPairs(os.path.join(spill_dir, str(rule['seq'])), bits=bits)
+                         for rule in unique_rules}
+                for seq in pairs:
+                    os.makedirs(os.path.join(spill_dir, str(seq)))
+
+            def collect(future):
+                chunk_counts, chunk_pairs, chunk_keys = future.result()
+                for seq, count in chunk_counts.items():
+                    counts[seq] += count
+                for seq, (hashes, keys) in chunk_pairs.items():
+                    pairs[seq].add(hashes, keys)
+                for seq, keys in chunk_keys.items():
+                    quarantined[seq] += quarantine.quarantine_keys(run_id, rule_id(by_seq[seq]), table, keys)
+
+            for rows in read_chunks(table, columns, where, params, self.chunk_rows):
+                if len(in_flight) >= 2 * self.workers:
+                    collect(in_flight.popleft())
+                in_flight.append(self.pool.submit(evaluate_chunk, columns, rows, table_rules, scope, categories,
+                                                  run_id is not None))
+            while in_flight:
+                collect(in_flight.popleft())
+            for seq, rule_pairs in pairs.items():
+                counts[seq], keys = unique_violations(rule_pairs, scope, run_id is not None)
+                for part in keys:
+                    quarantined[seq] += quarantine.quarantine_keys(run_id, rule_id(by_seq[seq]), table, part)
+        rows = []
+        for rule in table_rules:
+            row = result_row(rule, counts[rule['seq']])
+            if run_id is not None and row['Status'] == 'FAIL':
+                row['Details'] += f" ({quarantined[rule['seq']]} rows quarantined as {rule_id(rule)})"
+            rows.append(row)
+        return rows
+
+    def units(self, rules, bounds=None, run_id=None):
+        """One CheckUnit per table, like check_registry.planned_units."""
+        return [
+            CheckUnit(f'Chunk Scan {table}', partial(self.run_table, table, table_rules, bounds, run_id),
+                      {'Table': table, 'Column': '*', 'Check': 'Chunk Scan', '_seq': table_rules[0]['seq']})
+            for table, table_rules in group_by_table(rules).items()
+        ]
+
+
+def run_chunk_checks(rules=None, bounds=None, workers=CHUNK_WORKERS, max_workers=2):
+    """Evaluate every registry rule with the chunk engine."""
+    expanded = expand_rules(rules)
+    with ChunkEngine(expanded, workers) as engine:
+        checks, _, _ = execute_checks(engine.units(expanded, bounds), max_workers=max_workers)
+    return order_rows(checks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the DQ rules over pandas chunks in a process pool")
+    parser.add_argument("--workers", type=int, default=CHUNK_WORKERS)
+    parser.add_argument("--rules", default=None, help="YAML rules file (defaults to the built-in RULES)")
+    args = parser.parse_args()
+    for row in run_chunk_checks(load_rules(args.rules), workers=args.workers):
+        print(row)
@@ -0,0 +1,186 @@
+# /src/data_files.py
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import time
+from datetime import datetime, date
+
+from db import connect_direct
+from generate_data import (
+    TABLE_COLUMNS, PRIMARY_KEYS, plan_shards, build_shard, run_shards, merge_shard_stats,
+    first_free_ids, report_rate
+)
+
+# Parents before children; AuthenticationLog.TransactionID is back-filled after PaymentTransaction.
+LOAD_ORDER = ['Customer', 'BankAccount', 'Card', 'Merchant', 'Device', 'AuthenticationLog', 'PaymentTransaction',
+              'FraudAlert']
+BACKFILL = 'AuthenticationLog.TransactionID'
+MANIFEST = 'manifest.json'
+
+
+def tsv_value(value):
+    """Encode one value for LOAD DATA's default format (tab separated, backslash escaped, \\N for NULL)."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, str):
+        return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+    return str(value)
+
+
+def write_tsv(path, rows, chunk_size=10000):
+    """Stream row tuples to a TSV file, chunk_size lines at a time; returns the row count."""
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        chunk = []
+        for row in rows:
+            chunk.append('\t'.join(tsv_value(v) for v in row) + '\n')
+            if len(chunk) >= chunk_size:
+                f.writelines(chunk)
+                count += len(chunk)
+                chunk = []
+        f.writelines(chunk)
+        count += len(chunk)
+    return count
+
+
+def shard_file(data_dir, table, shard):
+    return os.path.join(data_dir, f"{table}.{shard:03d}.tsv")
+
+
+def shard_files(data_dir, table):
+    """The existing shard files of a table (or of BACKFILL) in data_dir, in shard order."""
+    name = re.compile(re.escape(table) + r'\.\d{3,}\.tsv')
+    paths = [path for path in glob.glob(os.path.join(glob.escape(data_dir), f"{glob.escape(table)}.*.tsv"))
+             if name.fullmatch(os.path.basename(path))]
+    return sorted(paths, key=lambda path: int(os.path.basename(path)[len(table) + 1:-4]))
+
+
+def export_shard(plan, seed, as_of, data_dir, engine='vector'):
+    """Write one shard's tables and back-fill pairs as TSV files; returns per-table stats."""
+    def write(table, rows):
+        return write_tsv(shard_file(data_dir, table, plan['shard']), rows)
+
+    def backfill(updates):
+        write_tsv(shard_file(data_dir, BACKFILL, plan['shard']),
+                  ((auth_log_id, transaction_id) for transaction_id, auth_log_id in updates))
+
+    return build_shard(plan, seed, as_of, engine, write, backfill)
+
+
+def export_dataset(data_dir, scale_factor=1, workers=1, seed=None, as_of=None, engine='vector', first_ids=None):
+    """Generate a dataset into data_dir as per-shard TSV files plus a manifest.
+
+    IDs start at 1 unless first_ids is given, so the files can be loaded as a
+    fixture into a fresh database. Memory is bounded by the generator chunk
+    size, not by the dataset size.
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    if as_of is None:
+        as_of = datetime.now().replace(microsecond=0)
+    if first_ids is None:
+        first_ids = {table: 1 for table in PRIMARY_KEYS}
+    os.makedirs(data_dir, exist_ok=True)
+    # Drop shard files of an earlier export so a smaller worker count leaves no stale shards behind;
+    # other files in data_dir are left alone
+    for table in LOAD_ORDER + [BACKFILL]:
+        for path in shard_files(data_dir, table):
+            os.remove(path)
+    print(f"export: scale_factor={scale_factor}, workers={workers}, seed={seed}, as_of={as_of}, engine={engine}")
+
+    plans = plan_shards(scale_factor, workers, first_ids)
+    started = time.perf_counter()
+    stats = merge_shard_stats(run_shards(export_shard, plans, seed, workers, as_of, data_dir, engine))
+    with open(os.path.join(data_dir, MANIFEST), 'w') as f:
+        json.dump({"scale_factor": scale_factor, "workers": workers, "seed": seed, "as_of": as_of.isoformat(),
+                   "engine": engine, "first_ids": first_ids,
+                   "rows": {table: s["rows"] for table, s in stats.items()}}, f, indent=2)
+    print(f"Dataset exported to {data_dir} in {time.perf_counter() - started:.2f}s.")
+    return stats
+
+
+def sql_string(value):
+    """Quote a value as a MySQL string literal (for statements such as LOAD DATA that take no parameters)."""
+    return "'" + value.replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+
+def load_data_sql(path, table, columns):
+    return (f"LOAD DATA LOCAL INFILE {sql_string(os.path.abspath(path))} INTO TABLE `{table}` "
+            f"CHARACTER SET utf8mb4 FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' "
+            f"({', '.join(f'`{c}`' for c in columns)})")
+
+
+def load_dataset(data_dir):
+    """Ingest an exported dataset with LOAD DATA LOCAL INFILE in dependency order.
+
+    The AuthenticationLog.TransactionID back-fill is staged in a temporary
+    table and applied with a single UPDATE ... JOIN. The server needs
+    local_infile=ON.
+    """
+    conn = connect_direct(allow_local_infile=True)
+    cur = conn.cursor()
+    stats = {}
+
+    for table in LOAD_ORDER:
+        started = time.perf_counter()
+        rows = 0
+        for path in shard_files(data_dir, table):
+            cur.execute(load_data_sql(path, table, TABLE_COLUMNS[table]))
+            rows += cur.rowcount
+        conn.commit()
+        report_rate(stats, table, rows, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    cur.execute("""
+        CREATE TEMPORARY TABLE `AuthLogBackfill` (
+            `AuthLogID` BIGINT UNSIGNED PRIMARY KEY,
+            `TransactionID` BIGINT UNSIGNED NOT NULL
+        )
+    """)
+    for path in shard_files(data_dir, BACKFILL):
+        cur.execute(load_data_sql(path, 'AuthLogBackfill', ['AuthLogID', 'TransactionID']))
+    cur.execute("""
+        UPDATE `AuthenticationLog` al
+        JOIN `AuthLogBackfill` b ON al.`AuthLogID` = b.`AuthLogID`
+        SET al.`TransactionID` = b.`TransactionID`
+    """)
+    report_rate(stats, BACKFILL, cur.rowcount, time.perf_counter() - started)
+    cur.execute("DROP TEMPORARY TABLE `AuthLogBackfill`")
+    conn.commit()
+
+    cur.close()
+    conn.close()
+    print(f"Dataset loaded from {data_dir}.")
+    return stats
+
+
+def generate_data_via_files(data_dir, scale_factor=1, workers=1, seed=None, as_of=None, engine='vector'):
+    """Export a dataset whose IDs continue after the current data, then LOAD DATA it."""
+    export_dataset(data_dir, scale_factor, workers, seed, as_of, engine, first_ids=first_free_ids())
+    return load_dataset(data_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export synthetic data to TSV fixtures or load them with LOAD DATA")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export_parser = sub.add_parser("export", help="generate a dataset into TSV files")
+    export_parser.add_argument("data_dir")
+    export_parser.add_argument("--scale-factor", type=float, default=1)
+    export_parser.add_argument("--workers", type=int, default=1)
+    export_parser.add_argument("--seed", type=int, default=None)
+    export_parser.add_argument("--as-of", type=datetime.fromisoformat, default=None)
+    export_parser.add_argument("--engine", choices=["faker", "vector"], default="vector")
+    load_parser = sub.add_parser("load", help="load an exported dataset into the database")
+    load_parser.add_argument("data_dir")
+    args = parser.parse_args()
+    if args.command == "export":
+        export_dataset(args.data_dir, args.scale_factor, args.workers, args.seed, args.as_of, args.engine)
+    else:
+        load_dataset(args.data_dir)
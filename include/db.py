@@ -0,0 +1,288 @@
+# /src/db.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector import pooling
+
+from instrumentation import instrument
+
+# Airflow Connection used when running inside Airflow; env vars are the fallback.
+DB_CONN_ID = os.environ.get("BANKING_DB_CONN_ID", "banking_mysql")
+POOL_SIZE = int(os.environ.get("BANKING_DB_POOL_SIZE", "5"))
+# Pool size in a task that runs a single check unit (Airflow mapped tasks). mysql.connector opens
+# every pooled connection up front, so each task process would otherwise hold POOL_SIZE connections.
+TASK_POOL_SIZE = int(os.environ.get("BANKING_DB_TASK_POOL_SIZE", "2"))
+POOL_TIMEOUT = float(os.environ.get("BANKING_DB_POOL_TIMEOUT", "30"))
+
+
+def get_db_params():
+    """Connection parameters from the Airflow Connection DB_CONN_ID, else BANKING_DB_* env vars."""
+    try:
+        from airflow.exceptions import AirflowNotFoundException
+        from airflow.hooks.base import BaseHook
+    except ImportError:
+        reason = "Airflow is not installed"
+    else:
+        try:
+            conn = BaseHook.get_connection(DB_CONN_ID)
+        except AirflowNotFoundException:
+            reason = f"Airflow connection {DB_CONN_ID!r} is not defined"
+        else:
+            print(f"DB connection from Airflow connection {DB_CONN_ID!r}")
+            return {
+                "database": conn.schema,
+                "user": conn.login,
+                "password": conn.password,
+                "host": conn.host,
+                "port": conn.port or 3306
+            }
+    print(f"DB connection from BANKING_DB_* env vars: {reason}")
+    return {
+        "database": os.environ.get("BANKING_DB_NAME", "test"),
+        "user": os.environ.get("BANKING_DB_USER", "anhquan"),
+        "password": os.environ.get("BANKING_DB_PASSWORD", "123"),
+        "host": os.environ.get("BANKING_DB_HOST", "172.19.0.3"),
+        "port": int(os.environ.get("BANKING_DB_PORT", "3306"))
+    }
+
+
+class PooledConnection:
+    """Connection checked out of the shared pool; close() hands it back."""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+        self.scope = None
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        """Cursor whose statements are recorded by instrumentation (unless BANKING_DQ_INSTRUMENT=0)."""
+        return instrument(self._conn.cursor(*args, **kwargs), self._conn)
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            if self.scope is not None:
+                self.scope.discard(self)
+            self._pool.release(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ConnectionPool:
+    """Bounded pool on top of mysql.connector.pooling with blocking checkout and usage stats.
+
+    MySQLConnectionPool raises as soon as it is exhausted, so checkouts are
+    gated by a semaphore of the same size: callers wait up to `timeout`
+    seconds for a free connection and the wait is recorded.
+    """
+
+    def __init__(self, size=POOL_SIZE, timeout=POOL_TIMEOUT, **params):
+        self.size = size
+        self.timeout = timeout
+        self._pool = pooling.MySQLConnectionPool(pool_name=f"banking_{os.getpid()}", pool_size=size,
+                                                 pool_reset_session=True, **params)
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def get_connection(self):
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No database connection free after {self.timeout}s (pool size {self.size})")
+        waited = time.perf_counter() - started
+        try:
+            conn = self._pool.get_connection()
+            # Health check: reconnect connections the server has dropped while idle
+            conn.ping(reconnect=True, attempts=2, delay=1)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            self.checkouts += 1
+            if waited > 0.001:
+                self.waits += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        try:
+            conn.close()
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pool_size": self.size,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "saturation": round(self.peak_in_use / self.size, 2),
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "max_wait_seconds": round(self.max_wait_seconds, 3),
+            }
+
+
+_pool = None
+_pool_pid = None
+_pool_size = POOL_SIZE
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The process-wide pool, created lazily (and again after a fork, e.g. in generator workers)."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ConnectionPool(size=_pool_size, **get_db_params())
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def set_pool_size(size):
+    """Size of the process-wide pool; an idle pool of another size is replaced on next use."""
+    global _pool, _pool_size
+    with _pool_lock:
+        _pool_size = size
+        if _pool is not None and _pool.size != size and _pool.in_use == 0:
+            _pool = None
+
+
+_local = threading.local()
+
+
+class StatementScope:
+    """Connections checked out under one statement_timeout, so a timed-out check can be stopped server-side."""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.cancelled = False
+        self._connection_ids = {}
+        self._lock = threading.Lock()
+
+    def add(self, conn):
+        with self._lock:
+            if self.cancelled:
+                raise TimeoutError(f"Check timed out after {self.timeout:.0f}s")
+            self._connection_ids[id(conn)] = conn.connection_id
+
+    def discard(self, conn):
+        with self._lock:
+            self._connection_ids.pop(id(conn), None)
+
+    def cancel(self):
+        """KILL QUERY the statements running on the scope's connections; later checkouts raise TimeoutError."""
+        with self._lock:
+            self.cancelled = True
+            connection_ids = list(self._connection_ids.values())
+        if connection_ids:
+            kill_queries(connection_ids)
+
+
+def kill_queries(connection_ids):
+    """KILL QUERY on each server connection id, over a separate connection (the pool may be exhausted)."""
+    conn = connect_direct()
+    cur = conn.cursor()
+    for connection_id in connection_ids:
+        try:
+            cur.execute(f"KILL QUERY {int(connection_id)}")
+        except mysql.connector.Error as e:
+            # The statement or connection finished in the meantime
+            print(f"KILL QUERY {connection_id} failed: {e}")
+    cur.close()
+    conn.close()
+
+
+@contextmanager
+def statement_timeout(seconds):
+    """Cap SELECTs on connections checked out by this thread (MySQL MAX_EXECUTION_TIME).
+
+    Yields the StatementScope of the block; its cancel() kills the statements
+    still running on those connections, including non-SELECTs.
+    """
+    previous = getattr(_local, "scope", None)
+    _local.scope = StatementScope(seconds)
+    try:
+        yield _local.scope
+    finally:
+        _local.scope = previous
+
+
+def connect_db():
+    """Check a connection out of the shared pool; conn.close() returns it."""
+    conn = get_pool().get_connection()
+    scope = getattr(_local, "scope", None)
+    if scope is not None:
+        try:
+            scope.add(conn)
+        except TimeoutError:
+            conn.close()
+            raise
+        conn.scope = scope
+        if scope.timeout:
+            # Session variables are reset when the connection goes back to the pool
+            cur = conn.cursor()
+            cur.execute("SET SESSION MAX_EXECUTION_TIME = %s", (int(scope.timeout * 1000),))
+            cur.close()
+    return conn
+
+
+@contextmanager
+def cursor(commit=False):
+    """Pooled connection + cursor for one unit of work."""
+    conn = connect_db()
+    cur = conn.cursor()
+    try:
+        yield cur
+        if commit:
+            conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+
+
+def connect_direct(**options):
+    """Unpooled connection for special sessions (e.g. allow_local_infile for LOAD DATA)."""
+    return mysql.connector.connect(**get_db_params(), **options)
+
+
+def check_health():
+    """Round-trip SELECT 1 through the pool; returns the latency in seconds."""
+    started = time.perf_counter()
+    with cursor() as cur:
+        cur.execute("SELECT 1")
+        cur.fetchone()
+    return time.perf_counter() - started
+
+
+def pool_stats():
+    return get_pool().stats()
+
+
+def print_pool_stats():
+    stats = pool_stats()
+    print(f"DB pool: size={stats['pool_size']}, peak in use={stats['peak_in_use']} "
+          f"(saturation {stats['saturation']:.0%}), {stats['checkouts']} checkouts, "
+          f"{stats['waits']} waited {stats['wait_seconds']:.3f}s total (max {stats['max_wait_seconds']:.3f}s)")
+    return stats
@@ -0,0 +1,588 @@
+# /src/drift_sketches.py
+import argparse
+import json
+import math
+import os
+import time
+import traceback
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from db import connect_db
+from watermarks import STATE_TABLE, WATERMARK_COLUMNS, ensure_state_table
+
+# One row of JSON sketches per profiled table and day, kept next to the watermark that bounds them.
+PROFILE_TABLE = 'DQDriftProfile'
+# Days before the profiled day that are merged into the baseline.
+BASELINE_DAYS = int(os.environ.get("BANKING_DQ_DRIFT_BASELINE_DAYS", "28"))
+# Drift is only scored when both today and the baseline have this many rows in a segment.
+MIN_ROWS = int(os.environ.get("BANKING_DQ_DRIFT_MIN_ROWS", "200"))
+# A numeric distribution drifts when its Kolmogorov-Smirnov distance exceeds this and the 95% critical value.
+KS_THRESHOLD = float(os.environ.get("BANKING_DQ_DRIFT_KS", "0.1"))
+# A categorical distribution drifts when its population stability index exceeds this.
+PSI_THRESHOLD = float(os.environ.get("BANKING_DQ_DRIFT_PSI", "0.2"))
+CHUNK_ROWS = int(os.environ.get("BANKING_DQ_DRIFT_CHUNK_ROWS", "50000"))
+COMPRESSION = 200
+ALL = 'ALL'
+NONE = '(none)'
+# Day a row is profiled into, selected by the profile queries of tables with a date column; rows of
+# other tables (and rows without a date) go to the day of the run.
+DATE_COLUMN = 'ProfileDate'
+
+# Rows are read by the primary key of the first table only, so a day costs as much as its new rows;
+# the joined tables are primary key lookups that only supply segment columns.
+PROFILES = {
+    'PaymentTransaction': {
+        'sql': """
+            SELECT pt.`Amount`, pt.`TransactionType`, m.`Category`, pt.`Status`, pt.`RiskTag`,
+                   DATE(pt.`TransactionDate`) AS `ProfileDate`
+            FROM `PaymentTransaction` pt
+            LEFT JOIN `Merchant` m ON pt.`MerchantID` = m.`MerchantID`
+            WHERE pt.`TransactionID` > %s AND pt.`TransactionID` <= %s
+        """,
+        'numeric': ['Amount'],
+        'categorical': ['TransactionType', 'Status', 'RiskTag'],
+        'segments': ['TransactionType', 'Category'],
+    },
+    'Merchant': {
+        'sql': """
+            SELECT m.`RiskScore`, m.`Category`
+            FROM `Merchant` m
+            WHERE m.`MerchantID` > %s AND m.`MerchantID` <= %s
+        """,
+        'numeric': ['RiskScore'],
+        'categorical': ['Category'],
+        'segments': ['Category'],
+    },
+    'FraudAlert': {
+        'sql': """
+            SELECT fa.`RiskScore`, pt.`TransactionType`, m.`Category`, fa.`AlertType`, fa.`Status`, fa.`RiskTag`,
+                   DATE(fa.`AlertDate`) AS `ProfileDate`
+            FROM `FraudAlert` fa
+            LEFT JOIN `PaymentTransaction` pt ON fa.`TransactionID` = pt.`TransactionID`
+            LEFT JOIN `Merchant` m ON pt.`MerchantID` = m.`MerchantID`
+            WHERE fa.`AlertID` > %s AND fa.`AlertID` <= %s
+        """,
+        'numeric': ['RiskScore'],
+        'categorical': ['AlertType', 'Status', 'RiskTag'],
+        'segments': ['TransactionType', 'Category'],
+    },
+}
+
+
+class TDigest:
+    """Merging t-digest: quantiles and CDF of a numeric column in O(compression) space.
+
+    Values are buffered and folded into the centroids in batches; two digests
+    merge by re-compressing their combined centroids.
+    """
+
+    def __init__(self, compression=COMPRESSION, means=(), weights=(), low=math.inf, high=-math.inf):
+        self.compression = compression
+        self.means = np.asarray(means, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.low, self.high = low, high
+        self._buffer = []
+
+    @property
+    def count(self):
+        self._compress()
+        return float(self.weights.sum())
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self._buffer.append(values)
+            self.low, self.high = min(self.low, values.min()), max(self.high, values.max())
+        if sum(len(part) for part in self._buffer) > 20 * self.compression:
+            self._compress()
+        return self
+
+    def merge(self, other):
+        other._compress()
+        self._buffer.append((other.means, other.weights))
+        self.low, self.high = min(self.low, other.low), max(self.high, other.high)
+        self._compress()
+        return self
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        parts = [part if isinstance(part, tuple) else (part, np.ones(len(part))) for part in self._buffer]
+        self._buffer = []
+        means = np.concatenate([self.means] + [part[0] for part in parts])
+        weights = np.concatenate([self.weights] + [part[1] for part in parts])
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        # k1 scale function: centroids spanning less than one unit of k, so small ones at the tails
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = np.floor(self.compression / (2 * np.pi) * np.arcsin(2 * q - 1) + self.compression / 4)
+        _, bucket = np.unique(k, return_inverse=True)
+        merged = np.bincount(bucket, weights=weights)
+        self.means = np.bincount(bucket, weights=means * weights) / merged
+        self.weights = merged
+
+    def _positions(self):
+        self._compress()
+        return np.cumsum(self.weights) - self.weights / 2
+
+    def quantile(self, q):
+        positions = self._positions()
+        if not len(positions):
+            return math.nan
+        total = self.weights.sum()
+        return float(np.interp(q * total, np.concatenate(([0], positions, [total])),
+                               np.concatenate(([self.low], self.means, [self.high]))))
+
+    def cdf(self, x):
+        positions = self._positions()
+        if not len(positions):
+            return np.full(np.shape(x), math.nan)
+        total = self.weights.sum()
+        return np.interp(x, np.concatenate(([self.low], self.means, [self.high])),
+                         np.concatenate(([0], positions, [total]))) / total
+
+    def to_dict(self):
+        self._compress()
+        return {'compression': self.compression, 'means': self.means.tolist(), 'weights': self.weights.tolist(),
+                'low': self.low if len(self.means) else None, 'high': self.high if len(self.means) else None}
+
+    @classmethod
+    def from_dict(cls, data):
+        low, high = data['low'], data['high']
+        return cls(data['compression'], data['means'], data['weights'],
+                   math.inf if low is None else low, -math.inf if high is None else high)
+
+
+class CountMin:
+    """Count-min sketch of a categorical column, plus the first max_keys distinct values seen.
+
+    Frequencies are over-estimated by at most ~e/width of the total with
+    probability 1 - e^-depth; the key list lets two sketches be compared
+    without knowing the categories in advance.
+    """
+
+    def __init__(self, width=1024, depth=4, table=None, keys=(), max_keys=256):
+        self.width, self.depth, self.max_keys = width, depth, max_keys
+        self.table = np.zeros((depth, width), dtype=np.int64) if table is None else np.asarray(table, dtype=np.int64)
+        self.keys = list(keys)
+
+    @property
+    def count(self):
+        return int(self.table[0].sum())
+
+    def _buckets(self, values):
+        values = np.asarray(values, dtype=object)
+        return [pd.util.hash_array(values, hash_key=f"countmin-row{row:04d}", categorize=False) % self.width
+                for row in range(self.depth)]
+
+    def update(self, values):
+        values = pd.Series(values, dtype=object).fillna(NONE).astype(str)
+        if not len(values):
+            return self
+        # Hash each distinct value once and add its count
+        value_counts = values.value_counts()
+        for row, buckets in enumerate(self._buckets(value_counts.index.to_numpy())):
+            np.add.at(self.table[row], buckets, value_counts.to_numpy())
+        self._add_keys(value_counts.index)
+        return self
+
+    def _add_keys(self, keys):
+        known = set(self.keys)
+        for key in keys:
+            if len(self.keys) >= self.max_keys:
+                break
+            if key not in known:
+                self.keys.append(key)
+                known.add(key)
+
+    def merge(self, other):
+        self.table += other.table
+        self._add_keys(other.keys)
+        return self
+
+    def estimate(self, keys):
+        if not len(keys):
+            return np.zeros(0, dtype=np.int64)
+        return np.min([self.table[row][buckets] for row, buckets in enumerate(self._buckets(list(keys)))], axis=0)
+
+    def to_dict(self):
+        return {'width': self.width, 'depth': self.depth, 'table': self.table.tolist(), 'keys': self.keys}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['width'], data['depth'], data['table'], data['keys'])
+
+
+class Moments:
+    """Count, mean, central moments up to the fourth, min and max; merged with Pebay's pairwise formulas."""
+
+    def __init__(self, n=0, mean=0.0, m2=0.0, m3=0.0, m4=0.0, low=math.inf, high=-math.inf):
+        self.n, self.mean, self.m2, self.m3, self.m4 = n, mean, m2, m3, m4
+        self.low, self.high = low, high
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        mean = values.mean()
+        deviations = values - mean
+        return self.merge(Moments(len(values), mean, (deviations ** 2).sum(), (deviations ** 3).sum(),
+                                  (deviations ** 4).sum(), values.min(), values.max()))
+
+    def merge(self, other):
+        na, nb = self.n, other.n
+        if not nb:
+            return self
+        if not na:
+            self.__dict__.update(other.__dict__)
+            return self
+        n = na + nb
+        delta = other.mean - self.mean
+        m2 = self.m2 + other.m2 + delta ** 2 * na * nb / n
+        m3 = (self.m3 + other.m3 + delta ** 3 * na * nb * (na - nb) / n ** 2
+              + 3 * delta * (na * other.m2 - nb * self.m2) / n)
+        m4 = (self.m4 + other.m4 + delta ** 4 * na * nb * (na ** 2 - na * nb + nb ** 2) / n ** 3
+              + 6 * delta ** 2 * (na ** 2 * other.m2 + nb ** 2 * self.m2) / n ** 2
+              + 4 * delta * (na * other.m3 - nb * self.m3) / n)
+        self.n, self.mean, self.m2, self.m3, self.m4 = n, self.mean + delta * nb / n, m2, m3, m4
+        self.low, self.high = min(self.low, other.low), max(self.high, other.high)
+        return self
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    @property
+    def skewness(self):
+        return math.sqrt(self.n) * self.m3 / self.m2 ** 1.5 if self.m2 else 0.0
+
+    @property
+    def kurtosis(self):
+        """Excess kurtosis."""
+        return self.n * self.m4 / self.m2 ** 2 - 3 if self.m2 else 0.0
+
+    def to_dict(self):
+        return {'n': self.n, 'mean': self.mean, 'm2': self.m2, 'm3': self.m3, 'm4': self.m4,
+                'low': self.low if self.n else None, 'high': self.high if self.n else None}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['n'], data['mean'], data['m2'], data['m3'], data['m4'],
+                   math.inf if data['low'] is None else data['low'],
+                   -math.inf if data['high'] is None else data['high'])
+
+
+class Profile:
+    """Sketches of one table's new rows, per segment ('ALL', 'TransactionType=POS', ...) and column."""
+
+    def __init__(self, table, segments=None):
+        self.table = table
+        self.segments = segments or {}
+
+    def sketches(self, segment):
+        if segment not in self.segments:
+            spec = PROFILES[self.table]
+            sketches = {column: {'digest': TDigest(), 'moments': Moments()} for column in spec['numeric']}
+            sketches.update({column: {'frequencies': CountMin()} for column in spec['categorical']})
+            self.segments[segment] = sketches
+        return self.segments[segment]
+
+    def update(self, frame):
+        """Fold one chunk of rows into the ALL segment and the segment of each row."""
+        spec = PROFILES[self.table]
+        groups = [(ALL, frame)]
+        for column in spec['segments']:
+            groups += [(f"{column}={value}", rows)
+                       for value, rows in frame.groupby(frame[column].fillna(NONE).astype(str), sort=False)]
+        for segment, rows in groups:
+            sketches = self.sketches(segment)
+            for column in spec['numeric']:
+                values = pd.to_numeric(rows[column], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+                sketches[column]['digest'].update(values)
+                sketches[column]['moments'].update(values)
+            for column in spec['categorical']:
+                sketches[column]['frequencies'].update(rows[column])
+        return self
+
+    def merge(self, other):
+        for segment, sketches in other.segments.items():
+            mine = self.sketches(segment)
+            for column, kinds in sketches.items():
+                for kind, sketch in kinds.items():
+                    mine[column][kind].merge(sketch)
+        return self
+
+    def to_dict(self):
+        return {'table': self.table, 'segments': {
+            segment: {column: {kind: sketch.to_dict() for kind, sketch in kinds.items()}
+                      for column, kinds in sketches.items()}
+            for segment, sketches in self.segments.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        kinds = {'digest': TDigest, 'moments': Moments, 'frequencies': CountMin}
+        return cls(data['table'], {
+            segment: {column: {kind: kinds[kind].from_dict(sketch) for kind, sketch in sketch_kinds.items()}
+                      for column, sketch_kinds in sketches.items()}
+            for segment, sketches in data['segments'].items()})
+
+
+def ensure_profile_table(cur):
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS `{PROFILE_TABLE}` (
+            `TableName` VARCHAR(64) NOT NULL,
+            `ProfileDate` DATE NOT NULL,
+            `Sketches` LONGTEXT NOT NULL,
+            `UpdatedAt` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (`TableName`, `ProfileDate`)
+        )
+    """)
+
+
+def load_profiles(cur, table, first, last):
+    """ProfileDate -> Profile of `table` for the days in [first, last]."""
+    cur.execute(f"""
+        SELECT `ProfileDate`, `Sketches` FROM `{PROFILE_TABLE}`
+        WHERE `TableName` = %s AND `ProfileDate` BETWEEN %s AND %s
+    """, (table, first, last))
+    return {day: Profile.from_dict(json.loads(sketches)) for day, sketches in cur.fetchall()}
+
+
+def save_profile(cur, profile, day):
+    cur.execute(f"""
+        INSERT INTO `{PROFILE_TABLE}` (`TableName`, `ProfileDate`, `Sketches`) VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE `Sketches` = VALUES(`Sketches`)
+    """, (profile.table, day, json.dumps(profile.to_dict())))
+
+
+def baseline_profile(cur, table, day, days=BASELINE_DAYS):
+    """The daily profiles of the `days` days before `day` merged into one; (None, 0) when there are none."""
+    profiles = load_profiles(cur, table, day - timedelta(days=days), day - timedelta(days=1))
+    if not profiles:
+        return None, 0
+    baseline = Profile(table)
+    for profile in profiles.values():
+        baseline.merge(profile)
+    return baseline, len(profiles)
+
+
+def mark_name(table):
+    return f"Drift:{table}"
+
+
+def profile_new_rows(table, day=None, chunk_rows=CHUNK_ROWS):
+    """Sketch the rows of `table` added since its last profiling into the daily profiles.
+
+    Each row goes to the profile of its own date (DATE_COLUMN), so late or
+    back-dated rows land on the day they belong to; tables without a date
+    go to `day`. The touched profiles and the last profiled primary key are
+    written in one transaction, so a failed or retried run never loses or
+    double-counts rows. Returns the number of rows.
+    """
+    day = day or date.today()
+    spec = PROFILES[table]
+    pk = WATERMARK_COLUMNS[table]
+    conn = connect_db()
+    cur = conn.cursor()
+    ensure_state_table(cur)
+    ensure_profile_table(cur)
+    conn.commit()
+    # Serialize concurrent profiling of a table, like spend_summary.summary_lock
+    cur.execute("SELECT GET_LOCK(%s, 600)", (mark_name(table),))
+    if cur.fetchone()[0] != 1:
+        raise RuntimeError(f"Could not lock drift profiling of {table}")
+    try:
+        cur.execute(f"SELECT `LastValue` FROM `{STATE_TABLE}` WHERE `TableName` = %s", (mark_name(table),))
+        row = cur.fetchone()
+        low = int(row[0]) if row and row[0] is not None else 0
+        cur.execute(f"SELECT COALESCE(MAX(`{pk}`), 0) FROM `{table}`")
+        high = int(cur.fetchone()[0])
+        rows = 0
+        profiles = {}
+        if high > low:
+            reader = conn.cursor(buffered=False)
+            reader.execute(spec['sql'], (low, high))
+            columns = [column[0] for column in reader.description]
+            while True:
+                chunk = reader.fetchmany(chunk_rows)
+                if not chunk:
+                    break
+                fold_chunk(pd.DataFrame.from_records(chunk, columns=columns), profiles, table, day)
+                rows += len(chunk)
+            reader.close()
+            # The reader is done, so the existing profiles of the touched days can be read on this connection
+            for profile_day, profile in profiles.items():
+                existing = load_profiles(cur, table, profile_day, profile_day).get(profile_day)
+                save_profile(cur, existing.merge(profile) if existing else profile, profile_day)
+            cur.execute(f"""
+                INSERT INTO `{STATE_TABLE}` (`TableName`, `WatermarkColumn`, `LastValue`)
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE `WatermarkColumn` = VALUES(`WatermarkColumn`), `LastValue` = VALUES(`LastValue`)
+            """, (mark_name(table), pk, high))
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.execute("SELECT RELEASE_LOCK(%s)", (mark_name(table),))
+        cur.fetchall()
+        cur.close()
+        conn.close()
+    print(f"{table}: {rows} new rows ({low}, {high}] profiled into "
+          f"{', '.join(str(profile_day) for profile_day in sorted(profiles)) or day}")
+    return rows
+
+
+def fold_chunk(frame, profiles, table, day):
+    """Fold one chunk into the day -> Profile dict of this run (merged with the stored profiles on save)."""
+    if DATE_COLUMN not in frame:
+        profiles.setdefault(day, Profile(table)).update(frame)
+        return
+    days = frame[DATE_COLUMN].where(frame[DATE_COLUMN].notna(), day)
+    for profile_day, rows in frame.groupby(days, sort=False):
+        profiles.setdefault(profile_day, Profile(table)).update(rows)
+
+
+def ks_distance(today, baseline):
+    """Largest CDF gap between two digests, evaluated at both digests' centroids."""
+    points = np.concatenate((today.means, baseline.means))
+    return float(np.max(np.abs(today.cdf(points) - baseline.cdf(points))))
+
+
+def ks_critical(n, m):
+    """Two-sample KS distance exceeded by chance with 5% probability."""
+    return 1.358 * math.sqrt((n + m) / (n * m))
+
+
+def psi(today, baseline):
+    """Population stability index between two count-min sketches over the categories either has seen."""
+    keys = list(dict.fromkeys(baseline.keys + today.keys))
+    p = np.maximum(today.estimate(keys) / max(today.count, 1), 1e-4)
+    q = np.maximum(baseline.estimate(keys) / max(baseline.count, 1), 1e-4)
+    return float(np.sum((p - q) * np.log(p / q))), keys, p, q
+
+
+def drift_row(table, column, segment, status, score, details):
+    return {'Table': table, 'Column': column, 'Check': 'Distribution Drift', 'Segment': segment,
+            'Status': status, 'Drift Score': score, 'Details': details}
+
+
+def compare_numeric(table, column, segment, today, baseline):
+    digest, moments = today['digest'], today['moments']
+    base_digest, base_moments = baseline['digest'], baseline['moments']
+    if moments.n < MIN_ROWS or base_moments.n < MIN_ROWS:
+        return drift_row(table, column, segment, 'PASS', None,
+                         f"Not scored: {moments.n} rows today, {base_moments.n} in the baseline (min {MIN_ROWS})")
+    ks = ks_distance(digest, base_digest)
+    threshold = max(KS_THRESHOLD, ks_critical(moments.n, base_moments.n))
+    shift = (moments.mean - base_moments.mean) / base_moments.std if base_moments.std else 0.0
+    return drift_row(table, column, segment, 'FAIL' if ks > threshold else 'PASS', round(ks, 4),
+                     f"KS {ks:.3f} (threshold {threshold:.3f}); p50 {base_digest.quantile(0.5):.6g} -> "
+                     f"{digest.quantile(0.5):.6g}, p95 {base_digest.quantile(0.95):.6g} -> {digest.quantile(0.95):.6g}, "
+                     f"mean shift {shift:+.2f} sd, skew {base_moments.skewness:.2f} -> {moments.skewness:.2f}")
+
+
+def compare_categorical(table, column, segment, today, baseline):
+    frequencies, base_frequencies = today['frequencies'], baseline['frequencies']
+    if frequencies.count < MIN_ROWS or base_frequencies.count < MIN_ROWS:
+        return drift_row(table, column, segment, 'PASS', None,
+                         f"Not scored: {frequencies.count} rows today, {base_frequencies.count} in the baseline "
+                         f"(min {MIN_ROWS})")
+    index, keys, p, q = psi(frequencies, base_frequencies)
+    moved = sorted(zip(keys, p - q), key=lambda item: abs(item[1]), reverse=True)[:3]
+    return drift_row(table, column, segment, 'FAIL' if index > PSI_THRESHOLD else 'PASS', round(index, 4),
+                     f"PSI {index:.3f} (threshold {PSI_THRESHOLD}); largest moves: "
+                     + ', '.join(f"{key} {change:+.1%}" for key, change in moved))
+
+
+def compare_profiles(today, baseline):
+    """Drift rows of every segment and column present in both profiles."""
+    spec = PROFILES[today.table]
+    rows = []
+    for segment in sorted(today.segments, key=lambda segment: (segment != ALL, segment)):
+        if segment not in baseline.segments:
+            continue
+        sketches, base_sketches = today.segments[segment], baseline.segments[segment]
+        for column in spec['numeric']:
+            rows.append(compare_numeric(today.table, column, segment, sketches[column], base_sketches[column]))
+        if segment == ALL:
+            for column in spec['categorical']:
+                rows.append(compare_categorical(today.table, column, segment, sketches[column],
+                                                base_sketches[column]))
+        else:
+            # Within a segment the segmenting column itself is constant
+            for column in spec['categorical']:
+                if not segment.startswith(f"{column}="):
+                    rows.append(compare_categorical(today.table, column, segment, sketches[column],
+                                                    base_sketches[column]))
+    return rows
+
+
+def drift_report(table, day=None, days=BASELINE_DAYS):
+    """Compare the profile of `day` with the merged profiles of the `days` days before it."""
+    day = day or date.today()
+    conn = connect_db()
+    cur = conn.cursor()
+    ensure_profile_table(cur)
+    today = load_profiles(cur, table, day, day).get(day)
+    baseline, merged = baseline_profile(cur, table, day, days)
+    cur.close()
+    conn.close()
+    if today is None or baseline is None:
+        print(f"{table}: no {'profile for ' + str(day) if today is None else 'baseline days'}, drift not scored")
+        return []
+    print(f"{table}: {day} compared with a baseline of {merged} days")
+    return compare_profiles(today, baseline)
+
+
+def run_drift_checks(day=None, run_id=None, tables=None, days=BASELINE_DAYS):
+    """Profile every table's new rows, then score the day's drift against the rolling baseline.
+
+    Drift is reported as FAIL rows; a table that cannot be profiled or scored
+    (database or sketch errors) is recorded as ERROR and then raises, after
+    the other tables have run.
+    """
+    from result_history import record_run
+    day = day or date.today()
+    checks, timings = [], []
+    for table in tables or PROFILES:
+        started = time.perf_counter()
+        status = 'PASS'
+        try:
+            profile_new_rows(table, day)
+            checks += drift_report(table, day, days)
+        except Exception as e:
+            traceback.print_exc()
+            status = 'ERROR'
+            checks.append(drift_row(table, '*', ALL, 'ERROR', None, f"Drift profiling failed: {e}"))
+        timings.append({'Check': f'Drift Profile {table}', 'Status': status,
+                        'Elapsed (s)': round(time.perf_counter() - started, 3)})
+    if checks:
+        print(pd.DataFrame(checks).to_string(index=False))
+    record_run('banking_drift', run_id or f"drift_{day.isoformat()}", checks, timings)
+    failed = [timing['Check'] for timing in timings if timing['Status'] == 'ERROR']
+    if failed:
+        # Drift findings are reported as rows; a table that could not be profiled fails the run
+        raise RuntimeError(f"Drift profiling failed for {', '.join(failed)} (see the errors above)")
+    return checks
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile new rows into daily sketches and score distribution drift")
+    parser.add_argument("command", choices=["run", "report"], help="run profiles new rows first; report only compares")
+    parser.add_argument("--day", default=None, help="YYYY-MM-DD (defaults to today)")
+    parser.add_argument("--days", type=int, default=BASELINE_DAYS, help="baseline days")
+    parser.add_argument("--table", action="append", choices=sorted(PROFILES), default=None)
+    args = parser.parse_args()
+    day = date.fromisoformat(args.day) if args.day else None
+    if args.command == "run":
+        run_drift_checks(day, tables=args.table, days=args.days)
+    else:
+        rows = [row for table in args.table or PROFILES for row in drift_report(table, day, args.days)]
+        print(pd.DataFrame(rows).to_string(index=False) if rows else "(no drift scored)")
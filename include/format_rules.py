@@ -0,0 +1,103 @@
+# /src/format_rules.py
+import re
+
+from db import connect_db
+from watermarks import scope_predicate
+
+# Patterns use the syntax shared by Python `re` and MySQL REGEXP ([0-9] rather than \d),
+# so both strategies agree on what is valid. NULLs are not format violations.
+FORMAT_RULES = {
+    'cccd': {'table': 'Customer', 'key': 'CustomerID', 'column': 'CCCD_Passport', 'label': 'CCCD',
+             'pattern': r'^[0-9]{12}$'},
+    'email': {'table': 'Customer', 'key': 'CustomerID', 'column': 'Email', 'label': 'Email',
+              'pattern': r'^[^@ ]+@[^@ ]+\.[^@ ]+$'},
+    'phone': {'table': 'Customer', 'key': 'CustomerID', 'column': 'Phone', 'label': 'Phone',
+              'pattern': r'^[0-9+().x -]{7,25}$'},
+    'card_number': {'table': 'Card', 'key': 'CardID', 'column': 'CardNumber', 'label': 'CardNumber',
+                    'pattern': r'^[0-9]{16}$'},
+    'ip_address': {'table': 'Device', 'key': 'DeviceID', 'column': 'IPAddress', 'label': 'IPAddress',
+                   'pattern': r'^([0-9]{1,3}\.){3}[0-9]{1,3}$'},
+}
+
+SAMPLE_SIZE = 10
+CHUNK_SIZE = 10000
+
+
+def count_invalid_sql(rule, sample_size=SAMPLE_SIZE, bounds=None):
+    """Push the pattern down: server-side REGEXP count plus the first sample_size offending keys."""
+    conn = connect_db()
+    cur = conn.cursor()
+    scope, params = scope_predicate(rule['table'], bounds)
+    predicate = f"`{rule['column']}` IS NOT NULL AND NOT (`{rule['column']}` REGEXP %s) AND {scope}"
+    params = (rule['pattern'],) + params
+
+    cur.execute(f"SELECT COUNT(*) FROM `{rule['table']}` WHERE {predicate}", params)
+    invalid_count = cur.fetchone()[0]
+    sample = []
+    if invalid_count:
+        cur.execute(f"""
+            SELECT `{rule['key']}` FROM `{rule['table']}`
+            WHERE {predicate}
+            ORDER BY `{rule['key']}`
+            LIMIT %s
+        """, params + (sample_size,))
+        sample = [row[0] for row in cur.fetchall()]
+
+    cur.close()
+    conn.close()
+    return invalid_count, sample
+
+
+def count_invalid_stream(rule, sample_size=SAMPLE_SIZE, bounds=None, chunk_size=CHUNK_SIZE):
+    """Stream (key, value) rows through an unbuffered cursor and match a precompiled regex.
+
+    Only one chunk of rows is held in memory at a time.
+    """
+    pattern = re.compile(rule['pattern'])
+    conn = connect_db()
+    cur = conn.cursor(buffered=False)
+    invalid_count = 0
+    sample = []
+
+    scope, params = scope_predicate(rule['table'], bounds)
+    cur.execute(f"SELECT `{rule['key']}`, `{rule['column']}` FROM `{rule['table']}` WHERE {scope}", params)
+    while True:
+        rows = cur.fetchmany(chunk_size)
+        if not rows:
+            break
+        for key, value in rows:
+            if value is not None and not pattern.match(value):
+                invalid_count += 1
+                if len(sample) < sample_size:
+                    sample.append(key)
+
+    cur.close()
+    conn.close()
+    return invalid_count, sample
+
+
+STRATEGIES = {
+    'sql': count_invalid_sql,
+    'stream': count_invalid_stream,
+}
+
+
+def check_format(rule_name, strategy='sql', sample_size=SAMPLE_SIZE, bounds=None):
+    """Run one format rule with the 'sql' (REGEXP pushdown) or 'stream' (chunked client-side) strategy.
+
+    bounds (see watermarks.incremental_bounds) limits the rule to new rows.
+    """
+    rule = FORMAT_RULES[rule_name]
+    invalid_count, sample = STRATEGIES[strategy](rule, sample_size=sample_size, bounds=bounds)
+    label = rule['label']
+    if invalid_count:
+        details = f"{invalid_count} invalid {label} formats found (sample {rule['key']}s: {sample})"
+    else:
+        details = f'All {label}s valid'
+    return [{
+        'Table': rule['table'],
+        'Column': rule['column'],
+        'Check': 'Format Check',
+        'Status': 'FAIL' if invalid_count else 'PASS',
+        'Details': details
+    }]
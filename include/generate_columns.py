@@ -0,0 +1,265 @@
+# /src/generate_columns.py
+import numpy as np
+from faker import Faker
+
+from generate_data import (
+    customer_statuses, account_types, card_types, card_statuses, device_types, device_statuses, risk_tags,
+    auth_types, auth_statuses, transaction_types, transaction_statuses, alert_statuses, TABLE_COLUMNS
+)
+
+# Multiplier used by generate_data.unique_digits, split so the modular product fits in int64.
+DIGITS_MULTIPLIER = 6364136223846793007
+ALERT_TYPES = ['Unusual Activity', 'High-Risk Merchant', 'Suspicious Device', 'Failed Authentication']
+MERCHANT_CATEGORIES = ['Retail', 'Food', 'Online', 'Travel']
+
+
+def build_pools(seed, size=1000):
+    """Pre-generate Faker values once; per-row columns are drawn from these pools."""
+    fk = Faker()
+    fk.seed_instance(seed)
+
+    def pool(fn):
+        return np.array([fn() for _ in range(size)], dtype=object)
+
+    return {
+        "first_name": pool(fk.first_name),
+        "last_name": pool(fk.last_name),
+        "user_name": pool(fk.user_name),
+        "email_domain": pool(fk.free_email_domain),
+        "phone": pool(fk.phone_number),
+        "address": pool(lambda: fk.address().replace('\n', ', ')),
+        "company": pool(fk.company),
+        "ipv4": pool(fk.ipv4),
+    }
+
+
+def pick(rng, values, n):
+    """n values drawn uniformly from a list or pool."""
+    values = np.asarray(values, dtype=object)
+    return values[rng.integers(0, len(values), n)]
+
+
+def from_range(rng, ids, n):
+    """n IDs drawn uniformly from a range of parent IDs (all None if the range is empty)."""
+    if len(ids) == 0:
+        return np.full(n, None, dtype=object)
+    return rng.integers(ids.start, ids.stop, n)
+
+
+def maybe(rng, values):
+    """Replace roughly half of the values with None (nullable columns)."""
+    values = np.asarray(values).astype(object)
+    values[rng.random(len(values)) < 0.5] = None
+    return values
+
+
+def zfill_array(values, k):
+    """Zero-padded k-digit strings of non-negative integers (np.char.zfill rejects an empty array)."""
+    if not len(values):
+        return np.empty(0, dtype=object)
+    return np.char.zfill(np.asarray(values).astype(str), k).astype(object)
+
+
+def unique_digit_array(ids, k, salt=0):
+    """Vectorized generate_data.unique_digits: k-digit strings, unique per ID for k >= 9."""
+    ids = np.asarray(ids, dtype=np.int64) % 10 ** 10
+    m = 10 ** k
+    high, low = divmod(DIGITS_MULTIPLIER % m, 10 ** 8)
+    # (ids * (high * 10**8 + low)) mod m without overflowing int64
+    value = ((ids * high) % (m // 10 ** 8)) * 10 ** 8 + ids * low + salt
+    return zfill_array(value % m, k)
+
+
+def digit_strings(rng, n, k):
+    """n random k-digit strings (CVV, OTP codes)."""
+    return zfill_array(rng.integers(0, 10 ** k, n), k)
+
+
+def unique_uuids(rng, ids):
+    """UUID-formatted strings whose node field is the row ID, so they never collide."""
+    high = rng.integers(0, 2 ** 48, len(ids)).tolist()
+    low = rng.integers(0, 2 ** 26, len(ids)).tolist()
+    return np.array([f"{h >> 16:08x}-{h & 0xffff:04x}-4{l >> 14:03x}-{8 | l >> 12 & 0x3:x}{l & 0xfff:03x}-{i:012x}"
+                     for h, l, i in zip(high, low, ids.tolist())],
+                    dtype=object)
+
+
+def random_dates(rng, as_of, min_days, max_days, n):
+    return np.datetime64(as_of.date(), 'D') + rng.integers(min_days, max_days + 1, n).astype('timedelta64[D]')
+
+
+def recent_datetimes(rng, as_of, n, days=30):
+    return np.datetime64(as_of, 's') - rng.integers(0, days * 86400 + 1, n).astype('timedelta64[s]')
+
+
+def customer_columns(first_id, count, rng, pools, as_of):
+    ids = np.arange(first_id, first_id + count, dtype=np.int64)
+    users = pick(rng, pools['user_name'], count)
+    domains = pick(rng, pools['email_domain'], count)
+    return {
+        'CustomerID': ids,
+        'FirstName': pick(rng, pools['first_name'], count),
+        'LastName': pick(rng, pools['last_name'], count),
+        'Email': np.array([f"{u}.{i}@{d}" for u, i, d in zip(users, ids.tolist(), domains)], dtype=object),
+        'Phone': pick(rng, pools['phone'], count),
+        'Address': pick(rng, pools['address'], count),
+        'CCCD_Passport': unique_digit_array(ids, 12),
+        'DateOfBirth': random_dates(rng, as_of, -80 * 365, -18 * 365, count),
+        'Status': pick(rng, customer_statuses, count),
+    }
+
+
+def per_parent_ids(first_id, parents, rng, low, high):
+    """Child IDs and their parent IDs for low..high children per parent."""
+    counts = rng.integers(low, high + 1, len(parents))
+    parent_ids = np.repeat(np.asarray(parents, dtype=np.int64), counts)
+    return np.arange(first_id, first_id + len(parent_ids), dtype=np.int64), parent_ids
+
+
+def account_columns(first_id, customers, rng, pools, as_of):
+    ids, customer_ids = per_parent_ids(first_id, customers, rng, 1, 3)
+    n = len(ids)
+    return {
+        'AccountID': ids,
+        'CustomerID': customer_ids,
+        'AccountType': pick(rng, account_types, n),
+        'AccountNumber': unique_digit_array(ids, 16, salt=1),
+        'Balance': np.round(rng.uniform(100000, 50000000, n), 2),
+        'OpenDate': random_dates(rng, as_of, -2 * 365, 0, n),
+        'Status': pick(rng, ['Active', 'Frozen'], n),
+    }
+
+
+def card_columns(first_id, accounts, rng, pools, as_of):
+    ids, account_ids = per_parent_ids(first_id, accounts, rng, 0, 2)
+    n = len(ids)
+    return {
+        'CardID': ids,
+        'AccountID': account_ids,
+        'CardNumber': unique_digit_array(ids, 16, salt=2),
+        'CardType': pick(rng, card_types, n),
+        'ExpiryDate': random_dates(rng, as_of, 0, 3 * 365, n),
+        'CVV': digit_strings(rng, n, 3),
+        'Status': pick(rng, card_statuses, n),
+    }
+
+
+def merchant_columns(first_id, count, rng, pools, as_of):
+    return {
+        'MerchantID': np.arange(first_id, first_id + count, dtype=np.int64),
+        'MerchantName': pick(rng, pools['company'], count),
+        'Category': pick(rng, MERCHANT_CATEGORIES, count),
+        'Location': pick(rng, pools['address'], count),
+        'RiskScore': rng.integers(0, 101, count),
+    }
+
+
+def device_columns(first_id, customers, rng, pools, as_of):
+    ids, customer_ids = per_parent_ids(first_id, customers, rng, 1, 3)
+    n = len(ids)
+    return {
+        'DeviceID': ids,
+        'CustomerID': customer_ids,
+        'DeviceType': pick(rng, device_types, n),
+        'DeviceFingerprint': unique_uuids(rng, ids),
+        'IPAddress': pick(rng, pools['ipv4'], n),
+        'LastUsed': recent_datetimes(rng, as_of, n),
+        'Status': pick(rng, device_statuses, n),
+        'RiskTag': pick(rng, risk_tags, n),
+    }
+
+
+def auth_log_columns(first_id, count, customers, devices, rng, pools, as_of):
+    ids = np.arange(first_id, first_id + count, dtype=np.int64)
+    return {
+        'AuthLogID': ids,
+        'CustomerID': from_range(rng, customers, count),
+        'AuthType': pick(rng, auth_types, count),
+        'AuthDate': recent_datetimes(rng, as_of, count),
+        'Status': pick(rng, auth_statuses, count),
+        'OTPCode': maybe(rng, digit_strings(rng, count, 6)),
+        'BiometricData': maybe(rng, unique_uuids(rng, ids)),
+        'DeviceID': maybe(rng, from_range(rng, devices, count)),
+        'RiskTag': pick(rng, risk_tags, count),
+    }
+
+
+def transaction_columns(first_id, count, accounts, cards, merchants, devices, auth_logs, rng, pools, as_of):
+    amounts = rng.uniform(10000, 50000000, count)
+    return {
+        'TransactionID': np.arange(first_id, first_id + count, dtype=np.int64),
+        'AccountID': from_range(rng, accounts, count),
+        'CardID': maybe(rng, from_range(rng, cards, count)),
+        'MerchantID': from_range(rng, merchants, count),
+        'Amount': np.round(amounts, 2),
+        'TransactionDate': recent_datetimes(rng, as_of, count),
+        'TransactionType': pick(rng, transaction_types, count),
+        'Status': pick(rng, transaction_statuses, count),
+        'DeviceID': maybe(rng, from_range(rng, devices, count)),
+        'AuthLogID': maybe(rng, from_range(rng, auth_logs, count)),
+        'RiskTag': np.where(amounts > 10000000, 'High', pick(rng, ['Low', 'Medium'], count)).astype(object),
+    }
+
+
+def fraud_alert_columns(first_id, count, customers, transactions, devices, auth_logs, rng, pools, as_of):
+    return {
+        'AlertID': np.arange(first_id, first_id + count, dtype=np.int64),
+        'CustomerID': from_range(rng, customers, count),
+        'TransactionID': maybe(rng, from_range(rng, transactions, count)),
+        'DeviceID': maybe(rng, from_range(rng, devices, count)),
+        'AuthLogID': maybe(rng, from_range(rng, auth_logs, count)),
+        'AlertType': pick(rng, ALERT_TYPES, count),
+        'AlertDate': recent_datetimes(rng, as_of, count),
+        'RiskScore': rng.integers(0, 101, count),
+        'Status': pick(rng, alert_statuses, count),
+        'RiskTag': pick(rng, risk_tags, count),
+    }
+
+
+COLUMN_BUILDERS = {
+    "Customer": customer_columns,
+    "BankAccount": account_columns,
+    "Card": card_columns,
+    "Merchant": merchant_columns,
+    "Device": device_columns,
+    "AuthenticationLog": auth_log_columns,
+    "PaymentTransaction": transaction_columns,
+    "FraudAlert": fraud_alert_columns,
+}
+
+# Tables generated per parent row; `source` is then a range of parent IDs instead of a row count.
+PER_PARENT_TABLES = {"BankAccount", "Card", "Device"}
+
+
+def column_chunks(table, first_id, source, *refs, rng, pools, as_of, chunk_size=100000):
+    """Yield column dicts for `table` in chunks of at most chunk_size rows (or parents)."""
+    builder = COLUMN_BUILDERS[table]
+    if table in PER_PARENT_TABLES:
+        next_id = first_id
+        for offset in range(0, len(source), chunk_size):
+            columns = builder(next_id, source[offset:offset + chunk_size], *refs, rng, pools, as_of)
+            next_id += len(columns[TABLE_COLUMNS[table][0]])
+            yield columns
+    else:
+        for offset in range(0, source, chunk_size):
+            yield builder(first_id + offset, min(chunk_size, source - offset), *refs, rng, pools, as_of)
+
+
+def rows_from_columns(chunks):
+    """Turn column dicts into row tuples of plain Python values for executemany."""
+    for columns in chunks:
+        yield from zip(*(values.tolist() for values in columns.values()))
+
+
+def vector_row_builders(seed, as_of, chunk_size=100000, pool_size=1000):
+    """Row builders with the same call signature as the Faker ones in generate_data."""
+    rng = np.random.default_rng(seed)
+    pools = build_pools(seed, pool_size)
+
+    def builder(table):
+        def rows(first_id, source, *refs):
+            return rows_from_columns(column_chunks(table, first_id, source, *refs, rng=rng, pools=pools,
+                                                   as_of=as_of, chunk_size=chunk_size))
+        return rows
+
+    return {table: builder(table) for table in COLUMN_BUILDERS}
@@ -1,26 +1,20 @@
 # /src/generate_data.py
-import mysql.connector
 import random
 from faker import Faker
 from datetime import datetime, timedelta
 import uuid
 import string
+import time
+import argparse
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from db import connect_db
 
 # Initialize Faker for realistic data
 fake = Faker()
 
-# Database connection parameters
-DB_PARAMS = {
-    "database": "test",
-    "user": "anhquan",
-    "password": "123",
-    "host": "172.19.0.3",
-    "port": 3306
-}
-
-def connect_db():
-    print("--------connect success---------")
-    return mysql.connector.connect(**DB_PARAMS)
 
 def generate_cccd():
     """Generate a 12-digit CCCD (Vietnam Citizen ID)."""
@@ -30,33 +24,84 @@ def generate_card_number():
     """Generate a 16-digit card number."""
     return ''.join(random.choices(string.digits, k=16))
 
+# Allowed values for enum-like fields
+customer_statuses = ['Active', 'Suspended', 'Inactive']
+account_types = ['Checking', 'Savings', 'Credit']
+card_types = ['Debit', 'Credit', 'Prepaid']
+card_statuses = ['Active', 'Blocked', 'Expired']
+device_types = ['Mobile', 'Desktop', 'Tablet']
+device_statuses = ['Trusted', 'Suspicious', 'Blocked']
+risk_tags = ['Low', 'Medium', 'High']
+auth_types = ['OTP', 'Biometric', 'Password']
+auth_statuses = ['Success', 'Failed', 'Pending']
+transaction_types = ['Online', 'POS', 'ATM', 'Transfer', 'Refund']
+transaction_statuses = ['Completed', 'Pending', 'Declined']
+alert_statuses = ['Open', 'Resolved', 'False']
+
+# Row volumes of the original sample dataset; scale_factor multiplies these.
+BASE_VOLUMES = {
+    "Customer": 10,
+    "Merchant": 10,
+    "AuthenticationLog": 20,
+    "PaymentTransaction": 50,
+    "FraudAlert": 10,
+}
+
+
+def scaled(table, scale_factor):
+    """Number of rows to generate for a fixed-size table at the given scale factor."""
+    return max(1, int(round(BASE_VOLUMES[table] * scale_factor)))
+
+
+def unique_digits(n, k, salt=0):
+    """Map a positive integer to a k-digit string, unique for every n < 10**k.
+
+    Multiplying by a constant coprime to 10 is a bijection modulo 10**k, so
+    IDs can be turned into random-looking CCCD/account/card numbers without
+    retry loops for the UNIQUE constraints.
+    """
+    return str((n * 6364136223846793007 + salt) % 10 ** k).zfill(k)
+
+
+def report_rate(stats, table, rows, elapsed):
+    """Record and print throughput for one table."""
+    rate = rows / elapsed if elapsed > 0 else float('inf')
+    stats[table] = {"rows": rows, "seconds": round(elapsed, 3), "rows_per_sec": round(rate, 1)}
+    print(f"{table}: {rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+
+
 def validate_enum(value, allowed_values, field_name):
     """Validate that a value is in the allowed set (replacing CHECK constraints)."""
     if value not in allowed_values:
         raise ValueError(f"Invalid {field_name}: {value}. Must be one of {allowed_values}")
     return value
 
-def generate_data():
+def generate_data(scale_factor=1, bulk=False, batch_size=1000, commit_every=10000, workers=1, seed=None,
+                  as_of=None, engine='faker', data_dir=None):
+    """Generate sample data; scale_factor=1 matches the original 50-transaction dataset.
+
+    With bulk=True (or workers > 1) rows are inserted through
+    generate_data_bulk (batched executemany, client-assigned IDs, optional
+    process pool, engine='vector' for NumPy column generation). With
+    data_dir set, the dataset is written to TSV files there and ingested
+    with LOAD DATA (see data_files). Returns per-table throughput stats.
+    """
+    if data_dir:
+        from data_files import generate_data_via_files
+        return generate_data_via_files(data_dir, scale_factor, workers=workers, seed=seed, as_of=as_of,
+                                       engine=engine)
+    if bulk or workers > 1 or engine != 'faker':
+        return generate_data_bulk(scale_factor, batch_size=batch_size, commit_every=commit_every,
+                                  workers=workers, seed=seed, as_of=as_of, engine=engine)
+
     conn = connect_db()
     cur = conn.cursor()
+    stats = {}
 
-    # Allowed values for enum-like fields
-    customer_statuses = ['Active', 'Suspended', 'Inactive']
-    account_types = ['Checking', 'Savings', 'Credit']
-    card_types = ['Debit', 'Credit', 'Prepaid']
-    card_statuses = ['Active', 'Blocked', 'Expired']
-    device_types = ['Mobile', 'Desktop', 'Tablet']
-    device_statuses = ['Trusted', 'Suspicious', 'Blocked']
-    risk_tags = ['Low', 'Medium', 'High']
-    auth_types = ['OTP', 'Biometric', 'Password']
-    auth_statuses = ['Success', 'Failed', 'Pending']
-    transaction_types = ['Online', 'POS', 'ATM', 'Transfer', 'Refund']
-    transaction_statuses = ['Completed', 'Pending', 'Declined']
-    alert_statuses = ['Open', 'Resolved', 'False']
-
-    # Insert Customers (10 customers)
+    # Insert Customers (10 customers per scale unit)
+    started = time.perf_counter()
     customers = []
-    for _ in range(10):
+    for _ in range(scaled('Customer', scale_factor)):
         cur.execute("""
             INSERT INTO `Customer` (`FirstName`, `LastName`, `Email`, `Phone`, `Address`, `CCCD_Passport`, `DateOfBirth`, `Status`)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
@@ -72,9 +117,10 @@ def generate_data():
         ))
         cur.execute("SELECT LAST_INSERT_ID()")
         customers.append(cur.fetchone()[0])
-    print(f"customers = {customers}")
+    report_rate(stats, 'Customer', len(customers), time.perf_counter() - started)
 
     # Insert Bank Accounts (1-3 accounts per customer)
+    started = time.perf_counter()
     accounts = []
     for customer_id in customers:
         for _ in range(random.randint(1, 3)):
@@ -91,9 +137,10 @@ def generate_data():
             ))
             cur.execute("SELECT LAST_INSERT_ID()")
             accounts.append(cur.fetchone()[0])
-    print(f"accounts = {accounts}")
+    report_rate(stats, 'BankAccount', len(accounts), time.perf_counter() - started)
 
     # Insert Cards (0-2 cards per account)
+    started = time.perf_counter()
     cards = []
     for account_id in accounts:
         for _ in range(random.randint(0, 2)):
@@ -110,11 +157,12 @@ def generate_data():
             ))
             cur.execute("SELECT LAST_INSERT_ID()")
             cards.append(cur.fetchone()[0])
-    print(f"cards = {cards}")
+    report_rate(stats, 'Card', len(cards), time.perf_counter() - started)
 
-    # Insert Merchants (10 merchants)
+    # Insert Merchants (10 merchants per scale unit)
+    started = time.perf_counter()
     merchants = []
-    for _ in range(10):
+    for _ in range(scaled('Merchant', scale_factor)):
         risk_score = random.randint(0, 100)
         cur.execute("""
             INSERT INTO `Merchant` (`MerchantName`, `Category`, `Location`, `RiskScore`)
@@ -127,9 +175,10 @@ def generate_data():
         ))
         cur.execute("SELECT LAST_INSERT_ID()")
         merchants.append(cur.fetchone()[0])
-    print(f"merchants = {merchants}")
+    report_rate(stats, 'Merchant', len(merchants), time.perf_counter() - started)
 
     # Insert Devices (1-3 devices per customer)
+    started = time.perf_counter()
     devices = []
     for customer_id in customers:
         for _ in range(random.randint(1, 3)):
@@ -147,11 +196,12 @@ def generate_data():
             ))
             cur.execute("SELECT LAST_INSERT_ID()")
             devices.append(cur.fetchone()[0])
-    print(f"devices = {devices}")
+    report_rate(stats, 'Device', len(devices), time.perf_counter() - started)
 
-    # Insert Authentication Logs (20 logs)
+    # Insert Authentication Logs (20 logs per scale unit)
+    started = time.perf_counter()
     auth_logs = []
-    for _ in range(20):
+    for _ in range(scaled('AuthenticationLog', scale_factor)):
         cur.execute("""
             INSERT INTO `AuthenticationLog` (`CustomerID`, `TransactionID`, `AuthType`, `AuthDate`, `Status`, `OTPCode`, `BiometricData`, `DeviceID`, `RiskTag`)
             VALUES (%s, NULL, %s, %s, %s, %s, %s, %s, %s)
@@ -167,11 +217,12 @@ def generate_data():
         ))
         cur.execute("SELECT LAST_INSERT_ID()")
         auth_logs.append(cur.fetchone()[0])
-    print(f"auth_logs = {auth_logs}")
+    report_rate(stats, 'AuthenticationLog', len(auth_logs), time.perf_counter() - started)
 
-    # Insert Payment Transactions (50 transactions, including high-value edge cases)
+    # Insert Payment Transactions (50 transactions per scale unit, including high-value edge cases)
+    started = time.perf_counter()
     transaction_ids = []
-    for _ in range(50):
+    for _ in range(scaled('PaymentTransaction', scale_factor)):
         amount = random.uniform(10000, 50000000)  # VND, including high-value cases
         device_id = random.choice(devices) if random.choice([True, False]) else None
         auth_log_id = random.choice(auth_logs) if random.choice([True, False]) else None
@@ -193,17 +244,20 @@ def generate_data():
         ))
         cur.execute("SELECT LAST_INSERT_ID()")
         transaction_ids.append(cur.fetchone()[0])
+    report_rate(stats, 'PaymentTransaction', len(transaction_ids), time.perf_counter() - started)
 
-    # Update AuthenticationLog with TransactionID for some records
-    for auth_log_id in random.sample(auth_logs, min(10, len(auth_logs))):
+    # Update AuthenticationLog with TransactionID for half of the records
+    for auth_log_id in random.sample(auth_logs, len(auth_logs) // 2):
         cur.execute("""
             UPDATE `AuthenticationLog`
             SET `TransactionID` = %s
             WHERE `AuthLogID` = %s
         """, (random.choice(transaction_ids), auth_log_id))
 
-    # Insert Fraud Alerts (10 alerts)
-    for _ in range(10):
+    # Insert Fraud Alerts (10 alerts per scale unit)
+    started = time.perf_counter()
+    alert_count = scaled('FraudAlert', scale_factor)
+    for _ in range(alert_count):
         risk_score = random.randint(0, 100)
         cur.execute("""
             INSERT INTO `FraudAlert` (`CustomerID`, `TransactionID`, `DeviceID`, `AuthLogID`, `AlertType`, `AlertDate`, `RiskScore`, `Status`, `RiskTag`)
@@ -220,10 +274,406 @@ def generate_data():
             validate_enum(random.choice(risk_tags), risk_tags, 'FraudAlert.RiskTag')
         ))
 
+    report_rate(stats, 'FraudAlert', alert_count, time.perf_counter() - started)
+
     conn.commit()
     cur.close()
     conn.close()
     print("Sample data generated successfully.")
+    return stats
+
+
+
+def bulk_insert(conn, cur, table, columns, rows, batch_size=1000, commit_every=10000):
+    """Insert rows from an iterable with batched multi-row executemany.
+
+    Commits every commit_every rows; returns the number of rows inserted.
+    """
+    sql = "INSERT INTO `{}` ({}) VALUES ({})".format(
+        table, ', '.join(f'`{c}`' for c in columns), ', '.join(['%s'] * len(columns)))
+    total = 0
+    since_commit = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            cur.executemany(sql, batch)
+            total += len(batch)
+            since_commit += len(batch)
+            batch = []
+            if since_commit >= commit_every:
+                conn.commit()
+                since_commit = 0
+    if batch:
+        cur.executemany(sql, batch)
+        total += len(batch)
+    conn.commit()
+    return total
+
+
+def next_id(cur, table, pk):
+    """First free primary key value for client-side ID assignment."""
+    cur.execute(f"SELECT COALESCE(MAX(`{pk}`), 0) + 1 FROM `{table}`")
+    return int(cur.fetchone()[0])
+
+
+def derive_seed(master_seed, shard):
+    """Reproducible, independent seed for one shard of a run."""
+    digest = hashlib.sha256(f"{master_seed}:{shard}".encode()).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+def recent_datetime(rng, as_of, days=30):
+    """Timestamp in the `days` before as_of (replaces Faker's now-relative ranges)."""
+    return as_of - timedelta(seconds=rng.randint(0, days * 86400))
+
+
+def random_date(rng, as_of, min_days, max_days):
+    """Date between as_of + min_days and as_of + max_days."""
+    return (as_of + timedelta(days=rng.randint(min_days, max_days))).date()
+
+
+def random_uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def customer_rows(first_id, count, rng, fk, as_of):
+    for customer_id in range(first_id, first_id + count):
+        yield (
+            customer_id,
+            fk.first_name(),
+            fk.last_name(),
+            f"{fk.user_name()}.{customer_id}@{fk.free_email_domain()}",
+            fk.phone_number(),
+            fk.address().replace('\n', ', '),
+            unique_digits(customer_id, 12),
+            random_date(rng, as_of, -80 * 365, -18 * 365),
+            rng.choice(customer_statuses)
+        )
+
+
+def account_rows(first_id, customers, rng, fk, as_of):
+    account_id = first_id
+    for customer_id in customers:
+        for _ in range(rng.randint(1, 3)):
+            yield (
+                account_id,
+                customer_id,
+                rng.choice(account_types),
+                unique_digits(account_id, 16, salt=1),
+                round(rng.uniform(100000, 50000000), 2),
+                random_date(rng, as_of, -2 * 365, 0),
+                rng.choice(['Active', 'Frozen'])
+            )
+            account_id += 1
+
+
+def card_rows(first_id, accounts, rng, fk, as_of):
+    card_id = first_id
+    for account_id in accounts:
+        for _ in range(rng.randint(0, 2)):
+            yield (
+                card_id,
+                account_id,
+                unique_digits(card_id, 16, salt=2),
+                rng.choice(card_types),
+                random_date(rng, as_of, 0, 3 * 365),
+                ''.join(rng.choices(string.digits, k=3)),
+                rng.choice(card_statuses)
+            )
+            card_id += 1
+
+
+def merchant_rows(first_id, count, rng, fk, as_of):
+    for merchant_id in range(first_id, first_id + count):
+        yield (
+            merchant_id,
+            fk.company(),
+            rng.choice(['Retail', 'Food', 'Online', 'Travel']),
+            fk.address().replace('\n', ', '),
+            rng.randint(0, 100)
+        )
+
+
+def device_rows(first_id, customers, rng, fk, as_of):
+    device_id = first_id
+    for customer_id in customers:
+        for _ in range(rng.randint(1, 3)):
+            yield (
+                device_id,
+                customer_id,
+                rng.choice(device_types),
+                random_uuid(rng),
+                fk.ipv4(),
+                recent_datetime(rng, as_of),
+                rng.choice(device_statuses),
+                rng.choice(risk_tags)
+            )
+            device_id += 1
+
+
+def auth_log_rows(first_id, count, customers, devices, rng, fk, as_of):
+    for auth_log_id in range(first_id, first_id + count):
+        yield (
+            auth_log_id,
+            rng.choice(customers),
+            rng.choice(auth_types),
+            recent_datetime(rng, as_of),
+            rng.choice(auth_statuses),
+            ''.join(rng.choices(string.digits, k=6)) if rng.choice([True, False]) else None,
+            random_uuid(rng) if rng.choice([True, False]) else None,
+            rng.choice(devices) if rng.choice([True, False]) else None,
+            rng.choice(risk_tags)
+        )
+
+
+def transaction_rows(first_id, count, accounts, cards, merchants, devices, auth_logs, rng, fk, as_of):
+    for transaction_id in range(first_id, first_id + count):
+        amount = rng.uniform(10000, 50000000)
+        yield (
+            transaction_id,
+            rng.choice(accounts),
+            rng.choice(cards) if cards and rng.choice([True, False]) else None,
+            rng.choice(merchants),
+            round(amount, 2),
+            recent_datetime(rng, as_of),
+            rng.choice(transaction_types),
+            rng.choice(transaction_statuses),
+            rng.choice(devices) if rng.choice([True, False]) else None,
+            rng.choice(auth_logs) if rng.choice([True, False]) else None,
+            'High' if amount > 10000000 else rng.choice(['Low', 'Medium'])
+        )
+
+
+def fraud_alert_rows(first_id, count, customers, transactions, devices, auth_logs, rng, fk, as_of):
+    for alert_id in range(first_id, first_id + count):
+        yield (
+            alert_id,
+            rng.choice(customers),
+            rng.choice(transactions) if rng.choice([True, False]) else None,
+            rng.choice(devices) if rng.choice([True, False]) else None,
+            rng.choice(auth_logs) if rng.choice([True, False]) else None,
+            rng.choice(['Unusual Activity', 'High-Risk Merchant', 'Suspicious Device', 'Failed Authentication']),
+            recent_datetime(rng, as_of),
+            rng.randint(0, 100),
+            rng.choice(alert_statuses),
+            rng.choice(risk_tags)
+        )
+
+
+TABLE_COLUMNS = {
+    "Customer": ['CustomerID', 'FirstName', 'LastName', 'Email', 'Phone', 'Address', 'CCCD_Passport',
+                 'DateOfBirth', 'Status'],
+    "BankAccount": ['AccountID', 'CustomerID', 'AccountType', 'AccountNumber', 'Balance', 'OpenDate', 'Status'],
+    "Card": ['CardID', 'AccountID', 'CardNumber', 'CardType', 'ExpiryDate', 'CVV', 'Status'],
+    "Merchant": ['MerchantID', 'MerchantName', 'Category', 'Location', 'RiskScore'],
+    "Device": ['DeviceID', 'CustomerID', 'DeviceType', 'DeviceFingerprint', 'IPAddress', 'LastUsed', 'Status',
+               'RiskTag'],
+    "AuthenticationLog": ['AuthLogID', 'CustomerID', 'AuthType', 'AuthDate', 'Status', 'OTPCode', 'BiometricData',
+                          'DeviceID', 'RiskTag'],
+    "PaymentTransaction": ['TransactionID', 'AccountID', 'CardID', 'MerchantID', 'Amount', 'TransactionDate',
+                           'TransactionType', 'Status', 'DeviceID', 'AuthLogID', 'RiskTag'],
+    "FraudAlert": ['AlertID', 'CustomerID', 'TransactionID', 'DeviceID', 'AuthLogID', 'AlertType', 'AlertDate',
+                   'RiskScore', 'Status', 'RiskTag'],
+}
+
+PRIMARY_KEYS = {table: columns[0] for table, columns in TABLE_COLUMNS.items()}
+
+# Upper bound of child rows per customer, used to size each shard's ID block.
+ROWS_PER_CUSTOMER = {"BankAccount": 3, "Card": 6, "Device": 3}
+
+
+def split_evenly(total, parts):
+    """Split total into `parts` contiguous (offset, count) slices."""
+    base, extra = divmod(total, parts)
+    slices = []
+    offset = 0
+    for i in range(parts):
+        count = base + (1 if i < extra else 0)
+        slices.append((offset, count))
+        offset += count
+    return slices
+
+
+def plan_shards(scale_factor, workers, first_ids):
+    """Assign every shard a disjoint ID range per table.
+
+    Customers, merchants, auth logs, transactions and alerts are split evenly.
+    Accounts, cards and devices get a block sized for the maximum number of
+    children per customer, so shards never overlap whatever they draw. Every
+    shard sees the full merchant range; all other references stay inside the
+    shard, which keeps foreign keys valid without coordination. A shard needs
+    at least one customer for its logs, transactions and alerts to refer to,
+    so there are never more shards than customers.
+    """
+    workers = max(1, min(workers, scaled('Customer', scale_factor)))
+    slices = {table: split_evenly(scaled(table, scale_factor), workers) for table in BASE_VOLUMES}
+    merchant_ids = (first_ids['Merchant'], first_ids['Merchant'] + scaled('Merchant', scale_factor))
+    plans = []
+    for shard in range(workers):
+        plan = {"shard": shard, "merchant_ids": merchant_ids}
+        for table in BASE_VOLUMES:
+            offset, count = slices[table][shard]
+            plan[table] = (first_ids[table] + offset, count)
+        customer_offset = slices['Customer'][shard][0]
+        for table, per_customer in ROWS_PER_CUSTOMER.items():
+            plan[table] = (first_ids[table] + customer_offset * per_customer, None)
+        plans.append(plan)
+    return plans
+
+
+ROW_BUILDERS = {
+    "Customer": customer_rows,
+    "BankAccount": account_rows,
+    "Card": card_rows,
+    "Merchant": merchant_rows,
+    "Device": device_rows,
+    "AuthenticationLog": auth_log_rows,
+    "PaymentTransaction": transaction_rows,
+    "FraudAlert": fraud_alert_rows,
+}
+
+
+def faker_row_builders(seed, as_of):
+    """Per-row Faker builders bound to a seeded random.Random and Faker instance."""
+    rng = random.Random(seed)
+    fk = Faker()
+    fk.seed_instance(seed)
+    return {table: partial(rows, rng=rng, fk=fk, as_of=as_of) for table, rows in ROW_BUILDERS.items()}
+
+
+def build_shard(plan, seed, as_of, engine, write, backfill):
+    """Drive one shard's row builders in foreign-key order.
+
+    write(table, rows) stores an iterable of row tuples and returns the row
+    count; backfill(updates) stores the (TransactionID, AuthLogID) pairs for
+    AuthenticationLog. engine='faker' calls Faker per row; engine='vector'
+    builds column arrays from pre-generated pools with NumPy (see
+    generate_columns). Returns per-table stats.
+    """
+    if engine == 'vector':
+        from generate_columns import vector_row_builders
+        builders = vector_row_builders(seed, as_of)
+    else:
+        builders = faker_row_builders(seed, as_of)
+    rng = random.Random(derive_seed(seed, 'backfill'))
+    stats = {}
+
+    def load(table, source, *refs):
+        started = time.perf_counter()
+        first_id = plan[table][0]
+        count = write(table, builders[table](first_id, source, *refs))
+        stats[table] = {"rows": count, "seconds": time.perf_counter() - started}
+        return range(first_id, first_id + count)
+
+    customers = load('Customer', plan['Customer'][1])
+    accounts = load('BankAccount', customers)
+    cards = load('Card', accounts)
+    load('Merchant', plan['Merchant'][1])
+    merchants = range(*plan['merchant_ids'])
+    devices = load('Device', customers)
+    auth_logs = load('AuthenticationLog', plan['AuthenticationLog'][1], customers, devices)
+    transactions = load('PaymentTransaction', plan['PaymentTransaction'][1],
+                        accounts, cards, merchants, devices, auth_logs)
+
+    # Back-fill AuthenticationLog.TransactionID for half of the shard's logs
+    started = time.perf_counter()
+    updates = [(rng.choice(transactions), auth_log_id)
+               for auth_log_id in rng.sample(auth_logs, len(auth_logs) // 2)]
+    backfill(updates)
+    stats['AuthenticationLog.TransactionID'] = {"rows": len(updates), "seconds": time.perf_counter() - started}
+
+    load('FraudAlert', plan['FraudAlert'][1], customers, transactions, devices, auth_logs)
+    return stats
+
+
+def generate_shard(plan, seed, as_of, batch_size=1000, commit_every=10000, engine='faker'):
+    """Generate and insert one shard on its own connection; returns per-table stats."""
+    conn = connect_db()
+    cur = conn.cursor()
+
+    def write(table, rows):
+        return bulk_insert(conn, cur, table, TABLE_COLUMNS[table], rows, batch_size, commit_every)
+
+    def backfill(updates):
+        for offset in range(0, len(updates), batch_size):
+            cur.executemany("UPDATE `AuthenticationLog` SET `TransactionID` = %s WHERE `AuthLogID` = %s",
+                            updates[offset:offset + batch_size])
+        conn.commit()
+
+    stats = build_shard(plan, seed, as_of, engine, write, backfill)
+    cur.close()
+    conn.close()
+    return stats
+
+
+def run_shards(shard_fn, plans, seed, workers, *args):
+    """Run shard_fn(plan, shard_seed, *args) for every shard, in a process pool if workers > 1."""
+    seeds = [derive_seed(seed, plan['shard']) for plan in plans]
+    if workers == 1:
+        return [shard_fn(plans[0], seeds[0], *args)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(shard_fn, plan, shard_seed, *args) for plan, shard_seed in zip(plans, seeds)]
+        return [future.result() for future in futures]
+
+
+def merge_shard_stats(shard_stats):
+    """Shards run concurrently, so a table's throughput is its total rows over the slowest shard."""
+    stats = {}
+    for table in shard_stats[0]:
+        rows = sum(s[table]["rows"] for s in shard_stats)
+        report_rate(stats, table, rows, max(s[table]["seconds"] for s in shard_stats))
+    return stats
+
+
+def first_free_ids():
+    """MAX(pk) + 1 for every table, the first IDs a new load may use."""
+    conn = connect_db()
+    cur = conn.cursor()
+    first_ids = {table: next_id(cur, table, pk) for table, pk in PRIMARY_KEYS.items()}
+    cur.close()
+    conn.close()
+    return first_ids
+
+
+def generate_data_bulk(scale_factor=1, batch_size=1000, commit_every=10000, workers=1, seed=None, as_of=None,
+                       engine='faker'):
+    """Bulk-load path: client-assigned IDs, batched executemany, chunked commits.
+
+    The data is split into `workers` shards with disjoint ID ranges, each
+    generated from derive_seed(seed, shard) in its own process. The same seed,
+    worker count, as_of and engine produce identical data on an empty database.
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    if as_of is None:
+        as_of = datetime.now().replace(microsecond=0)
+    print(f"bulk load: scale_factor={scale_factor}, workers={workers}, seed={seed}, as_of={as_of}, engine={engine}")
+
+    plans = plan_shards(scale_factor, workers, first_free_ids())
+    started = time.perf_counter()
+    shard_stats = run_shards(generate_shard, plans, seed, workers, as_of, batch_size, commit_every, engine)
+    stats = merge_shard_stats(shard_stats)
+    print(f"Sample data generated successfully (bulk) in {time.perf_counter() - started:.2f}s.")
+    return stats
+
 
 if __name__ == "__main__":
-    generate_data()
+    parser = argparse.ArgumentParser(description="Generate synthetic banking data")
+    parser.add_argument("--scale-factor", type=float, default=1,
+                        help="multiplier on the base volumes (1 = 50 transactions)")
+    parser.add_argument("--bulk", action="store_true", help="use batched executemany inserts")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--commit-every", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=1, help="number of generator processes (implies --bulk)")
+    parser.add_argument("--seed", type=int, default=None, help="master seed for reproducible data")
+    parser.add_argument("--as-of", type=datetime.fromisoformat, default=None,
+                        help="reference timestamp for generated dates (needed for byte-identical reruns)")
+    parser.add_argument("--engine", choices=["faker", "vector"], default="faker",
+                        help="per-row Faker calls or vectorized NumPy columns (implies --bulk)")
+    parser.add_argument("--data-dir", default=None,
+                        help="stream tables to TSV files in this directory and ingest them with LOAD DATA")
+    args = parser.parse_args()
+    generate_data(args.scale_factor, bulk=args.bulk, batch_size=args.batch_size, commit_every=args.commit_every,
+                  workers=args.workers, seed=args.seed, as_of=args.as_of, engine=args.engine,
+                  data_dir=args.data_dir)
@@ -0,0 +1,247 @@
+# /src/index_advisor.py
+import argparse
+import json
+import re
+import statistics
+import time
+
+from db import connect_db
+from check_registry import expand_rules, load_rules, plan_queries, rule_id
+from quarantine import rule_select
+from spend_summary import SUMMARY_TABLE, summarize_sql
+from instrumentation import plan_steps
+import monitoring_audit
+
+FULL_SCAN_ACCESS = ('ALL', 'index')
+# alias.`column` = alias.`column`: join and correlated subquery conditions
+EQUALITY = re.compile(r"(\w+)\.`(\w+)`\s*=\s*(\w+)\.`(\w+)`")
+TABLE_ALIAS = re.compile(r"(?:FROM|JOIN)\s+`(\w+)`(?:\s+(?!WHERE|ON|LEFT|JOIN|GROUP)(\w+))?", re.IGNORECASE)
+# Inner side of a join: the joined alias and its ON condition
+JOIN_CLAUSE = re.compile(r"JOIN\s+`\w+`\s+(\w+)\s+ON\s+(.*?)(?=\s+(?:LEFT\s+|INNER\s+)?JOIN\b|\s+WHERE\b|\s+GROUP\b|\)|$)",
+                         re.IGNORECASE | re.DOTALL)
+# Correlated subquery: its alias and WHERE condition, probed once per outer row
+SUBQUERY = re.compile(r"\(\s*SELECT\b[^()]*?\bFROM\s+`\w+`\s+(\w+)\s+WHERE\s+([^()]*)\)", re.IGNORECASE | re.DOTALL)
+GROUP_BY = re.compile(r"GROUP BY\s+(.+?)(?:\n|$)", re.IGNORECASE)
+ACTUAL_TIME = re.compile(r"actual time=[\d.]+\.\.([\d.]+)")
+
+
+def check_queries(bounds=None, rules=None):
+    """(name, sql, params) of every query the DQ and audit checks generate."""
+    rules = expand_rules(load_rules() if rules is None else rules)
+    queries = [(f"registry scan {query.table}", query.sql, query.params) for query in plan_queries(rules, bounds)]
+    for rule in rules:
+        sql, params = rule_select(rule, bounds)
+        queries.append((f"quarantine {rule_id(rule)}", sql, params))
+    queries += [
+        ("audit high-value count", f"SELECT COALESCE(SUM(`HighValueWeakAuthCount`), 0) FROM `{SUMMARY_TABLE}`", ()),
+        ("audit high-value rows", monitoring_audit.HIGH_VALUE_WEAK_AUTH_SQL, ()),
+        ("audit unverified devices", monitoring_audit.UNVERIFIED_DEVICE_SQL, ()),
+        ("audit daily limit", monitoring_audit.DAILY_LIMIT_SQL, ()),
+        ("spend summary refresh", summarize_sql(SUMMARY_TABLE), (0, 2 ** 63 - 1)),
+    ]
+    return queries
+
+
+def aliases(sql):
+    """alias -> table of every table referenced in FROM / JOIN clauses (a table without alias maps to itself)."""
+    return {alias or table: table for table, alias in TABLE_ALIAS.findall(sql)}
+
+
+def lookup_columns(sql):
+    """alias -> columns it is looked up on, for the inner side of a join or a correlated subquery only.
+
+    The driving (outer) table is read in full either way, so an index on
+    its side of the join condition cannot help.
+    """
+    columns = {}
+    for inner, condition in JOIN_CLAUSE.findall(sql) + SUBQUERY.findall(sql):
+        for left, left_column, right, right_column in EQUALITY.findall(condition):
+            if left == inner and right != inner:
+                columns.setdefault(inner, []).append(left_column)
+            elif right == inner and left != inner:
+                columns.setdefault(inner, []).append(right_column)
+    return columns
+
+
+def filter_columns(sql, alias):
+    """Columns of alias compared with a constant or parameter in the WHERE clause."""
+    where = sql.split('WHERE', 1)[1] if 'WHERE' in sql else ''
+    prefix = f"{alias}\\." if alias else ""
+    return re.findall(prefix + r"`(\w+)`\s*(?:=|>=|<=|>|<|BETWEEN|IN\b)\s*(?:%s|\d|'|\(|CURDATE)", where)
+
+
+def plan_flags(node):
+    """Whether a JSON plan needs a temporary table or a filesort anywhere."""
+    flags = set()
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key in ('using_temporary_table', 'using_filesort') and value is True:
+                flags.add(key.replace('using_', '').replace('_table', ''))
+            flags |= plan_flags(value)
+    elif isinstance(node, list):
+        for value in node:
+            flags |= plan_flags(value)
+    return flags
+
+
+def indexed_columns(cur):
+    """table -> set of columns that lead an existing index."""
+    cur.execute("""
+        SELECT `TABLE_NAME`, `COLUMN_NAME` FROM `information_schema`.`STATISTICS`
+        WHERE `TABLE_SCHEMA` = DATABASE() AND `SEQ_IN_INDEX` = 1
+    """)
+    leading = {}
+    for table, column in cur.fetchall():
+        leading.setdefault(table, set()).add(column)
+    return leading
+
+
+def explain_analyze(cur, sql, params):
+    """Measured time of the last row (ms) from EXPLAIN ANALYZE (MySQL 8.0.18+, SELECT only), or None."""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    try:
+        cur.execute(f"EXPLAIN ANALYZE {sql}", params)
+        tree = '\n'.join(row[0] for row in cur.fetchall())
+    except Exception:
+        return None
+    match = ACTUAL_TIME.search(tree)
+    return float(match.group(1)) if match else None
+
+
+def advise_query(cur, name, sql, params, leading, analyze=False):
+    """EXPLAIN one query; returns (findings, proposed (table, column) indexes)."""
+    cur.execute(f"EXPLAIN FORMAT=JSON {sql}", params)
+    plan = json.loads(cur.fetchone()[0])
+    tables = aliases(sql)
+    lookups = lookup_columns(sql)
+    findings, proposals = [], set()
+    flags = plan_flags(plan)
+    for step in plan_steps(plan):
+        alias = step['table']
+        table = tables.get(alias, alias)
+        if step['access_type'] not in FULL_SCAN_ACCESS:
+            continue
+        filters = filter_columns(sql, None if alias == table else alias)
+        # Join/correlation columns first: a scan there can repeat once per row of the other side
+        candidates = lookups.get(alias, []) + filters
+        missing = [column for column in candidates if column not in leading.get(table, set())]
+        if missing:
+            proposals.add((table, missing[0]))
+            advice = f"add index on {table}({missing[0]})"
+        elif not candidates:
+            advice = 'whole-table aggregate, a scan is expected'
+        else:
+            advice = 'columns already indexed; the optimizer prefers a scan'
+        findings.append({'Query': name, 'Table': table, 'Access': step['access_type'], 'Key': step['key'],
+                         'Rows': step['rows'], 'Flags': ','.join(sorted(flags)), 'Advice': advice})
+    if flags and not findings:
+        group_by = GROUP_BY.search(sql)
+        findings.append({'Query': name, 'Table': None, 'Access': None, 'Key': None, 'Rows': None,
+                         'Flags': ','.join(sorted(flags)),
+                         'Advice': f"{' and '.join(sorted(flags))} for GROUP BY {group_by.group(1).strip()}"
+                                   if group_by else f"{' and '.join(sorted(flags))} in the plan"})
+    if analyze and findings:
+        findings[0]['Analyze (ms)'] = explain_analyze(cur, sql, params)
+    return findings, proposals
+
+
+def index_name(table, column):
+    return f"idx_advisor_{table}_{column}".lower()[:64]
+
+
+def time_query(cur, sql, params, repeat=3):
+    """Median seconds of running a SELECT to completion."""
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cur.execute(sql, params)
+        cur.fetchall()
+        runs.append(time.perf_counter() - started)
+    return statistics.median(runs)
+
+
+def advise(bounds=None, analyze=False):
+    """Findings for every check query and the indexes proposed across them."""
+    conn = connect_db()
+    cur = conn.cursor()
+    leading = indexed_columns(cur)
+    findings, proposals = [], {}
+    for name, sql, params in check_queries(bounds):
+        try:
+            query_findings, query_proposals = advise_query(cur, name, sql, params, leading, analyze)
+        except Exception as e:
+            query_findings, query_proposals = [{'Query': name, 'Advice': f'EXPLAIN failed: {e}'}], set()
+        findings += query_findings
+        for proposal in query_proposals:
+            proposals.setdefault(proposal, []).append(name)
+    cur.close()
+    conn.close()
+    return findings, proposals
+
+
+def benchmark_proposals(proposals, repeat=3, keep=False):
+    """Time every SELECT that a proposal targets before and after creating the proposed indexes.
+
+    Only for a local database: indexes are created (and dropped again unless keep, or if the
+    benchmark fails part way).
+    """
+    queries = {name: (sql, params) for name, sql, params in check_queries()
+               if sql.lstrip().upper().startswith('SELECT')}
+    targeted = sorted({name for names in proposals.values() for name in names if name in queries})
+    conn = connect_db()
+    cur = conn.cursor()
+    created = []
+    finished = False
+    try:
+        before = {name: time_query(cur, *queries[name], repeat) for name in targeted}
+        for table, column in proposals:
+            cur.execute(f"CREATE INDEX `{index_name(table, column)}` ON `{table}` (`{column}`)")
+            created.append((table, column))
+        after = {name: time_query(cur, *queries[name], repeat) for name in targeted}
+        finished = True
+    finally:
+        # A failed benchmark never leaves its indexes behind, even with keep
+        if not (keep and finished):
+            for table, column in created:
+                cur.execute(f"DROP INDEX `{index_name(table, column)}` ON `{table}`")
+        cur.close()
+        conn.close()
+    return [{'Query': name, 'Before (s)': round(before[name], 4), 'After (s)': round(after[name], 4),
+             'Speedup': round(before[name] / after[name], 2) if after[name] else None} for name in targeted]
+
+
+def print_table(title, rows):
+    import pandas as pd
+    print(f"\n{title}:")
+    print(pd.DataFrame(rows).to_string(index=False) if rows else "(none)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN every check query and propose missing indexes")
+    parser.add_argument("--analyze", action="store_true",
+                        help="also run EXPLAIN ANALYZE, which executes every check query; "
+                             "only allowed with --benchmark/--seed (benchmark database)")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="time the affected queries before/after creating the indexes on the benchmark database")
+    parser.add_argument("--seed", default=None, help="seed the benchmark database at this scale first (e.g. 100k)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--keep", action="store_true", help="keep the created indexes after benchmarking")
+    args = parser.parse_args()
+    if args.analyze and not (args.benchmark or args.seed):
+        parser.error("--analyze executes every check query; use it on the benchmark database (--benchmark/--seed)")
+
+    if args.benchmark or args.seed:
+        # Indexes are only ever created on the throwaway benchmark database
+        from benchmark import use_bench_database, reset_database, generate_scale
+        use_bench_database()
+        if args.seed:
+            reset_database()
+            generate_scale(args.seed)
+    findings, proposals = advise(analyze=args.analyze)
+    print_table("Full scans and temporary/filesort plans", findings)
+    print("\nProposed indexes:")
+    for (table, column), names in sorted(proposals.items()):
+        print(f"CREATE INDEX `{index_name(table, column)}` ON `{table}` (`{column}`);  -- {len(names)} queries")
+    if args.benchmark and proposals:
+        print_table("Before / after", benchmark_proposals(proposals, args.repeat, args.keep))
@@ -0,0 +1,294 @@
+# /src/instrumentation.py
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+# Record every query run through pooled connections (db.connect_db); set to 0 to turn off.
+ENABLED = os.environ.get("BANKING_DQ_INSTRUMENT", "1") == "1"
+# Capture EXPLAIN FORMAT=JSON once per check and statement (costs an extra round trip each).
+EXPLAIN = os.environ.get("BANKING_DQ_EXPLAIN", "0") == "1"
+# Read rows examined from performance_schema after each statement (MySQL 8.0.16+); opt-in, as it costs
+# an extra round trip per statement. Bulk INSERT ... VALUES and executemany batches are never probed.
+ROWS_EXAMINED = os.environ.get("BANKING_DQ_ROWS_EXAMINED", "0") == "1"
+# Directory scraped by node_exporter's textfile collector; one <job>.prom file per job.
+# Mounted on every Airflow container by docker-compose (dq_data).
+METRICS_DIR = os.environ.get("BANKING_DQ_METRICS_DIR", "/opt/airflow/dq_data/metrics")
+UNSCOPED = 'unscoped'
+
+_local = threading.local()
+_lock = threading.Lock()
+# (check, statement digest) -> aggregated span; bounded by the number of distinct statements
+_spans = {}
+# Features the server turned out not to support
+_unsupported = set()
+
+
+@contextmanager
+def span(check):
+    """Attribute the queries run by this thread inside the block to `check`."""
+    previous = getattr(_local, "check", None)
+    _local.check = check
+    try:
+        yield
+    finally:
+        _local.check = previous
+
+
+def current_check():
+    return getattr(_local, "check", None) or UNSCOPED
+
+
+def normalize(sql):
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+def digest(sql):
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()[:12]
+
+
+def record(check, sql, seconds, rows_returned, rows_examined=None, plan=None):
+    key = (check, digest(sql))
+    with _lock:
+        entry = _spans.get(key)
+        if entry is None:
+            entry = _spans[key] = {'check': check, 'query': key[1], 'sql': normalize(sql)[:500], 'executions': 0,
+                                   'seconds': 0.0, 'max_seconds': 0.0, 'rows_returned': 0, 'rows_examined': None,
+                                   'plan': None, 'plan_digest': None}
+        entry['executions'] += 1
+        entry['seconds'] += seconds
+        entry['max_seconds'] = max(entry['max_seconds'], seconds)
+        entry['rows_returned'] += rows_returned
+        if rows_examined is not None:
+            entry['rows_examined'] = (entry['rows_examined'] or 0) + rows_examined
+        if plan is not None:
+            entry['plan'] = plan
+            entry['plan_digest'] = hashlib.sha1(json.dumps(
+                [(step['table'], step['access_type'], step['key']) for step in plan]).encode()).hexdigest()[:12]
+
+
+def has_plan(check, sql):
+    with _lock:
+        entry = _spans.get((check, digest(sql)))
+        return entry is not None and entry['plan'] is not None
+
+
+def plan_steps(node):
+    """Flatten EXPLAIN FORMAT=JSON into (table, access type, key, estimated rows) steps."""
+    steps = []
+    if isinstance(node, dict):
+        if 'table_name' in node:
+            steps.append({'table': node['table_name'], 'access_type': node.get('access_type'),
+                          'key': node.get('key'), 'rows': node.get('rows_examined_per_scan')})
+        for value in node.values():
+            steps.extend(plan_steps(value))
+    elif isinstance(node, list):
+        for value in node:
+            steps.extend(plan_steps(value))
+    return steps
+
+
+EXPLAINABLE = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|REPLACE|WITH)\b', re.IGNORECASE)
+# Row inserts that examine nothing worth a performance_schema probe (INSERT ... SELECT is still probed)
+BULK_WRITE = re.compile(r'^\s*(INSERT|REPLACE)\b(?!.*\bSELECT\b)', re.IGNORECASE | re.DOTALL)
+
+
+class InstrumentedCursor:
+    """Cursor proxy timing each statement from execute until its results are read or the next statement.
+
+    Rows returned are counted as they are fetched; rows examined and the
+    plan are looked up on the same session once the statement is finished.
+    """
+
+    def __init__(self, cursor, conn):
+        self._cursor = cursor
+        self._conn = conn
+        self._statement = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._count(1)
+            yield row
+
+    def _count(self, rows):
+        if self._statement is not None:
+            self._statement['rows'] += rows
+
+    def _start(self, sql, params, many=False):
+        self._finish()
+        check = current_check()
+        plan = None
+        if EXPLAIN and EXPLAINABLE.match(sql) and not has_plan(check, sql):
+            try:
+                explain = self._conn.cursor()
+                explain.execute(f"EXPLAIN FORMAT=JSON {sql}", params)
+                plan = plan_steps(json.loads(explain.fetchone()[0]))
+                explain.close()
+            except Exception as e:
+                plan = [{'table': None, 'access_type': f'EXPLAIN failed: {e}', 'key': None, 'rows': None}]
+        self._statement = {'check': check, 'sql': sql, 'plan': plan, 'rows': 0, 'started': time.perf_counter(),
+                           'probe': ROWS_EXAMINED and not many and not BULK_WRITE.match(sql)}
+
+    def _finish(self):
+        statement, self._statement = self._statement, None
+        if statement is None:
+            return
+        seconds = time.perf_counter() - statement['started']
+        rows_examined = None
+        if statement['probe'] and 'rows_examined' not in _unsupported:
+            try:
+                probe = self._conn.cursor()
+                probe.execute("""
+                    SELECT `ROWS_EXAMINED` FROM `performance_schema`.`events_statements_history`
+                    WHERE `THREAD_ID` = PS_CURRENT_THREAD_ID()
+                    ORDER BY `EVENT_ID` DESC LIMIT 1
+                """)
+                row = probe.fetchone()
+                probe.close()
+                rows_examined = int(row[0]) if row else None
+            except Exception as e:
+                # No statement history, no PS_CURRENT_THREAD_ID or no access to performance_schema:
+                # stop probing instead of failing again on every statement
+                _unsupported.add('rows_examined')
+                print(f"Rows examined not recorded, performance_schema probe failed: {e}")
+        record(statement['check'], statement['sql'], seconds, statement['rows'], rows_examined, statement['plan'])
+
+    def execute(self, sql, params=None, *args, **kwargs):
+        self._start(sql, params)
+        result = self._cursor.execute(sql, params, *args, **kwargs)
+        if self._cursor.with_rows is False:
+            self._statement['rows'] = max(self._cursor.rowcount, 0)
+        return result
+
+    def executemany(self, sql, seq_params, *args, **kwargs):
+        self._start(sql, None, many=True)
+        result = self._cursor.executemany(sql, seq_params, *args, **kwargs)
+        self._statement['rows'] = max(self._cursor.rowcount, 0)
+        return result
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        self._count(row is not None)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._count(len(rows))
+        return rows
+
+    def close(self):
+        self._finish()
+        return self._cursor.close()
+
+
+def instrument(cursor, conn):
+    return InstrumentedCursor(cursor, conn) if ENABLED else cursor
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+
+
+def query_spans():
+    """Per (check, statement) aggregates, slowest first."""
+    with _lock:
+        spans = [dict(entry) for entry in _spans.values()]
+    return sorted(spans, key=lambda entry: entry['seconds'], reverse=True)
+
+
+def check_spans():
+    """Per-check totals over their statements, slowest first; each lists its statements' digests and plans."""
+    checks = {}
+    for entry in query_spans():
+        check = checks.setdefault(entry['check'], {'check': entry['check'], 'queries': 0, 'executions': 0,
+                                                   'seconds': 0.0, 'rows_returned': 0, 'rows_examined': 0,
+                                                   'statements': []})
+        check['queries'] += 1
+        check['executions'] += entry['executions']
+        check['seconds'] += entry['seconds']
+        check['rows_returned'] += entry['rows_returned']
+        check['rows_examined'] += entry['rows_examined'] or 0
+        check['statements'].append({key: entry[key] for key in ('query', 'sql', 'executions', 'seconds',
+                                                                'rows_examined', 'plan_digest', 'plan')})
+    for check in checks.values():
+        check['seconds'] = round(check['seconds'], 4)
+    return sorted(checks.values(), key=lambda check: check['seconds'], reverse=True)
+
+
+def prometheus_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def prometheus_text(job, checks=None):
+    """Per-check and per-statement metrics in the Prometheus text exposition format.
+
+    checks defaults to this process's check_spans(); pass merged xcom_summary()
+    lists from several processes to export them together.
+    """
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            rendered = ','.join(f'{key}="{prometheus_label(val)}"' for key, val in dict(job=job, **labels).items())
+            lines.append(f"{name}{{{rendered}}} {value}")
+
+    checks = check_spans() if checks is None else checks
+    spans = [dict(statement, check=c['check']) for c in checks for statement in c['statements']]
+    metric('banking_dq_check_duration_seconds', 'gauge', 'Time spent in the queries of a check.',
+           [({'check': c['check']}, c['seconds']) for c in checks])
+    metric('banking_dq_check_queries', 'gauge', 'Statements executed by a check.',
+           [({'check': c['check']}, c['executions']) for c in checks])
+    metric('banking_dq_check_rows_returned', 'gauge', 'Rows returned to a check.',
+           [({'check': c['check']}, c['rows_returned']) for c in checks])
+    metric('banking_dq_check_rows_examined', 'gauge', 'Rows examined by the server for a check.',
+           [({'check': c['check']}, c['rows_examined']) for c in checks])
+    metric('banking_dq_query_duration_seconds', 'gauge', 'Time spent in one statement of a check.',
+           [({'check': s['check'], 'query': s['query']}, round(s['seconds'], 4)) for s in spans])
+    metric('banking_dq_query_plan_info', 'gauge', 'Plan digest of a statement; a change signals a plan change.',
+           [({'check': s['check'], 'query': s['query'], 'plan': s['plan_digest']}, 1)
+            for s in spans if s['plan_digest']])
+    metric('banking_dq_metrics_timestamp_seconds', 'gauge', 'When these metrics were written.',
+           [({}, round(time.time(), 3))])
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(job, directory=METRICS_DIR, checks=None):
+    """Write the metrics for a node_exporter textfile collector (atomically, via rename)."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{job}.prom")
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(prometheus_text(job, checks))
+    os.replace(tmp, path)
+    return path
+
+
+def xcom_summary():
+    """check_spans without the full plans, small enough for XCom; plan digests still show plan changes."""
+    summary = check_spans()
+    for check in summary:
+        for statement in check['statements']:
+            statement.pop('plan')
+            statement['sql'] = statement['sql'][:200]
+            statement['seconds'] = round(statement['seconds'], 4)
+    return summary
+
+
+def print_slowest(limit=5, checks=None):
+    for check in (check_spans() if checks is None else checks)[:limit]:
+        print(f"{check['check']}: {check['seconds']:.3f}s in {check['executions']} statements, "
+              f"{check['rows_examined']} rows examined, {check['rows_returned']} returned")
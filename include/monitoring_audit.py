@@ -1,108 +1,179 @@
 # /src/monitoring_audit.py
-import mysql.connector
 import pandas as pd
+import os
 from datetime import datetime, timedelta
-
-DB_PARAMS = {
-    "database": "test",
-    "user": "anhquan",
-    "password": "123",
-    "host": "172.19.0.3",
-    "port": 3306
-}
-
-def connect_db():
-    return mysql.connector.connect(**DB_PARAMS)
-
-
-def check_high_value_transactions():
+from functools import partial
+
+from db import connect_db, print_pool_stats, set_pool_size, TASK_POOL_SIZE
+from spend_summary import (SUMMARY_TABLE, HIGH_VALUE_AMOUNT, STRONG_AUTH_TYPES, UNKNOWN_CUSTOMER,
+                           refresh_spend_summary)
+import quarantine
+from quarantine import quarantine_select
+import instrumentation
+from result_history import record_run
+from snapshot_engine import (extract_snapshot, count_high_value_weak_auth, count_unverified_devices, count_daily_limit,
+                             AUDIT_SNAPSHOT_DIR, AUDIT_TABLES)
+from check_executor import CheckUnit, execute_checks, print_timings, DEFAULT_PARALLELISM, DEFAULT_TIMEOUT
+
+# 'snapshot' runs the audit on a local columnar snapshot instead of MySQL (see snapshot_engine).
+AUDIT_ENGINE = os.environ.get("BANKING_DQ_ENGINE", "sql")
+
+# Violating rows of the audit predicates; each returns the offending primary keys as `pk`.
+HIGH_VALUE_WEAK_AUTH_SQL = f"""
+    SELECT pt.`TransactionID` AS pk
+    FROM `PaymentTransaction` pt
+    LEFT JOIN `AuthenticationLog` al ON pt.`AuthLogID` = al.`AuthLogID`
+    WHERE pt.`Amount` > {HIGH_VALUE_AMOUNT}
+    AND (al.`AuthType` IS NULL OR al.`AuthType` NOT IN ({', '.join(f"'{t}'" for t in STRONG_AUTH_TYPES)}))
+"""
+UNVERIFIED_DEVICE_SQL = """
+    SELECT pt.`TransactionID` AS pk
+    FROM `PaymentTransaction` pt
+    JOIN `Device` d ON pt.`DeviceID` = d.`DeviceID`
+    WHERE d.`Status` IN ('Suspicious', 'Blocked')
+"""
+DAILY_LIMIT_SQL = f"""
+    SELECT DISTINCT `CustomerID` AS pk
+    FROM `{SUMMARY_TABLE}`
+    WHERE `SpendDate` >= CURDATE() - INTERVAL 1 DAY
+    AND `TotalAmount` > 20000000
+    AND `StrongAuthCount` = 0
+    AND `CustomerID` <> {UNKNOWN_CUSTOMER}
+"""
+
+
+def check_high_value_transactions(run_id=None, snapshot=None):
+    """Transactions over HIGH_VALUE_AMOUNT without strong auth.
+
+    With a run_id (as in the DAG) the offending transactions are selected from
+    PaymentTransaction joined with AuthenticationLog and quarantined, and the
+    count is the number of quarantined rows, so the reported count and the
+    quarantine come from the same predicate. Without a run_id the count is
+    read from the pre-aggregated spend summary (see spend_summary).
+    """
+    if snapshot is not None:
+        invalid_transactions = snapshot_violations(count_high_value_weak_auth(snapshot), HIGH_VALUE_WEAK_AUTH_SQL,
+                                                   run_id, 'audit:high_value_auth', 'PaymentTransaction')
+        return [high_value_row(invalid_transactions)]
+    if run_id:
+        return [high_value_row(count_violations(HIGH_VALUE_WEAK_AUTH_SQL, run_id, 'audit:high_value_auth',
+                                                'PaymentTransaction'))]
     conn = connect_db()
     cur = conn.cursor()
-    checks = []
-
-    cur.execute("""
-        SELECT pt.`TransactionID`, pt.`Amount`, pt.`AuthLogID`, al.`AuthType`
-        FROM `PaymentTransaction` pt
-        LEFT JOIN `AuthenticationLog` al ON pt.`AuthLogID` = al.`AuthLogID`
-        WHERE pt.`Amount` > 10000000
-        AND (al.`AuthType` IS NULL OR al.`AuthType` NOT IN ('OTP', 'Biometric'))
-    """)
-    invalid_transactions = cur.fetchall()
-
-    checks.append({
-        'Check': 'High-Value Transaction Auth',
-        'Status': 'FAIL' if invalid_transactions else 'PASS',
-        'Details': f'{len(invalid_transactions)} transactions >10M VND without strong auth'
-    })
-
+    cur.execute(f"SELECT COALESCE(SUM(`HighValueWeakAuthCount`), 0) FROM `{SUMMARY_TABLE}`")
+    invalid_transactions = int(cur.fetchone()[0])
     cur.close()
     conn.close()
-    return checks
+    return [high_value_row(invalid_transactions)]
 
 
-def check_unverified_devices():
-    conn = connect_db()
-    cur = conn.cursor()
-    checks = []
-
-    cur.execute("""
-        SELECT pt.`TransactionID`, d.`DeviceID`, d.`Status`
-        FROM `PaymentTransaction` pt
-        JOIN `Device` d ON pt.`DeviceID` = d.`DeviceID`
-        WHERE d.`Status` IN ('Suspicious', 'Blocked')
-    """)
-    unverified_devices = cur.fetchall()
-
-    checks.append({
-        'Check': 'Unverified Device Usage',
-        'Status': 'FAIL' if unverified_devices else 'PASS',
-        'Details': f'{len(unverified_devices)} transactions from unverified devices'
-    })
+def high_value_row(invalid_transactions):
+    return {
+        'Check': 'High-Value Transaction Auth',
+        'Status': 'FAIL' if invalid_transactions else 'PASS',
+        'Details': f'{invalid_transactions} transactions >10M VND without strong auth'
+    }
 
-    cur.close()
-    conn.close()
-    return checks
 
+def count_violations(select_sql, run_id, rule_name, table):
+    """Quarantine the rows of select_sql server-side and count them (or just count them without a run_id).
 
-def check_daily_transaction_limit():
+    The count is read back from the quarantine table, so a retried unit
+    still reports the rows its first attempt already wrote.
+    """
+    if run_id:
+        quarantine_select(run_id, rule_name, table, select_sql)
+        return quarantine.quarantined_count(run_id, rule_name)
     conn = connect_db()
     cur = conn.cursor()
-    checks = []
-
-    cur.execute("""
-        SELECT c.`CustomerID`, c.`FirstName`, c.`LastName`, SUM(pt.`Amount`) as TotalAmount
-        FROM `PaymentTransaction` pt
-        JOIN `BankAccount` ba ON pt.`AccountID` = ba.`AccountID`
-        JOIN `Customer` c ON ba.`CustomerID` = c.`CustomerID`
-        LEFT JOIN `AuthenticationLog` al ON pt.`AuthLogID` = al.`AuthLogID`
-        WHERE pt.`TransactionDate` >= NOW() - INTERVAL 1 DAY
-        GROUP BY c.`CustomerID`, c.`FirstName`, c.`LastName`
-        HAVING SUM(pt.`Amount`) > 20000000
-        AND COUNT(CASE WHEN al.`AuthType` IN ('OTP', 'Biometric') THEN 1 END) = 0
-    """)
-    high_spenders = cur.fetchall()
-
-    checks.append({
-        'Check': 'Daily Transaction Limit Auth',
-        'Status': 'FAIL' if high_spenders else 'PASS',
-        'Details': f'{len(high_spenders)} customers with >20M VND/day without strong auth'
-    })
-
+    cur.execute(f"SELECT COUNT(*) FROM ({select_sql}) q")
+    count = int(cur.fetchone()[0])
     cur.close()
     conn.close()
-    return checks
+    return count
 
 
-def run_monitoring_audit():
-    checks = []
-    checks.extend(check_high_value_transactions())
-    checks.extend(check_unverified_devices())
-    checks.extend(check_daily_transaction_limit())
+def snapshot_violations(count, select_sql, run_id, rule_name, table):
+    """A count from the snapshot; MySQL is only queried to quarantine the rows when there are violations."""
+    if count and run_id:
+        quarantine_select(run_id, rule_name, table, select_sql)
+    return count
 
+
+def check_unverified_devices(run_id=None, snapshot=None):
+    if snapshot is not None:
+        unverified_devices = snapshot_violations(count_unverified_devices(snapshot), UNVERIFIED_DEVICE_SQL, run_id,
+                                                 'audit:unverified_device', 'PaymentTransaction')
+    else:
+        unverified_devices = count_violations(UNVERIFIED_DEVICE_SQL, run_id, 'audit:unverified_device',
+                                              'PaymentTransaction')
+    return [{
+        'Check': 'Unverified Device Usage',
+        'Status': 'FAIL' if unverified_devices else 'PASS',
+        'Details': f'{unverified_devices} transactions from unverified devices'
+    }]
+
+
+def check_daily_transaction_limit(run_id=None, snapshot=None):
+    """Customer-days of yesterday and today over the limit without any strong auth, from the spend summary."""
+    if snapshot is not None:
+        high_spenders = snapshot_violations(count_daily_limit(snapshot), DAILY_LIMIT_SQL, run_id,
+                                            'audit:daily_limit', 'Customer')
+    else:
+        high_spenders = count_violations(DAILY_LIMIT_SQL, run_id, 'audit:daily_limit', 'Customer')
+    return [{
+        'Check': 'Daily Transaction Limit Auth',
+        'Status': 'FAIL' if high_spenders else 'PASS',
+        'Details': f'{high_spenders} customers with >20M VND/day without strong auth'
+    }]
+
+
+def audit_units(run_id=None, snapshot=None):
+    """The audit checks are independent of each other and can run concurrently."""
+    return [
+        CheckUnit('High-Value Transaction Auth', partial(check_high_value_transactions, run_id, snapshot),
+                  {'Check': 'High-Value Transaction Auth'}),
+        CheckUnit('Unverified Device Usage', partial(check_unverified_devices, run_id, snapshot),
+                  {'Check': 'Unverified Device Usage'}),
+        CheckUnit('Daily Transaction Limit Auth', partial(check_daily_transaction_limit, run_id, snapshot),
+                  {'Check': 'Daily Transaction Limit Auth'}),
+    ]
+
+
+def audit_run_id(run_id=None):
+    if not quarantine.ENABLED:
+        return None
+    quarantine.prepare_quarantine()
+    return run_id or quarantine.new_run_id('audit')
+
+
+def run_monitoring_audit(max_workers=DEFAULT_PARALLELISM, timeout=DEFAULT_TIMEOUT, run_id=None,
+                         engine=AUDIT_ENGINE):
+    """engine='snapshot' computes the audit from a local snapshot, without the spend summary."""
+    instrumentation.reset()
+    snapshot = None
+    if engine == 'snapshot':
+        with instrumentation.span('Extract Snapshot'):
+            snapshot = extract_snapshot(AUDIT_SNAPSHOT_DIR, AUDIT_TABLES)
+    else:
+        with instrumentation.span('Refresh Spend Summary'):
+            refresh_spend_summary()
+    run_id = run_id or quarantine.new_run_id('audit')
+    units = audit_units(audit_run_id(run_id), snapshot)
+    checks, timings, wall_seconds = execute_checks(units, max_workers=max_workers, timeout=timeout)
+    return report_audit(checks, timings, wall_seconds, instrumentation.xcom_summary(), run_id)
+
+
+def report_audit(checks, timings, wall_seconds, spans=None, run_id=None):
     # Convert to DataFrame for summary
     # df = pd.DataFrame(checks)
     print("\nMonitoring and Audit Summary:")
     print(f"checks = {checks}")
+    print_timings(timings, wall_seconds)
+    record_run('banking_audit', run_id or quarantine.new_run_id('audit'), checks, timings)
+    instrumentation.print_slowest(checks=spans)
+    instrumentation.write_prometheus('banking_audit', checks=spans)
+    print_pool_stats()
     # print(df)
     # df.to_csv('monitoring_audit_report.csv', index=False)
 
@@ -111,8 +182,43 @@ def run_monitoring_audit():
     # if not failed_checks.empty:
     #    print("\nFailed Checks:")
     #    print(failed_checks)
+    return checks
+
 
-    
+def audit_unit_names():
+    return [unit.name for unit in audit_units()]
+
+
+def run_audit_unit(name, timeout=DEFAULT_TIMEOUT, run_id=None):
+    """Run one audit check (after refresh_spend_summary); JSON-serializable result for task mapping."""
+    set_pool_size(TASK_POOL_SIZE)
+    instrumentation.reset()
+    units = [unit for unit in audit_units(audit_run_id(run_id)) if unit.name == name]
+    if not units:
+        raise ValueError(f"No audit check named {name!r}")
+    checks, timings, _ = execute_checks(units, max_workers=1, timeout=timeout)
+    print(f"{name}: {timings[0]} {checks}")
+    if timings[0]['Status'] not in ('PASS', 'FAIL'):
+        raise RuntimeError(f"{name}: {checks[0]['Details']}")
+    return {'name': name, 'checks': checks, 'timings': timings, 'spans': instrumentation.xcom_summary()}
+
+
+def aggregate_audit_units(names, results, run_id=None):
+    """Combine run_audit_unit results; checks whose task failed are reported as FAIL."""
+    finished = {result['name']: result for result in results if result}
+    checks, timings, spans = [], [], []
+    for name in names:
+        result = finished.get(name)
+        if result is None:
+            checks.append({'Check': name, 'Status': 'FAIL', 'Details': 'Check task failed, see its task log'})
+            timings.append({'Check': name, 'Status': 'ERROR', 'Elapsed (s)': None})
+            continue
+        checks.extend(result['checks'])
+        timings.extend(result['timings'])
+        spans.extend(result['spans'])
+    elapsed = [t['Elapsed (s)'] for t in timings if t['Elapsed (s)'] is not None]
+    return report_audit(checks, timings, max(elapsed, default=0.0),
+                        sorted(spans, key=lambda check: check['seconds'], reverse=True), run_id)
 
 
 if __name__ == "__main__":
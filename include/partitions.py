@@ -0,0 +1,166 @@
+# /src/partitions.py
+import argparse
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+from db import connect_db
+from watermarks import PARTITION_COLUMNS, partitioned_tables, incremental_bounds
+from check_registry import expand_rules, load_rules, compile_table_query, group_by_table
+from spend_summary import summarize_sql, SUMMARY_TABLE
+
+# Daily partitions created ahead of today, so inserts never land in pmax.
+DAYS_AHEAD = int(os.environ.get("BANKING_PARTITION_DAYS_AHEAD", "7"))
+# Days before today that get their own partition when the daily partitions are first created
+# (the generator back-dates timestamps up to 30 days); anything older stays in p_history.
+BACKFILL_DAYS = int(os.environ.get("BANKING_PARTITION_BACKFILL_DAYS", "31"))
+# Drop daily partitions older than this many days; 0 keeps every partition.
+RETENTION_DAYS = int(os.environ.get("BANKING_PARTITION_RETENTION_DAYS", "0"))
+MAXVALUE = 'MAXVALUE'
+
+
+def partition_bound(description):
+    """Upper bound of a RANGE COLUMNS partition as a date, or None for MAXVALUE."""
+    value = description.strip("'")
+    return None if value == MAXVALUE else datetime.strptime(value[:10], '%Y-%m-%d').date()
+
+
+def table_partitions(cur, table):
+    """[(name, lower bound, upper bound)] in order; bounds are dates, None when open."""
+    cur.execute("""
+        SELECT `PARTITION_NAME`, `PARTITION_DESCRIPTION` FROM `information_schema`.`PARTITIONS`
+        WHERE `TABLE_SCHEMA` = DATABASE() AND `TABLE_NAME` = %s AND `PARTITION_NAME` IS NOT NULL
+        ORDER BY `PARTITION_ORDINAL_POSITION`
+    """, (table,))
+    partitions, lower = [], None
+    for name, description in cur.fetchall():
+        upper = partition_bound(description)
+        partitions.append((name, lower, upper))
+        lower = upper
+    return partitions
+
+
+def daily_partition(day):
+    return f"PARTITION p{day:%Y%m%d} VALUES LESS THAN ('{day + timedelta(days=1):%Y-%m-%d}')"
+
+
+def maintain_table(cur, table, today, days_ahead=DAYS_AHEAD, backfill_days=BACKFILL_DAYS,
+                   retention_days=RETENTION_DAYS):
+    """Split pmax into the missing daily partitions up to today + days_ahead, drop expired ones."""
+    partitions = table_partitions(cur, table)
+    last_bound = max((upper for _, _, upper in partitions if upper is not None), default=None)
+    first_day = today - timedelta(days=backfill_days)
+    if last_bound is not None:
+        first_day = max(first_day, last_bound)
+    days = [first_day + timedelta(days=i) for i in range((today + timedelta(days=days_ahead) - first_day).days + 1)]
+    created = []
+    if days:
+        # The first new partition also takes any gap back to the previous bound
+        cur.execute(f"ALTER TABLE `{table}` REORGANIZE PARTITION `pmax` INTO ("
+                    f"{', '.join(daily_partition(day) for day in days)}, PARTITION pmax VALUES LESS THAN (MAXVALUE))")
+        created = [f"p{day:%Y%m%d}" for day in days]
+    dropped = []
+    if retention_days:
+        cutoff = today - timedelta(days=retention_days)
+        dropped = [name for name, _, upper in partitions if upper is not None and upper <= cutoff]
+        if dropped:
+            cur.execute(f"ALTER TABLE `{table}` DROP PARTITION {', '.join(f'`{name}`' for name in dropped)}")
+    return created, dropped
+
+
+def maintain_partitions(days_ahead=DAYS_AHEAD, backfill_days=BACKFILL_DAYS, retention_days=RETENTION_DAYS,
+                        today=None):
+    """Roll the daily partitions of every partitioned table; a no-op on the unpartitioned schema.sql."""
+    today = today or date.today()
+    conn = connect_db()
+    cur = conn.cursor()
+    partitioned = partitioned_tables(cur)
+    if not partitioned:
+        print("No partitioned tables (schema.sql); nothing to maintain")
+    result = {}
+    for table in sorted(partitioned):
+        created, dropped = maintain_table(cur, table, today, days_ahead, backfill_days, retention_days)
+        result[table] = {'created': len(created), 'dropped': dropped}
+        print(f"{table}: {len(created)} daily partitions created "
+              f"({created[0] if created else '-'}..{created[-1] if created else '-'}), dropped {dropped}")
+    cur.close()
+    conn.close()
+    return result
+
+
+def explain_partitions(cur, sql, params=()):
+    """Partitions each table of a statement reads according to EXPLAIN, keyed by table alias."""
+    cur.execute(f"EXPLAIN {sql}", params)
+    columns = [column[0] for column in cur.description]
+    accessed = {}
+    for row in cur.fetchall():
+        row = dict(zip(columns, row))
+        if row.get('table') and row.get('partitions') is not None:
+            accessed.setdefault(row['table'], set()).update(row['partitions'].split(','))
+    return accessed
+
+
+def expected_partitions(partitions, first, last):
+    """Partitions whose range overlaps [first, last] (datetime strings)."""
+    first, last = date.fromisoformat(first[:10]), date.fromisoformat(last[:10])
+    return {name for name, lower, upper in partitions
+            if (upper is None or first < upper) and (lower is None or last >= lower)}
+
+
+def pruning_queries(bounds, rules=None):
+    """(description, partitioned table, alias, sql, params) of the incremental queries that must prune."""
+    queries = []
+    by_table = group_by_table(expand_rules(load_rules() if rules is None else rules))
+    for table in PARTITION_COLUMNS:
+        if table in by_table and table in bounds and len(bounds[table]) == 4:
+            query = compile_table_query(table, by_table[table], bounds)
+            queries.append((f"incremental DQ scan of {table}", table, 'c', query.sql, query.params, bounds[table]))
+    transactions = bounds.get('PaymentTransaction')
+    if transactions and len(transactions) == 4:
+        low, high, first, last = transactions
+        queries.append(("spend summary refresh", 'PaymentTransaction', 'pt', summarize_sql(SUMMARY_TABLE, span=True),
+                        (low or 0, high, first, last), transactions))
+    return queries
+
+
+def verify_pruning(bounds=None, rules=None):
+    """EXPLAIN every incremental query on a partitioned table and check it reads only the partitions it needs.
+
+    A query passes when the partitions in its plan are a subset of the ones
+    overlapping the increment's date span. Returns (rows, all passed).
+    """
+    bounds = incremental_bounds() if bounds is None else bounds
+    conn = connect_db()
+    cur = conn.cursor()
+    rows = []
+    for description, table, alias, sql, params, bound in pruning_queries(bounds, rules):
+        partitions = table_partitions(cur, table)
+        if bound[2] is None:
+            rows.append({'Query': description, 'Table': table, 'Read': 0, 'Expected': 0,
+                         'Total': len(partitions), 'Status': 'PASS', 'Details': 'No new rows'})
+            continue
+        accessed = explain_partitions(cur, sql, params).get(alias, set())
+        expected = expected_partitions(partitions, bound[2], bound[3])
+        extra = sorted(accessed - expected)
+        rows.append({'Query': description, 'Table': table, 'Read': len(accessed), 'Expected': len(expected),
+                     'Total': len(partitions), 'Status': 'FAIL' if extra else 'PASS',
+                     'Details': f"unneeded partitions read: {extra}" if extra else
+                                f"{bound[2]} .. {bound[3]} -> {sorted(accessed)}"})
+    cur.close()
+    conn.close()
+    for row in rows:
+        print(row)
+    return rows, all(row['Status'] == 'PASS' for row in rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the daily partitions and verify partition pruning")
+    parser.add_argument("command", choices=["maintain", "verify"])
+    parser.add_argument("--days-ahead", type=int, default=DAYS_AHEAD)
+    parser.add_argument("--retention-days", type=int, default=RETENTION_DAYS)
+    args = parser.parse_args()
+    if args.command == "maintain":
+        maintain_partitions(args.days_ahead, retention_days=args.retention_days)
+    else:
+        _, passed = verify_pruning()
+        sys.exit(0 if passed else 1)
@@ -0,0 +1,124 @@
+# /src/quarantine.py
+import os
+from datetime import datetime
+
+from db import connect_db
+from watermarks import WATERMARK_COLUMNS, scope_predicate
+from check_registry import violation_predicate, rule_id
+
+QUARANTINE_TABLE = 'DQQuarantine'
+# Write the keys of violating rows for every failing rule; set to 0 to only count.
+ENABLED = os.environ.get("BANKING_DQ_QUARANTINE", "1") == "1"
+RETENTION_DAYS = int(os.environ.get("BANKING_DQ_QUARANTINE_RETENTION_DAYS", "30"))
+# Keys per multi-row INSERT when the violating keys were found client-side.
+QUARANTINE_BATCH = 5000
+
+
+def ensure_quarantine_table(cur):
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS `{QUARANTINE_TABLE}` (
+            `RunID` VARCHAR(64) NOT NULL,
+            `RuleID` VARCHAR(128) NOT NULL,
+            `TableName` VARCHAR(64) NOT NULL,
+            `PrimaryKey` BIGINT UNSIGNED NOT NULL,
+            `QuarantinedAt` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (`RunID`, `RuleID`, `TableName`, `PrimaryKey`),
+            INDEX `idx_quarantine_row` (`TableName`, `PrimaryKey`)
+        )
+    """)
+
+
+def new_run_id(prefix='dq'):
+    return f"{prefix}-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}"
+
+
+def prepare_quarantine(retention_days=RETENTION_DAYS):
+    """Create the quarantine table and drop runs older than the retention period."""
+    conn = connect_db()
+    cur = conn.cursor()
+    ensure_quarantine_table(cur)
+    cur.execute(f"DELETE FROM `{QUARANTINE_TABLE}` WHERE `QuarantinedAt` < NOW() - INTERVAL %s DAY",
+                (retention_days,))
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def quarantine_select(run_id, rule_name, table, select_sql, params=()):
+    """INSERT ... SELECT the primary keys returned by select_sql; only the row count comes back.
+
+    INSERT IGNORE keeps a retried run from failing on keys it already wrote.
+    """
+    conn = connect_db()
+    cur = conn.cursor()
+    cur.execute(f"""
+        INSERT IGNORE INTO `{QUARANTINE_TABLE}` (`RunID`, `RuleID`, `TableName`, `PrimaryKey`)
+        SELECT %s, %s, %s, q.pk FROM ({select_sql}) q
+    """, (run_id, rule_name, table) + tuple(params))
+    quarantined = cur.rowcount
+    conn.commit()
+    cur.close()
+    conn.close()
+    return quarantined
+
+
+def quarantined_count(run_id, rule_name):
+    """Rows quarantined for a rule under a run, including those written by an earlier attempt of the run."""
+    conn = connect_db()
+    cur = conn.cursor()
+    cur.execute(f"SELECT COUNT(*) FROM `{QUARANTINE_TABLE}` WHERE `RunID` = %s AND `RuleID` = %s",
+                (run_id, rule_name))
+    count = int(cur.fetchone()[0])
+    cur.close()
+    conn.close()
+    return count
+
+
+def quarantine_keys(run_id, rule_name, table, keys, batch_size=QUARANTINE_BATCH):
+    """INSERT IGNORE primary keys found client-side (e.g. by chunk_engine); returns the rows written."""
+    keys = [int(key) for key in keys]
+    if not keys:
+        return 0
+    conn = connect_db()
+    cur = conn.cursor()
+    written = 0
+    for i in range(0, len(keys), batch_size):
+        cur.executemany(f"""
+            INSERT IGNORE INTO `{QUARANTINE_TABLE}` (`RunID`, `RuleID`, `TableName`, `PrimaryKey`)
+            VALUES (%s, %s, %s, %s)
+        """, [(run_id, rule_name, table, key) for key in keys[i:i + batch_size]])
+        written += max(cur.rowcount, 0)
+    conn.commit()
+    cur.close()
+    conn.close()
+    return written
+
+
+def rule_select(rule, bounds=None):
+    """SELECT (and params) of the primary keys of the rows violating one registry rule, within the scope."""
+    table = rule['table']
+    joins = []
+    predicate, params = violation_predicate(rule, 'c', joins, bounds)
+    scope, scope_params = scope_predicate(table, bounds, alias='c')
+    select_sql = "SELECT c.`{}` AS pk FROM `{}` c{} WHERE {} AND {}".format(
+        WATERMARK_COLUMNS[table], table, ''.join(f"\n{join}" for join in joins), predicate, scope)
+    return select_sql, tuple(params) + tuple(scope_params)
+
+
+def quarantine_rule(rule, run_id, bounds=None):
+    """Quarantine the rows violating one registry rule, within the run's watermark scope."""
+    return quarantine_select(run_id, rule_id(rule), rule['table'], *rule_select(rule, bounds))
+
+
+def quarantine_failures(rules, run_id, bounds, run):
+    """Run a check unit, then quarantine the rows of each of its rules that reported FAIL.
+
+    rules maps rule seq -> rule; rows are matched to rules through '_seq'.
+    The quarantined row count is appended to the row's details.
+    """
+    rows = run()
+    for row in rows:
+        rule = rules.get(row.get('_seq'))
+        if rule is not None and row['Status'] == 'FAIL':
+            row['Details'] += f" ({quarantine_rule(rule, run_id, bounds)} rows quarantined as {rule_id(rule)})"
+    return rows
@@ -0,0 +1,164 @@
+# /src/result_history.py
+import argparse
+import os
+import re
+import traceback
+from datetime import datetime, timedelta
+
+# Append-only Parquet history of every DQ and audit run, partitioned as <dataset>/run_date=YYYY-MM-DD/.
+# Must be shared by every worker: docker-compose mounts dq_data on each Airflow container.
+HISTORY_DIR = os.environ.get("BANKING_DQ_HISTORY_DIR", "/opt/airflow/dq_data/history")
+# Record each run's check rows and timings; set to 0 to turn off.
+ENABLED = os.environ.get("BANKING_DQ_HISTORY", "1") == "1"
+CHECKS = 'checks'
+TIMINGS = 'timings'
+# Leading violation count of a check row's details, e.g. '12 null values found' or '~40 violations estimated ...'
+VIOLATIONS = re.compile(r'^~?(\d+)\b')
+
+
+def schemas():
+    import pyarrow as pa
+    run = [('run_id', pa.string()), ('job', pa.string()), ('run_ts', pa.timestamp('s'))]
+    return {
+        CHECKS: pa.schema(run + [('table', pa.string()), ('column', pa.string()), ('check', pa.string()),
+                                 ('status', pa.string()), ('violations', pa.int64()), ('details', pa.string())]),
+        TIMINGS: pa.schema(run + [('check', pa.string()), ('status', pa.string()), ('elapsed_s', pa.float64())]),
+    }
+
+
+def violation_count(row):
+    """Violations reported by a check row: 0 when it passed, None when the check errored or timed out."""
+    match = VIOLATIONS.match(str(row.get('Details', '')))
+    if match:
+        return int(match.group(1))
+    return 0 if row.get('Status') == 'PASS' else None
+
+
+def append_run(job, run_id, checks, timings, run_ts=None, directory=HISTORY_DIR):
+    """Write one run as a new file in each dataset; earlier runs are never rewritten.
+
+    The file is named after the run, so a retried aggregation overwrites its
+    own earlier attempt instead of adding a duplicate run.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    run_ts = (run_ts or datetime.now()).replace(microsecond=0)
+    run = {'run_id': run_id, 'job': job, 'run_ts': run_ts}
+    records = {
+        CHECKS: [dict(run, table=row.get('Table'), column=row.get('Column'), check=row.get('Check'),
+                      status=row.get('Status'), violations=violation_count(row), details=row.get('Details'))
+                 for row in checks],
+        TIMINGS: [dict(run, check=t['Check'], status=t['Status'], elapsed_s=t['Elapsed (s)']) for t in timings],
+    }
+    paths = []
+    for dataset, schema in schemas().items():
+        partition = os.path.join(directory, dataset, f"run_date={run_ts.date().isoformat()}")
+        os.makedirs(partition, exist_ok=True)
+        path = os.path.join(partition, f"{job}-{re.sub(r'[^A-Za-z0-9_.-]', '_', run_id)}.parquet")
+        tmp = f"{path}.tmp"
+        pq.write_table(pa.Table.from_pylist(records[dataset], schema=schema), tmp)
+        os.replace(tmp, path)
+        paths.append(path)
+    return paths
+
+
+def record_run(job, run_id, checks, timings, run_ts=None, directory=HISTORY_DIR):
+    """append_run for the report functions.
+
+    A history that cannot be written fails the calling task (after its
+    results were printed) rather than silently leaving a gap in the trends.
+    """
+    if not ENABLED:
+        return None
+    try:
+        paths = append_run(job, run_id, checks, timings, run_ts, directory)
+    except Exception as e:
+        traceback.print_exc()
+        raise RuntimeError(f"Result history of run {run_id} not written to {directory}: {e}") from e
+    print(f"Run {run_id} appended to the result history in {directory}")
+    return paths
+
+
+def scan(dataset, columns, days, job=None, directory=HISTORY_DIR):
+    """Record batches of the last `days` run dates, reading only the needed columns and partitions."""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    path = os.path.join(directory, dataset)
+    if not os.path.isdir(path):
+        return
+    schema = schemas()[dataset].append(pa.field('run_date', pa.string()))
+    data = ds.dataset(path, format='parquet', partitioning='hive', schema=schema)
+    since = (datetime.now().date() - timedelta(days=days - 1)).isoformat()
+    condition = ds.field('run_date') >= since
+    if job:
+        condition = condition & (ds.field('job') == job)
+    yield from data.to_batches(columns=columns, filter=condition)
+
+
+def aggregate(batches, keys, aggregations):
+    """Group every batch on its own, keeping only the per-group partial aggregates in memory."""
+    import pyarrow as pa
+    partials = [pa.Table.from_batches([batch]).group_by(keys).aggregate(aggregations)
+                for batch in batches if batch.num_rows]
+    return pa.concat_tables(partials).to_pylist() if partials else []
+
+
+def failure_rate(days=30, job=None, directory=HISTORY_DIR):
+    """Per rule (job, table, column, check): runs, failures, failure rate and violations over the last `days` days.
+
+    Highest failure rate first.
+    """
+    import pyarrow.compute as pc
+
+    def batches():
+        for batch in scan(CHECKS, ['job', 'table', 'column', 'check', 'status', 'violations'], days, job, directory):
+            failed = pc.cast(pc.equal(batch.column('status'), 'FAIL'), 'int64')
+            yield batch.append_column('failed', failed)
+
+    keys = ['job', 'table', 'column', 'check']
+    rules = {}
+    for part in aggregate(batches(), keys, [('failed', 'count'), ('failed', 'sum'), ('violations', 'sum'),
+                                            ('violations', 'max')]):
+        rule = rules.setdefault(tuple(part[key] for key in keys), dict(
+            zip(keys, (part[key] for key in keys)), runs=0, failures=0, violations=0, max_violations=0))
+        rule['runs'] += part['failed_count']
+        rule['failures'] += part['failed_sum'] or 0
+        rule['violations'] += part['violations_sum'] or 0
+        rule['max_violations'] = max(rule['max_violations'], part['violations_max'] or 0)
+    for rule in rules.values():
+        rule['failure_rate'] = round(rule['failures'] / rule['runs'], 4) if rule['runs'] else None
+    return sorted(rules.values(), key=lambda rule: (rule['failure_rate'] or 0, rule['violations']), reverse=True)
+
+
+def slowest_rules(days=30, limit=10, job=None, directory=HISTORY_DIR):
+    """Check units (a table scan covers all rules of its table) by mean elapsed time over the last `days` days."""
+    keys = ['job', 'check']
+    units = {}
+    batches = scan(TIMINGS, ['job', 'check', 'status', 'elapsed_s'], days, job, directory)
+    for part in aggregate(batches, keys, [('elapsed_s', 'count'), ('elapsed_s', 'sum'), ('elapsed_s', 'max')]):
+        unit = units.setdefault((part['job'], part['check']), {'job': part['job'], 'check': part['check'],
+                                                               'runs': 0, 'total_s': 0.0, 'max_s': 0.0})
+        unit['runs'] += part['elapsed_s_count']
+        unit['total_s'] += part['elapsed_s_sum'] or 0.0
+        unit['max_s'] = max(unit['max_s'], part['elapsed_s_max'] or 0.0)
+    for unit in units.values():
+        unit['mean_s'] = round(unit['total_s'] / unit['runs'], 3) if unit['runs'] else None
+        unit['total_s'] = round(unit['total_s'], 3)
+    return sorted(units.values(), key=lambda unit: unit['mean_s'] or 0, reverse=True)[:limit]
+
+
+if __name__ == "__main__":
+    import pandas as pd
+    parser = argparse.ArgumentParser(description="Trends from the DQ and audit result history")
+    parser.add_argument("query", choices=["failure-rate", "slowest"])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--job", default=None, help="banking_dq, banking_audit or banking_drift")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--dir", default=HISTORY_DIR)
+    args = parser.parse_args()
+
+    if args.query == "failure-rate":
+        rows = failure_rate(args.days, args.job, args.dir)[:args.limit]
+    else:
+        rows = slowest_rules(args.days, args.limit, args.job, args.dir)
+    print(pd.DataFrame(rows).to_string(index=False))
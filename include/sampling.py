@@ -0,0 +1,155 @@
+# /src/sampling.py
+import math
+import os
+import random
+from functools import partial
+
+from db import connect_db
+from watermarks import WATERMARK_COLUMNS
+from check_registry import compile_table_query, group_by_table, result_row
+from check_executor import CheckUnit
+
+# Rule kinds that are estimated from a sample on large tables (joins and regexes dominate their cost).
+SAMPLED_KINDS = ['foreign_keys', 'format']
+SAMPLE_SIZE = int(os.environ.get("BANKING_DQ_SAMPLE_SIZE", "100000"))
+# Rows of a block are not independent (neighbouring keys share load batches), so the error bound is computed
+# over blocks; many small blocks keep it tight.
+SAMPLE_BLOCKS = int(os.environ.get("BANKING_DQ_SAMPLE_BLOCKS", "1000"))
+# Tables whose primary-key span is smaller than this are checked exactly.
+SAMPLE_MIN_ROWS = int(os.environ.get("BANKING_DQ_SAMPLE_MIN_ROWS", "1000000"))
+# Estimated violation rate above which a sampled rule is re-run exactly.
+ESCALATION_THRESHOLD = float(os.environ.get("BANKING_DQ_ESCALATION_THRESHOLD", "0"))
+Z_95 = 1.96
+
+
+def wilson_interval(violations, n, z=Z_95):
+    """Wilson score interval of a proportion; stays sensible for 0 or n violations."""
+    if n == 0:
+        return 0.0, 1.0
+    p = violations / n
+    denominator = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+def cluster_interval(violations, rows, z=Z_95):
+    """Confidence interval of a violation rate sampled in blocks (per-block violation and row counts).
+
+    The rate is the ratio estimate sum(violations) / sum(rows). Its variance
+    comes from the spread of the block rates, giving a design effect over a
+    simple random sample; the Wilson interval is then taken at the effective
+    sample size rows / design effect. With no violation seen (or only
+    violations) the spread says nothing, and each block counts as a single
+    observation.
+    """
+    n, blocks = sum(rows), len(rows)
+    if n == 0:
+        return 0.0, 1.0
+    total = sum(violations)
+    rate = total / n
+    if 0 < total < n and blocks > 1:
+        mean_rows = n / blocks
+        cluster_variance = (sum((v - rate * m) ** 2 for v, m in zip(violations, rows))
+                            / (blocks * (blocks - 1) * mean_rows * mean_rows))
+        design_effect = max(1.0, cluster_variance / (rate * (1 - rate) / n))
+    else:
+        design_effect = n / blocks
+    effective_n = n / design_effect
+    return wilson_interval(rate * effective_n, effective_n, z)
+
+
+def block_sample(low, high, sample_size, blocks, rng):
+    """Merged primary-key intervals of `blocks` random blocks covering about sample_size keys."""
+    block_len = max(1, math.ceil(sample_size / blocks))
+    if high - low + 1 <= sample_size:
+        return [(low, high)]
+    starts = sorted(rng.randint(low, high - block_len + 1) for _ in range(blocks))
+    intervals = []
+    for start in starts:
+        end = start + block_len - 1
+        if intervals and start <= intervals[-1][1] + 1:
+            intervals[-1] = (intervals[-1][0], max(intervals[-1][1], end))
+        else:
+            intervals.append((start, end))
+    return intervals
+
+
+def sampled_table_rules(table, rules, sample_size=SAMPLE_SIZE, blocks=SAMPLE_BLOCKS, min_rows=SAMPLE_MIN_ROWS,
+                        threshold=ESCALATION_THRESHOLD, seed=None):
+    """Evaluate rules of one table on a primary-key block sample.
+
+    Each rule gets an estimated violation count with a 95% bound computed
+    over the sampled blocks (cluster_interval), not over individual rows.
+    Rules whose estimated rate is above `threshold` (by default: any
+    violation seen in the sample) are escalated to an exact query, so FAIL
+    counts are exact and PASS results carry the sampling error bound.
+    Rows carry 'Mode' (exact/sampled) and 'Error Bound' (+/- violations).
+    """
+    pk = WATERMARK_COLUMNS[table]
+    conn = connect_db()
+    cur = conn.cursor()
+    cur.execute(f"SELECT MIN(`{pk}`), MAX(`{pk}`) FROM `{table}`")
+    low, high = cur.fetchone()
+
+    def run(query):
+        cur.execute(query.sql, query.params)
+        return [int(v) for v in cur.fetchone()]
+
+    checks = []
+    if low is None or high - low + 1 <= max(min_rows, sample_size):
+        # Small table: an exact scan is cheap enough
+        for rule, count in zip(rules, run(compile_table_query(table, rules))):
+            checks.append(dict(result_row(rule, count), **{'Mode': 'exact', 'Error Bound': 0}))
+    else:
+        intervals = block_sample(low, high, sample_size, blocks, random.Random(seed))
+        where = '(' + ' OR '.join(f"c.`{pk}` BETWEEN %s AND %s" for _ in intervals) + ')'
+        where_params = tuple(v for interval in intervals for v in interval)
+        # INTERVAL() gives the index of the sampled interval holding the row
+        block = f"INTERVAL(c.`{pk}`, {', '.join(['%s'] * len(intervals))})"
+        query = compile_table_query(table, rules, where=where, where_params=where_params, count_rows=True,
+                                    group_by=block, group_params=tuple(start for start, _ in intervals))
+        cur.execute(query.sql, query.params)
+        by_block = {int(row[0]): [int(v) for v in row[1:]] for row in cur.fetchall()}
+        # Blocks without rows (gaps in the keys) were sampled too
+        per_block = [by_block.get(i + 1, [0] * (len(rules) + 1)) for i in range(len(intervals))]
+        block_rows = [counts[0] for counts in per_block]
+        sampled_rows = sum(block_rows)
+        violations = [sum(counts[j + 1] for counts in per_block) for j in range(len(rules))]
+        sampled_span = sum(end - start + 1 for start, end in intervals)
+        estimated_rows = sampled_rows * (high - low + 1) / sampled_span
+        escalate = []
+        for j, (rule, count) in enumerate(zip(rules, violations)):
+            rate = count / sampled_rows if sampled_rows else 0.0
+            if rate > threshold:
+                escalate.append(rule)
+                continue
+            lower, upper = cluster_interval([counts[j + 1] for counts in per_block], block_rows)
+            estimate = rate * estimated_rows
+            bound = max(rate - lower, upper - rate) * estimated_rows
+            row = result_row(rule, count)
+            row['Details'] = (f"~{estimate:.0f} violations estimated from {sampled_rows} sampled rows in "
+                              f"{len(intervals)} blocks (rate {rate:.4%}, 95% CI [{lower:.4%}, {upper:.4%}])")
+            checks.append(dict(row, **{'Mode': 'sampled', 'Error Bound': round(bound)}))
+        if escalate:
+            for rule, count in zip(escalate, run(compile_table_query(table, escalate))):
+                checks.append(dict(result_row(rule, count), **{'Mode': 'exact', 'Error Bound': 0}))
+
+    cur.close()
+    conn.close()
+    return checks
+
+
+def sampled_units(rules, **options):
+    """One CheckUnit per table for the rules that may be sampled."""
+    return [
+        CheckUnit(f'Sampled Scan {table}', partial(sampled_table_rules, table, table_rules, **options),
+                  {'Table': table, 'Column': '*', 'Check': 'Sampled Scan', '_seq': table_rules[0]['seq']})
+        for table, table_rules in group_by_table(rules).items()
+    ]
+
+
+def split_sampled(rules, kinds=SAMPLED_KINDS):
+    """(rules evaluated exactly, rules that may be sampled)."""
+    return ([rule for rule in rules if rule['kind'] not in kinds],
+            [rule for rule in rules if rule['kind'] in kinds])
@@ -0,0 +1,316 @@
+# /src/snapshot_engine.py
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+import unicodedata
+from datetime import date, timedelta
+from decimal import Decimal
+from functools import partial
+
+from db import connect_db
+from watermarks import WATERMARK_COLUMNS
+from check_registry import result_row, group_by_table, expand_rules, load_rules, order_rows
+from check_executor import CheckUnit, execute_checks
+from spend_summary import HIGH_VALUE_AMOUNT, STRONG_AUTH_TYPES, UNKNOWN_CUSTOMER
+
+# Local copy of the eight schema.sql tables, one Parquet file per table, replaced on every extraction.
+# On the dq_data volume docker-compose mounts on every Airflow container.
+SNAPSHOT_DIR = os.environ.get("BANKING_DQ_SNAPSHOT_DIR", "/opt/airflow/dq_data/snapshot")
+CHUNK_ROWS = int(os.environ.get("BANKING_DQ_SNAPSHOT_CHUNK_ROWS", "50000"))
+SNAPSHOT_TABLES = list(WATERMARK_COLUMNS)
+# The audit only reads these; it extracts them into its own directory so it can run beside a DQ run.
+AUDIT_TABLES = ['Customer', 'BankAccount', 'Device', 'AuthenticationLog', 'PaymentTransaction']
+AUDIT_SNAPSHOT_DIR = f"{SNAPSHOT_DIR}-audit"
+DAILY_LIMIT_AMOUNT = 20000000
+MANIFEST = 'manifest.json'
+
+
+def arrow_type(data_type, precision, scale):
+    """Arrow type of a MySQL column (information_schema DATA_TYPE)."""
+    import pyarrow as pa
+    if data_type in ('tinyint', 'smallint', 'mediumint', 'int', 'bigint'):
+        # SERIAL keys are BIGINT UNSIGNED; one integer type keeps the join keys comparable
+        return pa.int64()
+    if data_type == 'decimal':
+        return pa.decimal128(int(precision), int(scale))
+    if data_type in ('float', 'double'):
+        return pa.float64()
+    if data_type == 'date':
+        return pa.date32()
+    if data_type in ('datetime', 'timestamp'):
+        return pa.timestamp('us')
+    return pa.string()
+
+
+def table_schema(cur, table):
+    import pyarrow as pa
+    cur.execute("""
+        SELECT `COLUMN_NAME`, `DATA_TYPE`, `NUMERIC_PRECISION`, `NUMERIC_SCALE`
+        FROM `information_schema`.`COLUMNS`
+        WHERE `TABLE_SCHEMA` = DATABASE() AND `TABLE_NAME` = %s
+        ORDER BY `ORDINAL_POSITION`
+    """, (table,))
+    return pa.schema([(name, arrow_type(data_type.lower(), precision, scale))
+                      for name, data_type, precision, scale in cur.fetchall()])
+
+
+def extract_table(conn, table, path, chunk_rows=CHUNK_ROWS):
+    """Copy one table to Parquet in a single sequential pass, chunk by chunk through an unbuffered cursor."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    cur = conn.cursor()
+    schema = table_schema(cur, table)
+    cur.close()
+    cur = conn.cursor(buffered=False)
+    cur.execute("SELECT {} FROM `{}`".format(', '.join(f"`{name}`" for name in schema.names), table))
+    rows_written = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                break
+            columns = list(zip(*rows))
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema))
+            rows_written += len(rows)
+    cur.close()
+    return rows_written
+
+
+def extract_snapshot(directory=SNAPSHOT_DIR, tables=SNAPSHOT_TABLES, chunk_rows=CHUNK_ROWS):
+    """Extract every table inside one consistent-snapshot transaction, then swap the snapshot directory in.
+
+    All tables are read as of the same instant, so cross-table rules (foreign
+    keys, audit joins) see the state a single SQL run would have seen.
+    """
+    started = time.perf_counter()
+    tmp = f"{directory}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    conn = connect_db()
+    conn.start_transaction(consistent_snapshot=True, isolation_level='REPEATABLE READ', readonly=True)
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT CURDATE(), NOW()")
+        curdate, now = cur.fetchone()
+        cur.close()
+        manifest = {'curdate': curdate.isoformat(), 'extracted_at': now.isoformat(), 'tables': {}}
+        for table in tables:
+            table_started = time.perf_counter()
+            rows = extract_table(conn, table, os.path.join(tmp, f"{table}.parquet"), chunk_rows)
+            manifest['tables'][table] = {'rows': rows, 'seconds': round(time.perf_counter() - table_started, 3)}
+            print(f"Snapshot {table}: {rows} rows in {manifest['tables'][table]['seconds']:.2f}s")
+    finally:
+        conn.rollback()
+        conn.close()
+    with open(os.path.join(tmp, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+    print(f"Snapshot of {len(tables)} tables written to {directory} in {time.perf_counter() - started:.2f}s")
+    return Snapshot(directory)
+
+
+class Snapshot:
+    """Read side of an extracted snapshot; columns are loaded on first use and shared between checks."""
+
+    def __init__(self, directory=SNAPSHOT_DIR):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self._columns = {}
+        self._lock = threading.Lock()
+
+    def column(self, table, column):
+        import pyarrow.parquet as pq
+        key = (table, column)
+        with self._lock:
+            if key not in self._columns:
+                path = os.path.join(self.directory, f"{table}.parquet")
+                self._columns[key] = pq.read_table(path, columns=[column]).column(0).combine_chunks()
+            return self._columns[key]
+
+    def table(self, table, columns):
+        import pyarrow as pa
+        return pa.table({column: self.column(table, column) for column in columns})
+
+
+def fold(value):
+    return ''.join(ch for ch in unicodedata.normalize('NFKD', value) if not unicodedata.combining(ch)).casefold()
+
+
+def collation_key(values):
+    """Comparison key of strings under MySQL's default utf8mb4_0900_ai_ci (case- and accent-insensitive).
+
+    Non-ASCII values are folded once per distinct value through the dictionary.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    if not pa.types.is_string(values.type):
+        return values
+    if pc.all(pc.string_is_ascii(values)).as_py() is not False:
+        return pc.utf8_lower(values)
+    encoded = values.dictionary_encode()
+    folded = pa.array([fold(value) for value in encoded.dictionary.to_pylist()], type=pa.string())
+    return pc.take(folded, encoded.indices)
+
+
+def count_true(mask, scope=None):
+    """Rows where mask is true (NULL counts as not true, like SUM over a SQL predicate)."""
+    import pyarrow.compute as pc
+    mask = pc.fill_null(mask, False)
+    if scope is not None:
+        mask = pc.and_(mask, scope)
+    return int(pc.sum(pc.cast(mask, 'int64')).as_py() or 0)
+
+
+def scope_mask(snapshot, table, bounds):
+    """Array counterpart of watermarks.scope_predicate; None for a full run."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    if not bounds or table not in bounds:
+        return None
+    low, high = bounds[table][:2]
+    keys = snapshot.column(table, WATERMARK_COLUMNS[table])
+    if high is None:
+        return pa.array([False] * len(keys))
+    mask = pc.less_equal(keys, high)
+    return mask if low is None else pc.and_(mask, pc.greater(keys, low))
+
+
+def count_rule(snapshot, rule, bounds=None):
+    """Violations of one registry rule, with the semantics of check_registry.rule_expression."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    table = rule['table']
+    values = snapshot.column(table, rule['column'])
+    scope = scope_mask(snapshot, table, bounds)
+    kind = rule['kind']
+    if kind == 'not_null':
+        return count_true(values.is_null(), scope)
+    if kind == 'unique':
+        keys = collation_key(values)
+        if scope is None:
+            # COUNT(column) - COUNT(DISTINCT column)
+            return len(keys) - keys.null_count - pc.count_distinct(keys, mode='only_valid').as_py()
+        counts = pc.value_counts(keys.drop_null())
+        duplicated = counts.field('values').filter(pc.greater(counts.field('counts'), 1))
+        return count_true(pc.is_in(keys, value_set=duplicated), scope)
+    if kind == 'format':
+        # MySQL REGEXP follows the column's case-insensitive collation
+        valid = pc.match_substring_regex(values, rule['pattern'], ignore_case=True)
+        return count_true(pc.invert(valid), scope)
+    if kind == 'foreign_keys':
+        parent_table, pk = rule['arg']
+        parent_keys = snapshot.column(parent_table, pk)
+        return count_true(pc.and_(values.is_valid(), pc.invert(pc.is_in(values, value_set=parent_keys))), scope)
+    if kind == 'range':
+        low, high = rule['arg']
+        return count_true(pc.or_(pc.less(values, low), pc.greater(values, high)), scope)
+    if kind == 'enum':
+        allowed = collation_key(pa.array([str(value) for value in rule['arg']]))
+        keys = collation_key(values if pa.types.is_string(values.type) else pc.cast(values, pa.string()))
+        return count_true(pc.and_(values.is_valid(), pc.invert(pc.is_in(keys, value_set=allowed))), scope)
+    raise ValueError(f"Unknown rule kind: {kind}")
+
+
+def run_snapshot_rules(snapshot, table_rules, bounds=None):
+    return [result_row(rule, count_rule(snapshot, rule, bounds)) for rule in table_rules]
+
+
+def snapshot_units(rules, snapshot, bounds=None):
+    """One CheckUnit per table evaluating its rules against the snapshot, in the rows of the SQL path."""
+    return [
+        CheckUnit(f'Snapshot Scan {table}', partial(run_snapshot_rules, snapshot, table_rules, bounds),
+                  {'Table': table, 'Column': '*', 'Check': 'Snapshot Scan', '_seq': table_rules[0]['seq']})
+        for table, table_rules in group_by_table(rules).items()
+    ]
+
+
+def transactions_with_auth(snapshot):
+    """Transactions with the account's customer, spend date and auth strength.
+
+    The same rows the spend summary aggregates (spend_summary.summarize_sql):
+    a missing account gives spend_summary.UNKNOWN_CUSTOMER.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    accounts = snapshot.table('BankAccount', ['AccountID', 'CustomerID'])
+    auth = snapshot.table('AuthenticationLog', ['AuthLogID', 'AuthType'])
+    transactions = snapshot.table('PaymentTransaction', ['TransactionID', 'AccountID', 'Amount', 'TransactionDate',
+                                                        'AuthLogID'])
+    joined = transactions.join(accounts, 'AccountID', join_type='left outer').join(auth, 'AuthLogID',
+                                                                                    join_type='left outer')
+    customers = pc.fill_null(joined.column('CustomerID'), UNKNOWN_CUSTOMER)
+    joined = joined.set_column(joined.schema.get_field_index('CustomerID'), 'CustomerID', customers)
+    strong_types = collation_key(pa.array(list(STRONG_AUTH_TYPES)))
+    strong = pc.is_in(collation_key(joined.column('AuthType').combine_chunks()), value_set=strong_types)
+    return joined.append_column('Strong', pc.fill_null(strong, False)).append_column(
+        'SpendDate', pc.cast(joined.column('TransactionDate'), pa.date32()))
+
+
+def amount_scalar(amount, column):
+    import pyarrow as pa
+    return pa.scalar(Decimal(amount), type=column.type) if pa.types.is_decimal(column.type) else amount
+
+
+def count_high_value_weak_auth(snapshot):
+    import pyarrow.compute as pc
+    joined = transactions_with_auth(snapshot)
+    amount = joined.column('Amount')
+    return count_true(pc.and_(pc.greater(amount, amount_scalar(HIGH_VALUE_AMOUNT, amount)),
+                              pc.invert(joined.column('Strong'))))
+
+
+def count_unverified_devices(snapshot):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    flagged = collation_key(pa.array(['Suspicious', 'Blocked']))
+    devices = snapshot.table('Device', ['DeviceID', 'Status'])
+    devices = devices.filter(pc.is_in(collation_key(devices.column('Status').combine_chunks()), value_set=flagged))
+    transactions = snapshot.table('PaymentTransaction', ['TransactionID', 'DeviceID'])
+    return transactions.join(devices.select(['DeviceID']), 'DeviceID', join_type='inner').num_rows
+
+
+def count_daily_limit(snapshot):
+    """Customers with a day since yesterday (of the snapshot's server date) over the limit without strong auth.
+
+    Transactions without an account (UNKNOWN_CUSTOMER) belong to no customer and are left out.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    joined = transactions_with_auth(snapshot)
+    since = date.fromisoformat(snapshot.manifest['curdate']) - timedelta(days=1)
+    recent = joined.filter(pc.and_(pc.greater_equal(joined.column('SpendDate'), pa.scalar(since, pa.date32())),
+                                   pc.not_equal(joined.column('CustomerID'), UNKNOWN_CUSTOMER)))
+    days = recent.append_column('StrongCount', pc.cast(recent.column('Strong'), 'int64')).group_by(
+        ['CustomerID', 'SpendDate']).aggregate([('Amount', 'sum'), ('StrongCount', 'sum')])
+    total = days.column('Amount_sum')
+    over = days.filter(pc.and_(pc.greater(total, amount_scalar(DAILY_LIMIT_AMOUNT, total)),
+                               pc.equal(days.column('StrongCount_sum'), 0)))
+    return pc.count_distinct(over.column('CustomerID')).as_py()
+
+
+def run_snapshot_checks(snapshot=None, bounds=None, rules=None, max_workers=4):
+    """Evaluate every registry rule against a snapshot (extracting one if none is given)."""
+    snapshot = snapshot or extract_snapshot()
+    units = snapshot_units(expand_rules(rules), snapshot, bounds)
+    checks, _, _ = execute_checks(units, max_workers=max_workers)
+    return order_rows(checks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract a local columnar snapshot and run the DQ rules on it")
+    parser.add_argument("--dir", default=SNAPSHOT_DIR)
+    parser.add_argument("--reuse", action="store_true", help="use the existing snapshot instead of extracting")
+    parser.add_argument("--rules", default=None, help="YAML rules file (defaults to the built-in RULES)")
+    args = parser.parse_args()
+
+    snapshot = Snapshot(args.dir) if args.reuse else extract_snapshot(args.dir)
+    for row in run_snapshot_checks(snapshot, rules=load_rules(args.rules)):
+        print(row)
+    print(f"High-value weak auth: {count_high_value_weak_auth(snapshot)}, "
+          f"unverified devices: {count_unverified_devices(snapshot)}, daily limit: {count_daily_limit(snapshot)}")
@@ -0,0 +1,160 @@
+# /src/spend_summary.py
+import argparse
+import time
+
+from db import connect_db
+from watermarks import STATE_TABLE, ensure_state_table, partitioned_tables, date_span
+
+SUMMARY_TABLE = 'CustomerDailySpend'
+# Transactions above this amount need strong authentication (monitoring_audit.check_high_value_transactions).
+HIGH_VALUE_AMOUNT = 10000000
+STRONG_AUTH_TYPES = ('OTP', 'Biometric')
+# CustomerID of the summary rows for transactions whose account is missing (the audits still count them).
+UNKNOWN_CUSTOMER = 0
+
+
+def ensure_summary_table(cur, table=SUMMARY_TABLE):
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS `{table}` (
+            `CustomerID` INTEGER NOT NULL,
+            `SpendDate` DATE NOT NULL,
+            `TotalAmount` DECIMAL(20, 2) NOT NULL,
+            `TransactionCount` INTEGER NOT NULL,
+            `StrongAuthCount` INTEGER NOT NULL,
+            `HighValueCount` INTEGER NOT NULL,
+            `HighValueWeakAuthCount` INTEGER NOT NULL,
+            PRIMARY KEY (`CustomerID`, `SpendDate`),
+            INDEX `idx_spend_date` (`SpendDate`)
+        )
+    """)
+
+
+def summarize_sql(table, span=False):
+    """Aggregate the transactions in (low, high] into `table`, adding to existing customer-day rows.
+
+    Accounts are LEFT JOINed and the customer is the account's CustomerID, so
+    transactions of a missing account are summarized under UNKNOWN_CUSTOMER
+    instead of silently dropping out of the audits.
+
+    With span the range is also bounded by (first, last) TransactionDate, so a
+    partitioned PaymentTransaction is pruned to the days holding the new rows.
+    """
+    strong = ', '.join(f"'{auth_type}'" for auth_type in STRONG_AUTH_TYPES)
+    return f"""
+        INSERT INTO `{table}` (`CustomerID`, `SpendDate`, `TotalAmount`, `TransactionCount`, `StrongAuthCount`,
+                               `HighValueCount`, `HighValueWeakAuthCount`)
+        SELECT COALESCE(ba.`CustomerID`, {UNKNOWN_CUSTOMER}), DATE(pt.`TransactionDate`), SUM(pt.`Amount`), COUNT(*),
+               COALESCE(SUM(al.`AuthType` IN ({strong})), 0),
+               SUM(pt.`Amount` > {HIGH_VALUE_AMOUNT}),
+               SUM(pt.`Amount` > {HIGH_VALUE_AMOUNT} AND (al.`AuthType` IS NULL OR al.`AuthType` NOT IN ({strong})))
+        FROM `PaymentTransaction` pt
+        LEFT JOIN `BankAccount` ba ON pt.`AccountID` = ba.`AccountID`
+        LEFT JOIN `AuthenticationLog` al ON pt.`AuthLogID` = al.`AuthLogID`
+        WHERE pt.`TransactionID` > %s AND pt.`TransactionID` <= %s{" AND pt.`TransactionDate` BETWEEN %s AND %s" if span else ""}
+        GROUP BY COALESCE(ba.`CustomerID`, {UNKNOWN_CUSTOMER}), DATE(pt.`TransactionDate`)
+        ON DUPLICATE KEY UPDATE
+            `TotalAmount` = `TotalAmount` + VALUES(`TotalAmount`),
+            `TransactionCount` = `TransactionCount` + VALUES(`TransactionCount`),
+            `StrongAuthCount` = `StrongAuthCount` + VALUES(`StrongAuthCount`),
+            `HighValueCount` = `HighValueCount` + VALUES(`HighValueCount`),
+            `HighValueWeakAuthCount` = `HighValueWeakAuthCount` + VALUES(`HighValueWeakAuthCount`)
+    """
+
+
+def summary_lock(cur, timeout=600):
+    """Serialize refreshes and rebuilds so a transaction range is never summarized twice."""
+    cur.execute("SELECT GET_LOCK(%s, %s)", (SUMMARY_TABLE, timeout))
+    if cur.fetchone()[0] != 1:
+        raise RuntimeError(f"Could not lock {SUMMARY_TABLE} within {timeout}s")
+
+
+def save_mark(cur, high):
+    cur.execute(f"""
+        INSERT INTO `{STATE_TABLE}` (`TableName`, `WatermarkColumn`, `LastValue`)
+        VALUES (%s, 'TransactionID', %s)
+        ON DUPLICATE KEY UPDATE `WatermarkColumn` = VALUES(`WatermarkColumn`), `LastValue` = VALUES(`LastValue`)
+    """, (SUMMARY_TABLE, high))
+
+
+def refresh_spend_summary():
+    """Fold the transactions added since the last refresh into the summary table.
+
+    The last summarized TransactionID is kept in the watermark state table and
+    advanced in the same transaction as the summary rows, so a failed refresh
+    is simply retried. Edits to already summarized transactions are only
+    picked up by rebuild_spend_summary.
+    """
+    started = time.perf_counter()
+    conn = connect_db()
+    cur = conn.cursor()
+    ensure_state_table(cur)
+    ensure_summary_table(cur)
+    conn.commit()
+    summary_lock(cur)
+
+    cur.execute(f"SELECT `LastValue` FROM `{STATE_TABLE}` WHERE `TableName` = %s", (SUMMARY_TABLE,))
+    row = cur.fetchone()
+    low = int(row[0]) if row and row[0] is not None else 0
+    cur.execute("SELECT COALESCE(MAX(`TransactionID`), 0) FROM `PaymentTransaction`")
+    high = int(cur.fetchone()[0])
+    if high > low:
+        if 'PaymentTransaction' in partitioned_tables(cur):
+            cur.execute(summarize_sql(SUMMARY_TABLE, span=True),
+                        (low, high) + date_span(cur, 'PaymentTransaction', low, high))
+        else:
+            cur.execute(summarize_sql(SUMMARY_TABLE), (low, high))
+        save_mark(cur, high)
+        conn.commit()
+    print(f"Spend summary refreshed: transactions ({low}, {high}] in {time.perf_counter() - started:.2f}s")
+
+    cur.execute("SELECT RELEASE_LOCK(%s)", (SUMMARY_TABLE,))
+    cur.fetchall()
+    cur.close()
+    conn.close()
+    return high - low
+
+
+def rebuild_spend_summary(high=None):
+    """Recompute the summary from scratch into a new table and swap it in atomically.
+
+    Readers keep using the old summary until the RENAME. With high only the
+    transactions up to that TransactionID are summarized; the next refresh
+    folds in the rest.
+    """
+    started = time.perf_counter()
+    conn = connect_db()
+    cur = conn.cursor()
+    ensure_state_table(cur)
+    ensure_summary_table(cur)
+    summary_lock(cur)
+    staging, retired = f'{SUMMARY_TABLE}_rebuild', f'{SUMMARY_TABLE}_old'
+    cur.execute(f"DROP TABLE IF EXISTS `{staging}`, `{retired}`")
+    ensure_summary_table(cur, staging)
+
+    if high is None:
+        cur.execute("SELECT COALESCE(MAX(`TransactionID`), 0) FROM `PaymentTransaction`")
+        high = int(cur.fetchone()[0])
+    cur.execute(summarize_sql(staging), (0, high))
+    conn.commit()
+    cur.execute(f"RENAME TABLE `{SUMMARY_TABLE}` TO `{retired}`, `{staging}` TO `{SUMMARY_TABLE}`")
+    cur.execute(f"DROP TABLE `{retired}`")
+    save_mark(cur, high)
+    conn.commit()
+    cur.execute(f"SELECT COUNT(*) FROM `{SUMMARY_TABLE}`")
+    print(f"Spend summary rebuilt: {cur.fetchone()[0]} customer-days from {high} transactions "
+          f"in {time.perf_counter() - started:.2f}s")
+
+    cur.execute("SELECT RELEASE_LOCK(%s)", (SUMMARY_TABLE,))
+    cur.fetchall()
+    cur.close()
+    conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the customer x day spend summary")
+    parser.add_argument("command", choices=["refresh", "rebuild"])
+    args = parser.parse_args()
+    if args.command == "rebuild":
+        rebuild_spend_summary()
+    else:
+        refresh_spend_summary()
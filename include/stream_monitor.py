@@ -0,0 +1,325 @@
+# /src/stream_monitor.py
+import argparse
+import asyncio
+import heapq
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from db import connect_db
+from generate_data import TABLE_COLUMNS, build_shard, plan_shards, bulk_insert
+
+HIGH_VALUE_AMOUNT = 10000000
+DAILY_LIMIT_AMOUNT = 20000000
+STRONG_AUTH_TYPES = ('OTP', 'Biometric')
+UNVERIFIED_DEVICE_STATUSES = ('Suspicious', 'Blocked')
+WINDOW = timedelta(days=1)
+CACHE_SIZE = 100000
+# Latency percentiles are computed over the most recent events only, so a long-running tail stays bounded.
+LATENCY_SAMPLES = 1000000
+TRANSACTION_COLUMNS = TABLE_COLUMNS['PaymentTransaction']
+# AlertID is left to AUTO_INCREMENT, so concurrent monitors and loaders never collide
+ALERT_COLUMNS = [column for column in TABLE_COLUMNS['FraudAlert'] if column != 'AlertID']
+
+
+class LRUCache:
+    """Bounded key -> value cache; misses are fetched in bulk with loader(keys) -> {key: value}.
+
+    Hits and misses are counted per key looked up by prefetch (once per batch).
+    """
+
+    def __init__(self, loader, capacity=CACHE_SIZE):
+        self.loader = loader
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def prefetch(self, keys):
+        keys = [key for key in keys if key is not None]
+        missing = {key for key in keys if key not in self.entries}
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            loaded = self.loader(missing)
+            for key in missing:
+                self.put(key, loaded.get(key))
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def get(self, key):
+        if key is None:
+            return None
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        self.misses += 1
+        value = self.loader({key}).get(key)
+        self.put(key, value)
+        return value
+
+
+def table_loader(table, key, column):
+    """Loader reading `column` of `table` for a set of primary keys with one IN query."""
+    def load(keys):
+        keys = list(keys)
+        conn = connect_db()
+        cur = conn.cursor()
+        cur.execute(f"SELECT `{key}`, `{column}` FROM `{table}` WHERE `{key}` IN ({', '.join(['%s'] * len(keys))})",
+                    keys)
+        values = dict(cur.fetchall())
+        cur.close()
+        conn.close()
+        return values
+    return load
+
+
+class StreamMonitor:
+    """Evaluates the monitoring_audit rules one transaction at a time.
+
+    Reference data (account owner, device status, auth type) comes from LRU
+    caches; the rolling 24h limit keeps a min-heap of (time, amount,
+    strong auth) per customer, evicted against the latest event time seen,
+    so out-of-order events within the window still count. Alerts are dicts
+    with the FraudAlert columns (AlertID is assigned when they are stored).
+    """
+
+    def __init__(self, account_owners, device_statuses, auth_types, publish=None):
+        self.account_owners = account_owners
+        self.device_statuses = device_statuses
+        self.auth_types = auth_types
+        self.publish = publish or (lambda alerts: None)
+        self.windows = {}
+        self.flagged = set()
+        self.event_time = datetime.min
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.events = 0
+        self.alerts = 0
+        # Events whose account has no owner; FraudAlert.CustomerID is NOT NULL, so they raise no alert
+        self.unowned = 0
+
+    def alert(self, event, customer_id, alert_type, risk_score):
+        return {
+            'AlertID': None,
+            'CustomerID': customer_id,
+            'TransactionID': event['TransactionID'],
+            'DeviceID': event['DeviceID'],
+            'AuthLogID': event['AuthLogID'],
+            'AlertType': alert_type,
+            'AlertDate': event['TransactionDate'],
+            'RiskScore': risk_score,
+            'Status': 'Open',
+            'RiskTag': 'High' if risk_score >= 70 else 'Medium',
+        }
+
+    def window_totals(self, customer_id, event_time, amount, strong):
+        """Add the event to the customer's window; returns (24h spend, strong-auth count)."""
+        heap, totals = self.windows.setdefault(customer_id, ([], [0.0, 0]))
+        heapq.heappush(heap, (event_time, amount, strong))
+        totals[0] += amount
+        totals[1] += strong
+        while heap and heap[0][0] <= self.event_time - WINDOW:
+            _, old_amount, old_strong = heapq.heappop(heap)
+            totals[0] -= old_amount
+            totals[1] -= old_strong
+        if not heap:
+            del self.windows[customer_id]
+        return totals
+
+    def evaluate(self, event):
+        alerts = []
+        customer_id = self.account_owners.get(event['AccountID'])
+        event_time = event['TransactionDate']
+        self.event_time = max(self.event_time, event_time)
+        if customer_id is None:
+            self.unowned += 1
+            return alerts
+        amount = float(event['Amount'])
+        strong = self.auth_types.get(event['AuthLogID']) in STRONG_AUTH_TYPES
+
+        if amount > HIGH_VALUE_AMOUNT and not strong:
+            alerts.append(self.alert(event, customer_id, 'High-Value Without Strong Auth', 80))
+        device_status = self.device_statuses.get(event['DeviceID'])
+        if device_status in UNVERIFIED_DEVICE_STATUSES:
+            alerts.append(self.alert(event, customer_id, 'Suspicious Device', 90 if device_status == 'Blocked' else 70))
+        if event_time > self.event_time - WINDOW:
+            spend, strong_count = self.window_totals(customer_id, event_time, amount, strong)
+            # One alert per breach: re-armed once the window is back under the limit or sees strong auth
+            if spend > DAILY_LIMIT_AMOUNT and strong_count == 0:
+                if customer_id not in self.flagged:
+                    self.flagged.add(customer_id)
+                    alerts.append(self.alert(event, customer_id, 'Daily Limit Without Strong Auth', 75))
+            else:
+                self.flagged.discard(customer_id)
+        return alerts
+
+    def process_batch(self, events):
+        """Evaluate a batch of transaction dicts; cache misses of the batch are fetched up front."""
+        self.account_owners.prefetch(event['AccountID'] for event in events)
+        self.device_statuses.prefetch(event['DeviceID'] for event in events)
+        self.auth_types.prefetch(event['AuthLogID'] for event in events)
+        alerts = []
+        for event in events:
+            started = time.perf_counter_ns()
+            alerts.extend(self.evaluate(event))
+            self.latencies.append(time.perf_counter_ns() - started)
+        self.events += len(events)
+        if len(self.windows) > self.account_owners.capacity:
+            self.expire_windows()
+        if alerts:
+            self.alerts += len(alerts)
+            self.publish(alerts)
+        return alerts
+
+    def expire_windows(self):
+        """Drop the windows of customers without a transaction in the last 24h."""
+        cutoff = self.event_time - WINDOW
+        for customer_id in [c for c, (heap, _) in self.windows.items() if max(heap)[0] <= cutoff]:
+            del self.windows[customer_id]
+            self.flagged.discard(customer_id)
+
+    def stats(self, wall_seconds):
+        latencies = np.array(self.latencies, dtype=np.float64) / 1000
+        caches = {'accounts': self.account_owners, 'devices': self.device_statuses, 'auth_logs': self.auth_types}
+        return {
+            'events': self.events,
+            'alerts': self.alerts,
+            'unowned_events': self.unowned,
+            'wall_seconds': round(wall_seconds, 3),
+            'events_per_sec': round(self.events / wall_seconds, 1) if wall_seconds else None,
+            'p50_us': round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+            'p99_us': round(float(np.percentile(latencies, 99)), 2) if len(latencies) else None,
+            'cache_hit_rate': {name: round(cache.hits / max(1, cache.hits + cache.misses), 4)
+                               for name, cache in caches.items()},
+        }
+
+
+def db_monitor(publish=None, cache_size=CACHE_SIZE):
+    """Monitor whose caches read BankAccount, Device and AuthenticationLog."""
+    return StreamMonitor(
+        LRUCache(table_loader('BankAccount', 'AccountID', 'CustomerID'), cache_size),
+        LRUCache(table_loader('Device', 'DeviceID', 'Status'), cache_size),
+        LRUCache(table_loader('AuthenticationLog', 'AuthLogID', 'AuthType'), cache_size),
+        publish)
+
+
+def tail_transactions(after_id=None, batch_size=1000, poll_interval=1.0, idle_polls=None):
+    """Yield batches of new PaymentTransaction rows (as dicts) by polling past the last TransactionID.
+
+    Starts after the current MAX(TransactionID) unless after_id is given;
+    stops after `idle_polls` empty polls in a row (None polls forever).
+    """
+    conn = connect_db()
+    cur = conn.cursor()
+    if after_id is None:
+        cur.execute("SELECT COALESCE(MAX(`TransactionID`), 0) FROM `PaymentTransaction`")
+        after_id = cur.fetchone()[0]
+    columns = ', '.join(f'`{column}`' for column in TRANSACTION_COLUMNS)
+    idle = 0
+    try:
+        while idle_polls is None or idle < idle_polls:
+            cur.execute(f"""
+                SELECT {columns} FROM `PaymentTransaction`
+                WHERE `TransactionID` > %s ORDER BY `TransactionID` LIMIT %s
+            """, (after_id, batch_size))
+            rows = cur.fetchall()
+            conn.commit()  # end the snapshot so the next poll sees new rows
+            if not rows:
+                idle += 1
+                time.sleep(poll_interval)
+                continue
+            idle = 0
+            after_id = rows[-1][0]
+            yield [dict(zip(TRANSACTION_COLUMNS, row)) for row in rows]
+    finally:
+        cur.close()
+        conn.close()
+
+
+async def tail_transactions_async(**options):
+    """tail_transactions as an async iterator; each poll runs in a worker thread."""
+    batches = tail_transactions(**options)
+    while True:
+        batch = await asyncio.to_thread(next, batches, None)
+        if batch is None:
+            return
+        yield batch
+
+
+def generated_events(scale_factor=1, seed=None, as_of=None, engine='vector', batch_size=1000):
+    """Transactions produced by generate_data's row builders, in event-time order, without a database.
+
+    Returns (monitor caches' loaders, batches) where the loaders answer from
+    the generated reference rows, standing in for the database lookups.
+    """
+    as_of = as_of or datetime.now().replace(microsecond=0)
+    plan = plan_shards(scale_factor, 1, {table: 1 for table in TABLE_COLUMNS})[0]
+    tables = {}
+
+    def write(table, rows):
+        tables[table] = list(rows)
+        return len(tables[table])
+
+    build_shard(plan, seed, as_of, engine, write, lambda updates: None)
+
+    def lookup(table, value_column):
+        values = {row[0]: row[TABLE_COLUMNS[table].index(value_column)] for row in tables[table]}
+        return lambda keys: {key: values.get(key) for key in keys}
+
+    loaders = (lookup('BankAccount', 'CustomerID'), lookup('Device', 'Status'),
+               lookup('AuthenticationLog', 'AuthType'))
+    events = sorted((dict(zip(TRANSACTION_COLUMNS, row)) for row in tables['PaymentTransaction']),
+                    key=lambda event: event['TransactionDate'])
+    batches = [events[i:i + batch_size] for i in range(0, len(events), batch_size)]
+    return loaders, batches
+
+
+def insert_alerts(alerts):
+    """Publish alerts by appending them to FraudAlert; the server assigns their AlertIDs."""
+    conn = connect_db()
+    cur = conn.cursor()
+    rows = [tuple(alert[column] for column in ALERT_COLUMNS) for alert in alerts]
+    bulk_insert(conn, cur, 'FraudAlert', ALERT_COLUMNS, rows)
+    cur.close()
+    conn.close()
+
+
+def run_monitor(batches, monitor):
+    """Feed an iterable of transaction batches through the monitor; returns its throughput stats."""
+    started = time.perf_counter()
+    for batch in batches:
+        monitor.process_batch(batch)
+    return monitor.stats(time.perf_counter() - started)
+
+
+async def run_monitor_async(batches, monitor):
+    """run_monitor for an async iterator of batches (e.g. tail_transactions_async)."""
+    started = time.perf_counter()
+    async for batch in batches:
+        monitor.process_batch(batch)
+    return monitor.stats(time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Real-time transaction monitoring rules")
+    parser.add_argument("source", choices=["generated", "tail"])
+    parser.add_argument("--scale-factor", type=int, default=100, help="generated: dataset scale factor")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--after-id", type=int, default=None, help="tail: start after this TransactionID")
+    parser.add_argument("--idle-polls", type=int, default=None, help="tail: stop after this many empty polls")
+    parser.add_argument("--insert-alerts", action="store_true", help="append alerts to FraudAlert")
+    args = parser.parse_args()
+    publish = insert_alerts if args.insert_alerts else None
+    if args.source == "generated":
+        loaders, batches = generated_events(args.scale_factor, args.seed)
+        monitor = StreamMonitor(*(LRUCache(loader) for loader in loaders), publish=publish)
+        print(run_monitor(batches, monitor))
+    else:
+        print(asyncio.run(run_monitor_async(
+            tail_transactions_async(after_id=args.after_id, idle_polls=args.idle_polls), db_monitor(publish))))
@@ -0,0 +1,331 @@
+# /src/uniqueness_sketch.py
+import argparse
+import json
+import math
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from db import connect_db
+from check_registry import result_row
+from watermarks import WATERMARK_COLUMNS, scope_predicate
+
+# Persisted per-column sketches; must survive between task runs, so docker-compose mounts it (dq_data).
+SKETCH_DIR = os.environ.get("BANKING_DQ_SKETCH_DIR", "/opt/airflow/dq_data/sketches")
+CHUNK_SIZE = 50000
+# (hash, key) pairs held in memory before they are spilled to partition files (16 bytes each).
+BUFFER_ROWS = int(os.environ.get("BANKING_DQ_SKETCH_BUFFER_ROWS", "1000000"))
+# Partitions are ranges of the hash's top bits, so partition outputs concatenate into one sorted run.
+# At least 2**PARTITION_BITS of them; more when a partition would exceed BUFFER_ROWS pairs.
+PARTITION_BITS = 4
+MAX_PARTITION_BITS = 12
+HLL_PRECISION = 14
+IN_CHUNK = 1000
+# Sorted hash runs kept per column; beyond this the runs are merged into one.
+MAX_RUNS = int(os.environ.get("BANKING_DQ_SKETCH_MAX_RUNS", "4"))
+# Persisted sketches of another version (e.g. hashed before collation folding) are rebuilt.
+SKETCH_VERSION = 2
+
+
+def leading_zeros(x):
+    """Leading zero bits of each non-zero uint64."""
+    x = x.copy()
+    zeros = np.zeros(len(x), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        small = x <= np.uint64(0xFFFFFFFFFFFFFFFF >> shift)
+        zeros += np.uint8(shift) * small
+        x = np.where(small, x << np.uint64(shift), x)
+    return zeros
+
+
+class HyperLogLog:
+    """HyperLogLog over 64-bit hashes: 2**precision one-byte registers, ~1.04/sqrt(m) relative error."""
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8) if registers is None else registers
+
+    def update(self, hashes):
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.intp)
+        # The guard bit caps the rank at 64 - precision + 1
+        rest = (hashes << np.uint64(self.precision)) | np.uint64(1 << (self.precision - 1))
+        np.maximum.at(self.registers, index, leading_zeros(rest) + 1)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and empty:
+            return m * math.log(m / empty)
+        return raw
+
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+
+def collation_keys(values):
+    """Case- and accent-folded strings, the comparison of MySQL's default utf8mb4_0900_ai_ci collation."""
+    values = pd.Series(values, dtype=object)
+    return values.str.normalize('NFKD').str.replace('[\u0300-\u036f]', '', regex=True).str.casefold()
+
+
+def hash_values(values):
+    """Stable 64-bit hashes (pandas' keyed SipHash), identical across processes and runs."""
+    return pd.util.hash_array(np.asarray(values, dtype=object), categorize=False)
+
+
+def partition_bits(rows, buffer_rows=BUFFER_ROWS):
+    """Hash prefix bits that keep an expected partition of `rows` pairs within buffer_rows."""
+    bits = PARTITION_BITS
+    while bits < MAX_PARTITION_BITS and rows > buffer_rows << bits:
+        bits += 1
+    return bits
+
+
+class PartitionedPairs:
+    """(hash, key) pairs split by hash prefix; spilled to disk once BUFFER_ROWS are held."""
+
+    def __init__(self, spill_dir, buffer_rows=BUFFER_ROWS, bits=PARTITION_BITS):
+        self.spill_dir = spill_dir
+        self.buffer_rows = buffer_rows
+        self.bits = bits
+        self.buffers = [[] for _ in range(1 << bits)]
+        self.buffered = 0
+
+    def add(self, hashes, keys):
+        pairs = np.empty((len(hashes), 2), dtype=np.uint64)
+        pairs[:, 0] = hashes
+        pairs[:, 1] = keys
+        partition = (hashes >> np.uint64(64 - self.bits)).astype(np.intp)
+        order = np.argsort(partition, kind='stable')
+        starts = np.searchsorted(partition[order], np.arange(len(self.buffers) + 1))
+        for p in range(len(self.buffers)):
+            if starts[p + 1] > starts[p]:
+                self.buffers[p].append(pairs[order[starts[p]:starts[p + 1]]])
+        self.buffered += len(hashes)
+        if self.buffered >= self.buffer_rows:
+            self.spill()
+
+    def spill(self):
+        for p, chunks in enumerate(self.buffers):
+            if chunks:
+                with open(os.path.join(self.spill_dir, f'part-{p}.u64'), 'ab') as f:
+                    np.concatenate(chunks).tofile(f)
+        self.buffers = [[] for _ in self.buffers]
+        self.buffered = 0
+
+    def partitions(self):
+        """Yield each partition's pairs sorted by hash; only one partition is in memory at a time."""
+        for p, chunks in enumerate(self.buffers):
+            path = os.path.join(self.spill_dir, f'part-{p}.u64')
+            parts = list(chunks)
+            if os.path.exists(path):
+                parts.insert(0, np.fromfile(path, dtype=np.uint64).reshape(-1, 2))
+            if not parts:
+                continue
+            pairs = np.concatenate(parts)
+            yield pairs[np.argsort(pairs[:, 0], kind='stable')]
+
+
+def sketch_path(table, column, *parts):
+    return os.path.join(SKETCH_DIR, f'{table}.{column}', *parts)
+
+
+def load_sketch(table, column):
+    """Persisted state ({'high', 'rows', 'runs', 'version'}) and HLL of a column, or (None, None)."""
+    try:
+        with open(sketch_path(table, column, 'state.json')) as f:
+            state = json.load(f)
+        registers = np.load(sketch_path(table, column, 'hll.npy'))
+    except (OSError, ValueError):
+        return None, None
+    return state, HyperLogLog(registers=registers)
+
+
+def save_sketch(table, column, state, hll):
+    np.save(sketch_path(table, column, 'hll.npy'), hll.registers)
+    tmp = sketch_path(table, column, 'state.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, sketch_path(table, column, 'state.json'))
+
+
+def merge_runs(paths, out_path, buffer_rows=BUFFER_ROWS):
+    """K-way merge of sorted hash run files into one sorted run of distinct hashes.
+
+    The hash space is cut into ranges of about buffer_rows hashes in total;
+    each range is sliced out of every run with a binary search, so only one
+    range is in memory at a time.
+    """
+    runs = [np.memmap(path, dtype=np.uint64, mode='r') for path in paths if os.path.getsize(path)]
+    ranges = max(1, math.ceil(sum(len(run) for run in runs) / buffer_rows))
+    bounds = [np.uint64((i << 64) // ranges) for i in range(ranges)]
+    starts = [[0] * len(runs)]
+    for bound in bounds[1:]:
+        starts.append([int(np.searchsorted(run, bound)) for run in runs])
+    starts.append([len(run) for run in runs])
+    tmp = f'{out_path}.tmp'
+    with open(tmp, 'wb') as out:
+        for low, high in zip(starts, starts[1:]):
+            parts = [run[a:b] for run, a, b in zip(runs, low, high) if b > a]
+            if parts:
+                np.unique(np.concatenate(parts)).tofile(out)
+    del runs
+    os.replace(tmp, out_path)
+
+
+def compact_runs(table, column, state, hll, max_runs=MAX_RUNS):
+    """Merge the column's runs into one once there are more than max_runs; returns the new state."""
+    if len(state['runs']) <= max_runs:
+        return state
+    merged = f"merged-{state['high']}.u64"
+    merge_runs([sketch_path(table, column, 'runs', run) for run in state['runs']],
+               sketch_path(table, column, 'runs', merged))
+    compacted = dict(state, runs=[merged])
+    # The state points at the merged run before the merged files go
+    save_sketch(table, column, compacted, hll)
+    for run in state['runs']:
+        if run != merged:
+            os.remove(sketch_path(table, column, 'runs', run))
+    return compacted
+
+
+def stream_column(cur, table, column, scope, chunk_size=CHUNK_SIZE):
+    """Yield (keys, values) chunks of the non-null values of a column."""
+    pk = WATERMARK_COLUMNS[table]
+    predicate, params = scope
+    cur.execute(f"SELECT `{pk}`, `{column}` FROM `{table}` WHERE `{column}` IS NOT NULL AND {predicate}", params)
+    while True:
+        rows = cur.fetchmany(chunk_size)
+        if not rows:
+            break
+        keys, values = zip(*rows)
+        yield np.asarray(keys, dtype=np.uint64), values
+
+
+def confirm_duplicates(cur, table, column, suspect_keys, high):
+    """Exact duplicate groups among the values of the suspected rows, via the column's index."""
+    pk = WATERMARK_COLUMNS[table]
+    suspect_keys = sorted(set(int(k) for k in suspect_keys))
+    values = set()
+    for i in range(0, len(suspect_keys), IN_CHUNK):
+        chunk = suspect_keys[i:i + IN_CHUNK]
+        cur.execute(f"SELECT `{column}` FROM `{table}` WHERE `{pk}` IN ({', '.join(['%s'] * len(chunk))})", chunk)
+        values.update(row[0] for row in cur.fetchall())
+    values = sorted(values)
+    groups = {}
+    for i in range(0, len(values), IN_CHUNK):
+        chunk = values[i:i + IN_CHUNK]
+        cur.execute(f"""
+            SELECT `{column}`, COUNT(*) FROM `{table}`
+            WHERE `{column}` IN ({', '.join(['%s'] * len(chunk))}) AND `{pk}` <= %s
+            GROUP BY `{column}` HAVING COUNT(*) > 1
+        """, chunk + [high])
+        groups.update(cur.fetchall())
+    return groups
+
+
+def check_unique_sketch(table, column, bounds=None):
+    """Streaming uniqueness check of one column.
+
+    The column is read once in chunks. Each value's 64-bit hash feeds a
+    HyperLogLog (approximate distinct count) and a hash-partitioned set
+    that finds repeated hashes with bounded memory. Only rows whose hash
+    repeats, in this batch or in a run persisted by an earlier run, are
+    confirmed exactly against the database.
+
+    With incremental bounds the persisted sketch is extended with the new
+    rows only, provided it covers exactly up to the watermark; otherwise
+    (and on full runs) it is rebuilt from the whole table.
+    Returns (duplicate rows, approximate distinct values, rows counted).
+    """
+    pk = WATERMARK_COLUMNS[table]
+    conn = connect_db()
+    cur = conn.cursor(buffered=False)
+    low, high = bounds[table][:2] if bounds and table in bounds else (None, None)
+    if high is None:
+        cur.execute(f"SELECT MAX(`{pk}`) FROM `{table}`")
+        high = cur.fetchall()[0][0]
+        high = None if high is None else str(high)
+
+    state, hll = load_sketch(table, column)
+    if not (low is not None and state is not None and state['high'] == low
+            and state.get('version') == SKETCH_VERSION):
+        # Rebuild from scratch
+        shutil.rmtree(sketch_path(table, column), ignore_errors=True)
+        low, state, hll = None, {'high': None, 'rows': 0, 'runs': []}, HyperLogLog()
+    elif low == high:
+        # Nothing new since the persisted sketch
+        cur.close()
+        conn.close()
+        return 0, hll.estimate(), state['rows']
+    os.makedirs(sketch_path(table, column, 'runs'), exist_ok=True)
+    previous_runs = [np.memmap(sketch_path(table, column, 'runs', run), dtype=np.uint64, mode='r')
+                     for run in state['runs'] if os.path.getsize(sketch_path(table, column, 'runs', run))]
+
+    rows = 0
+    suspects = []
+    run_name = f'run-{high}.u64'
+    with tempfile.TemporaryDirectory(prefix='dq-sketch-') as spill_dir:
+        # Keys are dense, so the key range bounds the number of pairs
+        expected_rows = int(high) - int(low or 0) if high is not None else 0
+        pairs = PartitionedPairs(spill_dir, bits=partition_bits(expected_rows))
+        if high is not None:
+            for keys, values in stream_column(cur, table, column, scope_predicate(table, {table: (low, high)})):
+                # Equal under the column's collation means equal here, as for COUNT(DISTINCT) and chunk_engine
+                hashes = hash_values(collation_keys(values))
+                hll.update(hashes)
+                pairs.add(hashes, keys)
+                rows += len(keys)
+        cur.close()
+        cur = conn.cursor()
+
+        with open(sketch_path(table, column, 'runs', run_name), 'wb') as run_file:
+            for partition in pairs.partitions():
+                hashes = partition[:, 0]
+                repeated = np.zeros(len(hashes), dtype=bool)
+                repeated[1:] |= hashes[1:] == hashes[:-1]
+                repeated[:-1] |= hashes[1:] == hashes[:-1]
+                unique_hashes = hashes[np.r_[True, hashes[1:] != hashes[:-1]]]
+                for run in previous_runs:
+                    positions = np.searchsorted(run, hashes).clip(max=len(run) - 1)
+                    repeated |= run[positions] == hashes
+                suspects.append(partition[repeated, 1])
+                unique_hashes.tofile(run_file)
+
+        suspect_keys = np.concatenate(suspects) if suspects else np.empty(0, dtype=np.uint64)
+        groups = confirm_duplicates(cur, table, column, suspect_keys, high) if len(suspect_keys) else {}
+
+    del previous_runs
+    state = {'high': high, 'rows': state['rows'] + rows, 'runs': state['runs'] + [run_name],
+             'version': SKETCH_VERSION}
+    save_sketch(table, column, state, hll)
+    state = compact_runs(table, column, state, hll)
+    cur.close()
+    conn.close()
+    duplicates = sum(int(count) - 1 for count in groups.values())
+    return duplicates, hll.estimate(), state['rows']
+
+
+def sketch_unique_rule(rule, bounds=None):
+    """Registry 'unique' rule evaluated with check_unique_sketch, as a check row."""
+    duplicates, distinct, rows = check_unique_sketch(rule['table'], rule['column'], bounds)
+    row = result_row(rule, duplicates)
+    row['Details'] += (f' (~{distinct:.0f} +/- {HyperLogLog().relative_error():.1%} distinct of {rows} '
+                       f'non-null values by HyperLogLog)')
+    return [row]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming uniqueness check with persisted sketches")
+    parser.add_argument("table", choices=list(WATERMARK_COLUMNS))
+    parser.add_argument("column")
+    args = parser.parse_args()
+    print(check_unique_sketch(args.table, args.column))
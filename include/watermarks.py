@@ -0,0 +1,127 @@
+# /src/watermarks.py
+from db import connect_db
+
+STATE_TABLE = 'DQWatermark'
+
+# Column whose high-water mark bounds an incremental run. Primary keys are used because they only
+# grow; the generator back-dates TransactionDate/AuthDate/AlertDate, so a timestamp mark would skip
+# new rows. Any monotonic column (e.g. an ingestion timestamp) can be configured instead.
+WATERMARK_COLUMNS = {
+    'Customer': 'CustomerID',
+    'BankAccount': 'AccountID',
+    'Card': 'CardID',
+    'Merchant': 'MerchantID',
+    'Device': 'DeviceID',
+    'AuthenticationLog': 'AuthLogID',
+    'PaymentTransaction': 'TransactionID',
+    'FraudAlert': 'AlertID',
+}
+# Tables that schema_partitioned.sql range-partitions by day on a timestamp. When they are
+# partitioned, an incremental scope also carries the date span of its rows so that MySQL
+# prunes to the partitions holding them (the key range alone can match rows in any partition).
+PARTITION_COLUMNS = {
+    'PaymentTransaction': 'TransactionDate',
+    'AuthenticationLog': 'AuthDate',
+    'FraudAlert': 'AlertDate',
+}
+
+
+def ensure_state_table(cur):
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS `{STATE_TABLE}` (
+            `TableName` VARCHAR(64) PRIMARY KEY,
+            `WatermarkColumn` VARCHAR(64) NOT NULL,
+            `LastValue` VARCHAR(64),
+            `UpdatedAt` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def partitioned_tables(cur):
+    """Tables of PARTITION_COLUMNS that are partitioned in the current database."""
+    cur.execute("""
+        SELECT DISTINCT `TABLE_NAME` FROM `information_schema`.`PARTITIONS`
+        WHERE `TABLE_SCHEMA` = DATABASE() AND `PARTITION_NAME` IS NOT NULL
+    """)
+    return {row[0] for row in cur.fetchall()} & set(PARTITION_COLUMNS)
+
+
+def date_span(cur, table, low, high):
+    """(first, last) partition column value of the rows with key in (low, high], or (None, None)."""
+    column = PARTITION_COLUMNS[table]
+    scope, params = scope_predicate(table, {table: (low, high)})
+    cur.execute(f"SELECT MIN(`{column}`), MAX(`{column}`) FROM `{table}` WHERE {scope}", params)
+    first, last = cur.fetchone()
+    return (None, None) if first is None else (str(first), str(last))
+
+
+def incremental_bounds():
+    """(last checked value, current high) per table for an incremental run.
+
+    The high marks are captured before any check runs, so rows inserted
+    while the checks execute are picked up by the next run. A table without
+    a stored mark is checked from the beginning. Partitioned tables get
+    (low, high, first date, last date); see PARTITION_COLUMNS.
+    """
+    conn = connect_db()
+    cur = conn.cursor()
+    ensure_state_table(cur)
+    conn.commit()
+
+    cur.execute(f"SELECT `TableName`, `WatermarkColumn`, `LastValue` FROM `{STATE_TABLE}`")
+    stored = {table: value for table, column, value in cur.fetchall() if WATERMARK_COLUMNS.get(table) == column}
+    partitioned = partitioned_tables(cur)
+    bounds = {}
+    for table, column in WATERMARK_COLUMNS.items():
+        cur.execute(f"SELECT MAX(`{column}`) FROM `{table}`")
+        high = cur.fetchone()[0]
+        bounds[table] = (stored.get(table), None if high is None else str(high))
+        if table in partitioned and high is not None:
+            bounds[table] += date_span(cur, table, *bounds[table])
+
+    cur.close()
+    conn.close()
+    return bounds
+
+
+def save_watermarks(bounds):
+    """Advance each table's mark to the high value the run checked up to."""
+    conn = connect_db()
+    cur = conn.cursor()
+    ensure_state_table(cur)
+    for table, bound in bounds.items():
+        high = bound[1]
+        if high is None:
+            continue
+        cur.execute(f"""
+            INSERT INTO `{STATE_TABLE}` (`TableName`, `WatermarkColumn`, `LastValue`)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE `WatermarkColumn` = VALUES(`WatermarkColumn`), `LastValue` = VALUES(`LastValue`)
+        """, (table, WATERMARK_COLUMNS[table], high))
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def scope_predicate(table, bounds, alias=None):
+    """SQL condition (and params) limiting `table` to the rows of an incremental run.
+
+    bounds is the dict returned by incremental_bounds(), or None for a full
+    run, in which case the condition is always true. A date span in the
+    bounds adds a redundant range on the partition column for pruning.
+    """
+    if not bounds or table not in bounds:
+        return "1 = 1", ()
+    low, high = bounds[table][:2]
+    prefix = f"{alias}." if alias else ""
+    column = f"{prefix}`{WATERMARK_COLUMNS[table]}`"
+    if high is None:
+        return "1 = 0", ()
+    if low is None:
+        predicate, params = f"{column} <= %s", (high,)
+    else:
+        predicate, params = f"{column} > %s AND {column} <= %s", (low, high)
+    if len(bounds[table]) == 4 and bounds[table][2] is not None:
+        predicate += f" AND {prefix}`{PARTITION_COLUMNS[table]}` BETWEEN %s AND %s"
+        params += tuple(bounds[table][2:])
+    return predicate, params
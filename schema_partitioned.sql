@@ -0,0 +1,131 @@
+-- Variant of schema.sql with the timestamped fact tables range-partitioned by day
+
+CREATE TABLE Customer (
+    CustomerID SERIAL PRIMARY KEY,
+    FirstName VARCHAR(255) NOT NULL,
+    LastName VARCHAR(255) NOT NULL,
+    Email VARCHAR(255) UNIQUE NOT NULL,
+    Phone VARCHAR(255),
+    Address TEXT,
+    CCCD_Passport VARCHAR(255) UNIQUE NOT NULL, -- Encrypted in application
+    DateOfBirth DATE NOT NULL,
+    Status VARCHAR(255) NOT NULL CHECK (Status IN ('Active', 'Suspended', 'Inactive'))
+);
+
+-- BankAccount Table
+CREATE TABLE BankAccount (
+    AccountID SERIAL PRIMARY KEY,
+    CustomerID INTEGER NOT NULL REFERENCES Customer(CustomerID),
+    AccountType VARCHAR(255) NOT NULL CHECK (AccountType IN ('Checking', 'Savings', 'Credit')),
+    AccountNumber VARCHAR(255) UNIQUE NOT NULL, -- Encrypted in application
+    Balance DECIMAL(15, 2) NOT NULL DEFAULT 0.00,
+    OpenDate DATE NOT NULL,
+    Status VARCHAR(255) NOT NULL CHECK (Status IN ('Active', 'Frozen', 'Closed'))
+);
+
+-- Card Table
+CREATE TABLE Card (
+    CardID SERIAL PRIMARY KEY,
+    AccountID INTEGER NOT NULL REFERENCES BankAccount(AccountID),
+    CardNumber VARCHAR(255) UNIQUE NOT NULL, -- Encrypted in application
+    CardType VARCHAR(255) NOT NULL CHECK (CardType IN ('Debit', 'Credit', 'Prepaid')),
+    ExpiryDate DATE NOT NULL,
+    CVV VARCHAR(255) NOT NULL, -- Encrypted in application
+    Status VARCHAR(255) NOT NULL CHECK (Status IN ('Active', 'Blocked', 'Expired'))
+);
+
+-- Merchant Table
+CREATE TABLE Merchant (
+    MerchantID SERIAL PRIMARY KEY,
+    MerchantName VARCHAR(255) NOT NULL,
+    Category VARCHAR(255),
+    Location TEXT,
+    RiskScore INTEGER NOT NULL DEFAULT 0 CHECK (RiskScore >= 0 AND RiskScore <= 100)
+);
+
+-- Device Table
+CREATE TABLE Device (
+    DeviceID SERIAL PRIMARY KEY,
+    CustomerID INTEGER NOT NULL REFERENCES Customer(CustomerID),
+    DeviceType VARCHAR(255) NOT NULL CHECK (DeviceType IN ('Mobile', 'Desktop', 'Tablet')),
+    DeviceFingerprint VARCHAR(255) UNIQUE NOT NULL,
+    IPAddress VARCHAR(255),
+    LastUsed TIMESTAMP,
+    Status VARCHAR(255) NOT NULL CHECK (Status IN ('Trusted', 'Suspicious', 'Blocked')),
+    RiskTag VARCHAR(255) NOT NULL CHECK (RiskTag IN ('Low', 'Medium', 'High'))
+);
+
+-- AuthenticationLog Table
+-- Partitioned tables: the partition column must be part of every unique key, so the primary key
+-- is (id, timestamp); RANGE COLUMNS needs DATETIME rather than TIMESTAMP; InnoDB does not allow
+-- foreign keys on partitioned tables (the REFERENCES clauses of schema.sql are not enforced by
+-- MySQL either). p_history holds everything before the first daily partition and pmax anything
+-- past the last; partitions.maintain_partitions splits pmax into days ahead of time.
+CREATE TABLE AuthenticationLog (
+    AuthLogID BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+    CustomerID INTEGER NOT NULL,
+    TransactionID INTEGER,
+    AuthType VARCHAR(255) NOT NULL CHECK (AuthType IN ('OTP', 'Biometric', 'Password')),
+    AuthDate DATETIME NOT NULL,
+    Status VARCHAR(255) NOT NULL CHECK (Status IN ('Success', 'Failed', 'Pending')),
+    OTPCode VARCHAR(255), -- Encrypted in application, Nullable
+    BiometricData VARCHAR(255), -- Encrypted in application, Nullable
+    DeviceID INTEGER,
+    RiskTag VARCHAR(255) NOT NULL CHECK (RiskTag IN ('Low', 'Medium', 'High')),
+    PRIMARY KEY (AuthLogID, AuthDate),
+    INDEX idx_authlog_date_customer (AuthDate, CustomerID),
+    INDEX idx_authlog_customer_date (CustomerID, AuthDate)
+)
+PARTITION BY RANGE COLUMNS (AuthDate) (
+    PARTITION p_history VALUES LESS THAN ('2025-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+-- PaymentTransaction Table
+CREATE TABLE PaymentTransaction (
+    TransactionID BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+    AccountID INTEGER NOT NULL,
+    CardID INTEGER,
+    MerchantID INTEGER NOT NULL,
+    Amount DECIMAL(15, 2) NOT NULL,
+    TransactionDate DATETIME NOT NULL,
+    TransactionType VARCHAR(255) NOT NULL CHECK (TransactionType IN ('Online', 'POS', 'ATM', 'Transfer', 'Refund')),
+    Status VARCHAR(255) NOT NULL CHECK (Status IN ('Completed', 'Pending', 'Declined')),
+    DeviceID INTEGER,
+    AuthLogID INTEGER,
+    RiskTag VARCHAR(255) NOT NULL CHECK (RiskTag IN ('Low', 'Medium', 'High')),
+    PRIMARY KEY (TransactionID, TransactionDate),
+    INDEX idx_transaction_date_account (TransactionDate, AccountID),
+    INDEX idx_transaction_account_date (AccountID, TransactionDate),
+    INDEX idx_transaction_device_date (DeviceID, TransactionDate),
+    INDEX idx_transaction_authlog (AuthLogID)
+)
+PARTITION BY RANGE COLUMNS (TransactionDate) (
+    PARTITION p_history VALUES LESS THAN ('2025-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+-- FraudAlert Table
+CREATE TABLE FraudAlert (
+    AlertID BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+    TransactionID INTEGER,
+    CustomerID INTEGER NOT NULL,
+    DeviceID INTEGER,
+    AuthLogID INTEGER,
+    AlertType VARCHAR(255) NOT NULL,
+    AlertDate DATETIME NOT NULL,
+    RiskScore INTEGER NOT NULL CHECK (RiskScore >= 0 AND RiskScore <= 100),
+    Status VARCHAR(255) NOT NULL CHECK (Status IN ('Open', 'Resolved', 'False')),
+    RiskTag VARCHAR(255) NOT NULL CHECK (RiskTag IN ('Low', 'Medium', 'High')),
+    PRIMARY KEY (AlertID, AlertDate),
+    INDEX idx_fraudalert_date_customer (AlertDate, CustomerID),
+    INDEX idx_fraudalert_transactionid (TransactionID)
+)
+PARTITION BY RANGE COLUMNS (AlertDate) (
+    PARTITION p_history VALUES LESS THAN ('2025-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+-- Indexes for performance
+CREATE INDEX idx_customer_email ON Customer(Email);
+CREATE INDEX idx_account_customerid ON BankAccount(CustomerID);
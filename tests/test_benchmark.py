@@ -0,0 +1,31 @@
+# /tests/test_benchmark.py
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'include'))
+
+from benchmark import compare  # noqa: E402
+
+
+def report(results):
+    return {'scales': {'1k': {'results': results}}}
+
+
+def test_compare_verdicts():
+    baseline = report({'slower': {'median_s': 1.0}, 'faster': {'median_s': 1.0}, 'noise': {'median_s': 0.01},
+                       'same': {'median_s': 1.0}})
+    current = report({'slower': {'median_s': 1.5}, 'faster': {'median_s': 0.5}, 'noise': {'median_s': 0.04},
+                      'same': {'median_s': 1.1}})
+    verdicts = {name: verdict for _, name, _, _, _, verdict in compare(current, baseline)}
+    assert verdicts == {'slower': 'REGRESSION', 'faster': 'IMPROVED', 'noise': 'OK', 'same': 'OK'}
+
+
+def test_compare_reports_new_errors():
+    rows = compare(report({'check': {'error': 'boom'}}), report({'check': {'median_s': 0.5}}))
+    assert rows == [('1k', 'check', 0.5, None, None, 'ERROR')]
+
+
+def test_compare_skips_unmatched():
+    assert compare(report({'new': {'median_s': 1.0}}), report({})) == []
+    assert compare(report({'check': {'median_s': 1.0}}), {'scales': {}}) == []
+    assert compare(report({'check': {'error': 'still'}}), report({'check': {'error': 'before'}})) == []
@@ -0,0 +1,90 @@
+# /tests/test_drift_sketches.py
+import math
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'include'))
+
+from drift_sketches import CountMin, Moments, TDigest, ks_critical, ks_distance, psi  # noqa: E402
+
+
+def central_moments(values):
+    deviations = values - values.mean()
+    return [(deviations ** power).sum() for power in (2, 3, 4)]
+
+
+def test_tdigest_quantiles_of_uniform():
+    digest = TDigest().update(np.linspace(0, 1, 100001))
+    for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+        assert digest.quantile(q) == pytest.approx(q, abs=0.005)
+    assert digest.quantile(0) == 0 and digest.quantile(1) == 1
+    assert digest.cdf(np.array([0.1, 0.9])) == pytest.approx([0.1, 0.9], abs=0.005)
+    assert digest.count == 100001
+
+
+def test_tdigest_merge_matches_single_digest():
+    values = np.random.default_rng(1).normal(size=40000)
+    merged = TDigest().update(values[:15000]).merge(TDigest().update(values[15000:]))
+    assert merged.count == 40000
+    for q in (0.05, 0.5, 0.95):
+        assert merged.quantile(q) == pytest.approx(np.quantile(values, q), abs=0.03)
+
+
+def test_tdigest_roundtrip():
+    digest = TDigest().update(np.arange(1000))
+    copy = TDigest.from_dict(digest.to_dict())
+    assert copy.quantile(0.5) == digest.quantile(0.5)
+
+
+def test_moments_merge_matches_direct():
+    values = np.random.default_rng(2).exponential(size=3001)
+    merged = Moments().update(values[:1000]).merge(Moments().update(values[1000:2500])).merge(
+        Moments().update(values[2500:]))
+    m2, m3, m4 = central_moments(values)
+    assert merged.n == 3001
+    assert merged.mean == pytest.approx(values.mean())
+    assert (merged.m2, merged.m3, merged.m4) == pytest.approx((m2, m3, m4))
+    assert merged.std == pytest.approx(values.std(ddof=1))
+    assert (merged.low, merged.high) == (values.min(), values.max())
+    # Exponential: skewness 2, excess kurtosis 6
+    assert merged.skewness == pytest.approx(2, abs=0.4)
+
+
+def test_moments_ignore_nan_and_empty():
+    moments = Moments().update([1.0, math.nan, 3.0]).merge(Moments())
+    assert (moments.n, moments.mean, moments.m2) == (2, 2.0, 2.0)
+
+
+def test_countmin_never_underestimates_and_merges():
+    left = CountMin().update(['POS'] * 70 + ['ATM'] * 20 + [None] * 10)
+    right = CountMin().update(['POS'] * 30 + ['Online'] * 5)
+    assert left.estimate(['POS', 'ATM', '(none)']).tolist() == [70, 20, 10]
+    left.merge(right)
+    assert left.count == 135
+    assert left.keys == ['POS', 'ATM', '(none)', 'Online']
+    estimates = left.estimate(['POS', 'ATM', 'Online', 'Refund'])
+    assert estimates[0] >= 100 and estimates[1] >= 20 and estimates[2] >= 5
+    # Few keys in 1024 buckets: exact
+    assert estimates.tolist() == [100, 20, 5, 0]
+
+
+def test_ks_distance_and_critical_value():
+    rng = np.random.default_rng(3)
+    same = ks_distance(TDigest().update(rng.normal(size=20000)), TDigest().update(rng.normal(size=20000)))
+    shifted = ks_distance(TDigest().update(rng.normal(size=20000)), TDigest().update(rng.normal(1, 1, 20000)))
+    assert same < 0.03
+    # Two unit normals one sd apart: sup |CDF gap| = 2 * Phi(0.5) - 1
+    assert shifted == pytest.approx(0.3829, abs=0.02)
+    assert ks_critical(100, 100) == pytest.approx(1.358 * math.sqrt(0.02))
+
+
+def test_psi_known_answer():
+    today = CountMin().update(['a'] * 50 + ['b'] * 50)
+    baseline = CountMin().update(['a'] * 90 + ['b'] * 10)
+    index, keys, _, _ = psi(today, baseline)
+    assert keys == ['a', 'b']
+    assert index == pytest.approx((0.5 - 0.9) * math.log(0.5 / 0.9) + (0.5 - 0.1) * math.log(0.5 / 0.1))
+    assert psi(baseline, baseline)[0] == pytest.approx(0)
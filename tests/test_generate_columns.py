@@ -0,0 +1,35 @@
+# /tests/test_generate_columns.py
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'include'))
+
+from generate_columns import digit_strings, unique_digit_array, zfill_array  # noqa: E402
+from generate_data import unique_digits  # noqa: E402
+
+
+def test_unique_digit_array_matches_unique_digits():
+    ids = np.array([1, 2, 12345, 10 ** 9 + 7, 10 ** 10 - 1], dtype=np.int64)
+    for k, salt in ((9, 0), (12, 0), (12, 5)):
+        assert unique_digit_array(ids, k, salt).tolist() == [unique_digits(int(i), k, salt) for i in ids]
+
+
+def test_unique_digit_array_distinct_and_padded():
+    ids = np.arange(1, 200001, dtype=np.int64)
+    for k in (9, 12):
+        digits = unique_digit_array(ids, k)
+        assert len(set(digits.tolist())) == len(ids)
+        assert all(len(value) == k and value.isdigit() for value in digits[:1000])
+
+
+def test_unique_digits_bijective_below_modulus():
+    assert len({unique_digits(n, 4) for n in range(10 ** 4)}) == 10 ** 4
+
+
+def test_empty_inputs():
+    assert len(zfill_array(np.empty(0, dtype=np.int64), 6)) == 0
+    assert len(unique_digit_array(np.empty(0, dtype=np.int64), 12)) == 0
+    assert len(digit_strings(np.random.default_rng(0), 0, 3)) == 0
+    assert zfill_array(np.array([7, 123]), 3).tolist() == ['007', '123']
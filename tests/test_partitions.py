@@ -0,0 +1,84 @@
+# /tests/test_partitions.py
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'include'))
+
+from partitions import expected_partitions, maintain_table, table_partitions  # noqa: E402
+from watermarks import scope_predicate  # noqa: E402
+
+
+class FakeCursor:
+    """Records statements; fetchall returns the PARTITIONS rows of the information_schema query."""
+
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append((sql, params))
+
+    def fetchall(self):
+        return list(self.partitions)
+
+
+DAILY = [("p_history", "'2026-01-01 00:00:00'"), ("p20260101", "'2026-01-02 00:00:00'"),
+         ("p20260102", "'2026-01-03 00:00:00'"), ("pmax", "MAXVALUE")]
+
+
+def test_table_partitions_bounds():
+    assert table_partitions(FakeCursor(DAILY), 'PaymentTransaction') == [
+        ('p_history', None, date(2026, 1, 1)),
+        ('p20260101', date(2026, 1, 1), date(2026, 1, 2)),
+        ('p20260102', date(2026, 1, 2), date(2026, 1, 3)),
+        ('pmax', date(2026, 1, 3), None),
+    ]
+
+
+def test_expected_partitions_overlap_span():
+    partitions = table_partitions(FakeCursor(DAILY), 'PaymentTransaction')
+    assert expected_partitions(partitions, '2026-01-01 08:00:00', '2026-01-01 23:59:59') == {'p20260101'}
+    assert expected_partitions(partitions, '2025-12-31 23:00:00', '2026-01-02 00:00:00') == {
+        'p_history', 'p20260101', 'p20260102'}
+    assert expected_partitions(partitions, '2026-02-01 00:00:00', '2026-02-02 00:00:00') == {'pmax'}
+
+
+def test_maintain_table_splits_pmax_from_last_bound():
+    cur = FakeCursor(DAILY)
+    created, dropped = maintain_table(cur, 'PaymentTransaction', date(2026, 1, 4), days_ahead=1, backfill_days=31,
+                                      retention_days=0)
+    assert created == ['p20260103', 'p20260104', 'p20260105']
+    assert dropped == []
+    alter = cur.statements[-1][0]
+    assert alter.startswith("ALTER TABLE `PaymentTransaction` REORGANIZE PARTITION `pmax` INTO (")
+    assert "PARTITION p20260103 VALUES LESS THAN ('2026-01-04')" in alter
+    assert "PARTITION p20260105 VALUES LESS THAN ('2026-01-06')" in alter
+    assert alter.endswith("PARTITION pmax VALUES LESS THAN (MAXVALUE))")
+
+
+def test_maintain_table_backfills_only_pmax():
+    cur = FakeCursor([("pmax", "MAXVALUE")])
+    created, _ = maintain_table(cur, 'PaymentTransaction', date(2026, 1, 10), days_ahead=2, backfill_days=3,
+                                retention_days=0)
+    assert created == ['p20260107', 'p20260108', 'p20260109', 'p20260110', 'p20260111', 'p20260112']
+
+
+def test_maintain_table_drops_expired():
+    cur = FakeCursor(DAILY)
+    _, dropped = maintain_table(cur, 'PaymentTransaction', date(2026, 1, 4), days_ahead=1, retention_days=2)
+    assert dropped == ['p_history', 'p20260101']
+    assert cur.statements[-1][0] == "ALTER TABLE `PaymentTransaction` DROP PARTITION `p_history`, `p20260101`"
+
+
+def test_scope_predicate_with_date_span():
+    bounds = {'PaymentTransaction': (100, 200, '2026-01-01 08:00:00', '2026-01-02 09:00:00')}
+    assert scope_predicate('PaymentTransaction', bounds, alias='pt') == (
+        "pt.`TransactionID` > %s AND pt.`TransactionID` <= %s AND pt.`TransactionDate` BETWEEN %s AND %s",
+        (100, 200, '2026-01-01 08:00:00', '2026-01-02 09:00:00'))
+
+
+def test_scope_predicate_without_span():
+    assert scope_predicate('PaymentTransaction', {'PaymentTransaction': (None, 200, None, None)}) == (
+        "`TransactionID` <= %s", (200,))
+    assert scope_predicate('PaymentTransaction', None) == ("1 = 1", ())
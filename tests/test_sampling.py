@@ -0,0 +1,47 @@
+# /tests/test_sampling.py
+import math
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'include'))
+
+from sampling import block_sample, cluster_interval, wilson_interval, Z_95  # noqa: E402
+
+
+def test_wilson_known_answers():
+    # No violations: the upper bound is z^2 / (n + z^2)
+    assert wilson_interval(0, 100) == pytest.approx((0.0, Z_95 ** 2 / (100 + Z_95 ** 2)))
+    lower, upper = wilson_interval(50, 100)
+    margin = Z_95 * math.sqrt(0.25 / 100 + Z_95 ** 2 / 40000) / (1 + Z_95 ** 2 / 100)
+    assert (lower, upper) == pytest.approx((0.5 - margin, 0.5 + margin))
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+    assert wilson_interval(10, 10)[1] == 1.0
+
+
+def test_cluster_interval_spread_violations_match_wilson():
+    # One violation in each of 10 of 100 blocks: no clustering, design effect 1
+    violations = [1] * 10 + [0] * 90
+    assert cluster_interval(violations, [100] * 100) == pytest.approx(wilson_interval(10, 10000))
+
+
+def test_cluster_interval_widens_for_clustered_violations():
+    clustered = cluster_interval([10] + [0] * 99, [100] * 100)
+    spread = cluster_interval([1] * 10 + [0] * 90, [100] * 100)
+    assert clustered[1] - clustered[0] > 2 * (spread[1] - spread[0])
+    assert clustered[0] <= 0.001 <= clustered[1]
+
+
+def test_cluster_interval_without_violations_counts_blocks():
+    assert cluster_interval([0] * 1000, [100] * 1000) == pytest.approx(wilson_interval(0, 1000))
+    assert cluster_interval([0, 0], [0, 0]) == (0.0, 1.0)
+
+
+def test_block_sample_intervals():
+    intervals = block_sample(1, 10 ** 7, 100000, 1000, random.Random(0))
+    assert all(1 <= start <= end <= 10 ** 7 for start, end in intervals)
+    assert all(previous[1] + 1 < start for previous, (start, _) in zip(intervals, intervals[1:]))
+    assert 90000 <= sum(end - start + 1 for start, end in intervals) <= 100000
+    assert block_sample(1, 500, 1000, 10, random.Random(0)) == [(1, 500)]
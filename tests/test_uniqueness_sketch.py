@@ -0,0 +1,76 @@
+# /tests/test_uniqueness_sketch.py
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'include'))
+
+from uniqueness_sketch import (HyperLogLog, PartitionedPairs, collation_keys, hash_values, merge_runs,  # noqa: E402
+                               partition_bits, PARTITION_BITS, MAX_PARTITION_BITS)
+
+
+def test_hll_estimate_within_error():
+    hll = HyperLogLog()
+    hll.update(hash_values([f"value-{i}" for i in range(100000)]))
+    assert abs(hll.estimate() - 100000) <= 3 * hll.relative_error() * 100000
+
+
+def test_hll_ignores_repeats_and_small_counts_are_near_exact():
+    hll = HyperLogLog()
+    hashes = hash_values([f"value-{i}" for i in range(1000)])
+    hll.update(hashes)
+    once = hll.estimate()
+    hll.update(hashes)
+    assert hll.estimate() == once
+    assert abs(once - 1000) <= 20
+
+
+def test_hll_merge_equals_union():
+    values = [f"value-{i}" for i in range(50000)]
+    left, right, both = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    left.update(hash_values(values[:30000]))
+    right.update(hash_values(values[20000:]))
+    both.update(hash_values(values))
+    left.merge(right)
+    assert np.array_equal(left.registers, both.registers)
+    assert left.estimate() == both.estimate()
+
+
+def test_collation_keys_fold_case_and_accents():
+    keys = collation_keys(['Nguyễn@Mail.com', 'nguyen@mail.COM', 'other@mail.com'])
+    assert keys[0] == keys[1] != keys[2]
+    hashes = hash_values(keys)
+    assert hashes[0] == hashes[1] != hashes[2]
+
+
+def test_partition_bits_grow_with_rows():
+    assert partition_bits(0, buffer_rows=1000) == PARTITION_BITS
+    assert partition_bits(1000 << PARTITION_BITS, buffer_rows=1000) == PARTITION_BITS
+    assert partition_bits((1000 << PARTITION_BITS) + 1, buffer_rows=1000) == PARTITION_BITS + 1
+    assert partition_bits(10 ** 15, buffer_rows=1000) == MAX_PARTITION_BITS
+
+
+def test_partitioned_pairs_sorted_and_complete(tmp_path):
+    rng = np.random.default_rng(0)
+    hashes = rng.integers(0, 2 ** 63, 5000, dtype=np.uint64) * np.uint64(2)
+    keys = np.arange(5000, dtype=np.uint64)
+    pairs = PartitionedPairs(str(tmp_path), buffer_rows=700, bits=3)
+    for i in range(0, 5000, 1000):
+        pairs.add(hashes[i:i + 1000], keys[i:i + 1000])
+    merged = np.concatenate(list(pairs.partitions()))
+    assert np.all(merged[1:, 0] >= merged[:-1, 0])
+    assert sorted(merged[:, 1].tolist()) == keys.tolist()
+
+
+def test_merge_runs_distinct_sorted(tmp_path):
+    runs = [np.array([1, 5, 9], dtype=np.uint64), np.array([2, 5, 2 ** 63 + 7], dtype=np.uint64),
+            np.array([], dtype=np.uint64), np.array([0, 9, 2 ** 64 - 1], dtype=np.uint64)]
+    paths = []
+    for i, run in enumerate(runs):
+        path = tmp_path / f"run-{i}.u64"
+        run.tofile(path)
+        paths.append(str(path))
+    merge_runs(paths, str(tmp_path / "merged.u64"), buffer_rows=2)
+    merged = np.fromfile(tmp_path / "merged.u64", dtype=np.uint64)
+    assert merged.tolist() == [0, 1, 2, 5, 9, 2 ** 63 + 7, 2 ** 64 - 1]